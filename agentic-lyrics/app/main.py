@@ -1,27 +1,43 @@
+from .utils.startup import startup_timer  # First import: starts the startup clock
+
 import os
 import yaml
 import asyncio
-from fastapi import FastAPI, HTTPException
-from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
+import threading
+with startup_timer.phase("fastapi", kind="import"):
+    from fastapi import FastAPI, Header, HTTPException, Query, Response
+    from fastapi.middleware.cors import CORSMiddleware
+    from pydantic import BaseModel, Field
 from dotenv import load_dotenv
-# --- LangGraph Imports ---
-from typing import Dict, Any, List, Literal, TypedDict, Optional
-from langgraph.graph import StateGraph, END
+# --- LangGraph Imports (langgraph itself is imported in build_graph) ---
+from typing import Annotated, Dict, Any, List, Literal, TypedDict, Optional
 # --- End LangGraph Imports ---
 import traceback
+from contextlib import asynccontextmanager
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import JsonOutputParser
+from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.encoders import jsonable_encoder
+with startup_timer.phase("langchain_core", kind="import"):
+    from langchain_core.prompts import ChatPromptTemplate
+    from langchain_core.globals import set_llm_cache
 import json
-import itertools
 from operator import itemgetter
 
 # --- Import modular components ---
-from .tools.search import get_f1_results_async
-from .chains.critic_carlin import get_carlin_critic_chain
+# Gemini, langgraph and SerpAPI imports are deferred to first use (see get_chains / build_graph)
+with startup_timer.phase("app_modules", kind="import"):
+    from .tools import search
+    from .tools.search import get_f1_results_async, configure_f1_results_cache
+    from .utils.llm import get_chat_model, registered_chat_models
+    from .utils.batch import NDJSON_HEADERS, SharedFetches, stream_batch
+    from .utils.llm_cache import TieredLLMCache, bypass_llm_cache
+    from .utils.loop_lag import EventLoopLagMonitor
+    from .utils.lyric_stream import IncrementalLyricDecoder, LyricLineStreamParser, SectionGrouper
+    from .utils.metrics import MetricsCallbackHandler, cache_collector, llm_cache_counts, render_metrics
+    from .utils.prompt_budget import PromptBudget, PromptPart, TokenUsage, merge_token_usage, usage_summary
+    from .utils.run_checkpoints import RunCheckpoints, RunInProgressError
+    from .utils.single_flight import IdempotencyKeyReused, IdempotencyStore, SingleFlight, request_fingerprint
+    from .utils.timeline import TimelineRecorder
 
 # --- Configuration Loading ---
 def load_config(config_path="config.yaml") -> Dict:
@@ -47,27 +63,51 @@ try:
         print("Warning: 'agent_sequence' in config.yaml is empty.")
 except Exception as e:
     print(f"Fatal Error: Could not load configuration. {e}")
+    AGENT_CONFIG = {}
     AGENT_SEQUENCE = []
 
-# --- LangChain/LLM Setup ---
+# --- LLM Response Cache ---
+def build_llm_cache(config: Dict) -> Optional[TieredLLMCache]:
+    """Builds the response cache from the 'llm_cache' config section (env vars take precedence)."""
+    cache_config = config.get('llm_cache') or {}
+    enabled = os.getenv("LLM_CACHE_ENABLED", str(cache_config.get('enabled', True))).lower() in ("1", "true", "yes")
+    if not enabled:
+        return None
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    db_path = os.getenv("LLM_CACHE_PATH", cache_config.get('path', 'data/llm_cache.sqlite3'))
+    return TieredLLMCache(
+        db_path=os.path.join(base_dir, db_path),
+        memory_entries=int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", cache_config.get('memory_entries', 256))),
+        max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", cache_config.get('max_entries', 5000))),
+        ttl_seconds=float(os.getenv("LLM_CACHE_TTL_SECONDS", cache_config.get('ttl_seconds', 7 * 24 * 3600))),
+    )
+
+with startup_timer.phase("llm_cache"):
+    llm_cache = build_llm_cache(AGENT_CONFIG)
+if llm_cache is not None:
+    set_llm_cache(llm_cache)
+    cache_collector.register("llm", lambda: llm_cache_counts(llm_cache.snapshot()))
+
+# --- LangChain/LLM Setup (clients and chains are built on first use, see get_chains) ---
 load_dotenv()
-gemini_api_key = os.getenv("GOOGLE_API_KEY")
-if not gemini_api_key:
-    raise ValueError("GOOGLE_API_KEY not found in environment variables.")
+LLM_CONFIG: Dict = AGENT_CONFIG.get('llm') or {}
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", LLM_CONFIG.get('model', 'gemini-2.5-flash'))
+# Gemini API host override (unset: Google's endpoint); scripts/load_test.py points it at a local stub
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL", LLM_CONFIG.get('base_url') or "")
 
-try:
-    base_llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash", google_api_key=gemini_api_key)
-    critic_llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash", google_api_key=gemini_api_key, temperature=0.7)
-    refiner_llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash", google_api_key=gemini_api_key, temperature=0.5)
-except Exception as e:
-    print(f"!!! Error initializing LLMs: {e} !!!")
-    raise
+# --- F1 Results Cache ---
+F1_RESULTS_CONFIG: Dict = AGENT_CONFIG.get('f1_results') or {}
+configure_f1_results_cache(F1_RESULTS_CONFIG)
 
-# --- Global Chains ---
-carlin_critic_chain = get_carlin_critic_chain(critic_llm)
+# --- Lyric Line Model (defined before the chains so their parsers can validate it) ---
+class LyricLine(BaseModel):
+    line: str = Field(..., description="The text of the lyric line.")
+    source: Literal["human", "machine"] = Field(..., description="The origin of the line.")
+    section: str = Field(..., description="Song section (e.g., '[verse 1]', '[chorus]', '[bridge]').")
 
+# --- Chain Prompts and Parsers (cheap to build; the LLM-backed chains are lazy) ---
 # Songwriter Chain
-songwriter_json_parser = JsonOutputParser(pydantic_object=List['LyricLine'])
+songwriter_json_parser = LyricLineStreamParser(model_cls=LyricLine)
 songwriter_prompt = ChatPromptTemplate.from_messages([
     ("system", 
      "You are a songwriter. Your task is to complete a song... "
@@ -84,10 +124,9 @@ songwriter_prompt = ChatPromptTemplate.from_messages([
      "Human Lines (JSON): {draft_lyrics}\n\n"
      "Your JSON Output:")
 ])
-songwriter_chain = songwriter_prompt | base_llm | songwriter_json_parser
 
 # Refiner Chain
-refiner_json_parser = JsonOutputParser(pydantic_object=List['LyricLine'])
+refiner_json_parser = LyricLineStreamParser(model_cls=LyricLine)
 refiner_prompt = ChatPromptTemplate.from_messages([
     ("system",
      "You are a lyric refiner. Review the following song (as a JSON string) and a critique. "
@@ -104,7 +143,59 @@ refiner_prompt = ChatPromptTemplate.from_messages([
      "Critique: {critique}\n\n"
      "Your Refined JSON Output:")
 ])
-refiner_chain = refiner_prompt | refiner_llm | refiner_json_parser
+
+# --- Prompt Token Budgets (estimated tokens per node; see /debug/tokens) ---
+PROMPT_BUDGET_CONFIG: Dict = AGENT_CONFIG.get('prompt_budgets') or {}
+prompt_budget = PromptBudget(
+    {node: int(budget) for node, budget in (PROMPT_BUDGET_CONFIG.get('nodes') or {}).items()},
+    default_budget=int(PROMPT_BUDGET_CONFIG.get('default', 4000)),
+)
+
+def prompt_template_text(prompt: ChatPromptTemplate) -> Dict[str, str]:
+    """System and human template strings of a two-message chat prompt."""
+    texts = [getattr(getattr(message, "prompt", None), "template", "") for message in prompt.messages]
+    return {"system": texts[0], "human": texts[-1]}
+
+def build_chains() -> Dict[str, Any]:
+    """Creates the Gemini clients and the chains that use them."""
+    from .chains.critic_carlin import get_carlin_critic_chain
+
+    gemini_api_key = os.getenv("GOOGLE_API_KEY")
+    if not gemini_api_key:
+        raise ValueError("GOOGLE_API_KEY not found in environment variables.")
+
+    endpoint = {"base_url": GEMINI_BASE_URL} if GEMINI_BASE_URL else {}
+
+    def chat_model(temperature: Optional[float] = None):
+        return get_chat_model(GEMINI_MODEL, gemini_api_key, temperature=temperature, **endpoint)
+
+    try:
+        # Shared clients from the registry; identical settings hand back the same instance
+        base_llm = chat_model()
+        critic_llm = chat_model(0.7)
+        refiner_llm = chat_model(0.5)
+    except Exception as e:
+        print(f"!!! Error initializing LLMs: {e} !!!")
+        raise
+
+    return {
+        "carlin_critic": get_carlin_critic_chain(critic_llm),
+        "songwriter": songwriter_prompt | base_llm | songwriter_json_parser,
+        "refiner": refiner_prompt | refiner_llm | refiner_json_parser,
+    }
+
+_chains: Optional[Dict[str, Any]] = None
+_chains_lock = threading.Lock()
+
+def get_chains() -> Dict[str, Any]:
+    """Returns the shared chains, building them on first use."""
+    global _chains
+    if _chains is None:
+        with _chains_lock:
+            if _chains is None:
+                with startup_timer.phase("gemini_chains", kind="lazy"):
+                    _chains = build_chains()
+    return _chains
 
 # --- Helper function for Critic Formatting ---
 def format_lyrics_with_sections(lyrics: List['LyricLine']) -> str:
@@ -130,26 +221,65 @@ def format_lyrics_with_sections(lyrics: List['LyricLine']) -> str:
 def group_lyrics_by_section(lyrics_list: List['LyricLine']) -> List['UILyricSection']:
     """
     Transforms a flat List[LyricLine] into a nested list grouped by section,
-    perfect for a UI.
+    perfect for a UI. Consecutive lines share a section; song order is kept.
     """
     if not lyrics_list:
         return []
 
-    grouped_sections = []
-    
-    for section_name, group_iter in itertools.groupby(lyrics_list, key=lambda L: L.section):
-        lines_in_group = [
-            UILyricLine(line=L.line, source=L.source) 
-            for L in group_iter
-        ]
-        grouped_sections.append(
-            UILyricSection(section=section_name, lines=lines_in_group)
-        )
-        
-    return grouped_sections
+    grouper = SectionGrouper()
+    closed_sections = [grouper.add(L) for L in lyrics_list] + [grouper.flush()]
+    return [to_ui_section(section_name, lines) for section_name, lines in filter(None, closed_sections)]
+
+def to_ui_section(section_name: str, lines: List['LyricLine']) -> 'UILyricSection':
+    """Builds one UI section from the lines the SectionGrouper closed."""
+    return UILyricSection(
+        section=section_name,
+        lines=[UILyricLine(line=L.line, source=L.source) for L in lines],
+    )
 
 # --- FastAPI App Initialization ---
-app = FastAPI(title="F1 Songwriting Agent")
+WARM_START = os.getenv("WARM_START", str((AGENT_CONFIG.get('startup') or {}).get('warm_start', True))).lower() in ("1", "true", "yes")
+
+async def warm_graph_app():
+    """Builds the chains and graph right after startup so the first request does not pay for it."""
+    try:
+        await load_graph_app()
+    except Exception as e:
+        print(f"!!! Graph warm-up failed (will retry on first request): {e} !!!")
+
+# Sampled every 100 ms while the app runs; see /debug/event-loop
+loop_lag_monitor = EventLoopLagMonitor()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Opens run checkpoints, keeps the F1 results cache warm on a schedule, samples event-loop lag and warms the graph in the background."""
+    try:
+        await run_checkpoints.open()
+    except Exception as e:
+        print(f"!!! Run checkpoints unavailable, runs will not be resumable: {e} !!!")
+    refresh_interval = float(os.getenv(
+        "F1_RESULTS_REFRESH_SECONDS", F1_RESULTS_CONFIG.get('refresh_interval_seconds', 3600)
+    ))
+    refresh_task = None
+    if refresh_interval > 0:
+        refresh_task = asyncio.create_task(search.get_f1_results_cache().run_scheduled_refresh(refresh_interval))
+    # Build clients, chains and the graph in the background so startup is not blocked on them
+    warm_task = asyncio.create_task(warm_graph_app()) if WARM_START else None
+    loop_lag_monitor.start()
+    startup_timer.mark_ready()
+    yield
+    await loop_lag_monitor.stop()
+    # Cancelled and awaited, so neither is still running when the checkpoint connection closes
+    for task in (refresh_task, warm_task):
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+    await run_checkpoints.close()
+
+app = FastAPI(title="F1 Songwriting Agent", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -167,14 +297,10 @@ else:
     app.mount("/static", StaticFiles(directory=static_dir), name="static")
 
 # --- Request/Response Models (Pydantic) ---
-class LyricLine(BaseModel):
-    line: str = Field(..., description="The text of the lyric line.")
-    source: Literal["human", "machine"] = Field(..., description="The origin of the line.")
-    section: str = Field(..., description="Song section (e.g., '[verse 1]', '[chorus]', '[bridge]').")
-
 class SongRequest(BaseModel):
     theme: str
     draft_lyrics: List[str] = []
+    no_cache: bool = False  # Bypass the LLM response cache for this request
 
 # --- UI-Specific Models ---
 class UILyricLine(BaseModel):
@@ -190,6 +316,7 @@ class SongResponse(BaseModel):
     steps_executed: list[str]
     results: Dict[str, Any]
     lyrics_by_section: List[UILyricSection] = []
+    run_id: Optional[str] = None  # Checkpointed run: resume or revise it under /runs/{run_id}
 
 # --- Root Endpoint (Serves Frontend) ---
 @app.get("/", response_class=FileResponse)
@@ -201,12 +328,51 @@ async def read_index():
         raise HTTPException(status_code=404, detail="Static directory or index.html not found.")
     return FileResponse(index_path)
 
+# --- Debug Endpoints ---
+@app.get("/debug/llm-cache")
+async def llm_cache_stats():
+    """Hit/miss counters for the LLM response cache."""
+    if llm_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **llm_cache.snapshot()}
+
+@app.get("/debug/startup")
+async def startup_report():
+    """Import and init time by component, plus lazily built components once used."""
+    return startup_timer.report()
+
+@app.get("/debug/models")
+async def chat_model_registry():
+    """Shared chat models handed out by the registry."""
+    return {"chat_models": registered_chat_models()}
+
+@app.get("/debug/tokens")
+async def prompt_token_stats():
+    """Estimated prompt tokens by node and section, budgets, and how often prompts were trimmed."""
+    return prompt_budget.snapshot()
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus scrape endpoint: node, model call, in-flight and cache metrics for this worker."""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+@app.get("/debug/event-loop")
+async def event_loop_lag(reset: bool = False):
+    """Event-loop lag percentiles for this worker; reset=true clears the window (load tests do this first)."""
+    snapshot = loop_lag_monitor.snapshot()
+    if reset:
+        loop_lag_monitor.reset()
+    return snapshot
+
 
 # ==============================================================================
 # --- LANGGRAPH STATE DEFINITION ---
 # ==============================================================================
 
 class AgentState(TypedDict):
+    # Where the run starts: "research" (full run) | "revise" (from a saved run's lyrics; see route_entry)
+    entry_point: str
     # Initial inputs
     theme: str
     draft_lyrics: List[LyricLine]
@@ -219,6 +385,8 @@ class AgentState(TypedDict):
     lyrics: Optional[List[LyricLine]]
     carlin_critique: Optional[str]
     revised_lyrics: Optional[Optional[List[LyricLine]]]
+    # Estimated prompt tokens per node and section
+    token_usage: Annotated[TokenUsage, merge_token_usage]
     # Error handling
     error: Optional[str]
 
@@ -257,14 +425,22 @@ async def run_songwriter_node(state: AgentState) -> Dict[str, Any]:
             raise ValueError("State error: 'f1_info' missing for songwriter.")
             
         draft_lyrics_json = json.dumps([L.model_dump() for L in draft_lyrics])
+        # Race info is trimmed first when over budget; the human lines never are
+        templates = prompt_template_text(songwriter_prompt)
+        prompt = prompt_budget.fit("run_songwriter", [
+            PromptPart("system", templates["system"]),
+            PromptPart("theme", theme),
+            PromptPart("draft", draft_lyrics_json),
+            PromptPart("race_info", str(f1_info), priority=1, min_tokens=80),
+        ], template=templates["human"])
         step_input = {
-            "theme": theme, 
-            "race_info": f1_info,
-            "draft_lyrics": draft_lyrics_json
+            "theme": prompt["theme"], 
+            "race_info": prompt["race_info"],
+            "draft_lyrics": prompt["draft"]
         }
 
         # 2. Invoke global chain
-        step_output = await songwriter_chain.ainvoke(step_input)
+        step_output = await get_chains()["songwriter"].ainvoke(step_input)
 
         # 3. Cast List[dict] to List[LyricLine]
         if isinstance(step_output, list):
@@ -274,7 +450,8 @@ async def run_songwriter_node(state: AgentState) -> Dict[str, Any]:
 
         return {
             "lyrics": step_output,
-            "steps_executed": state.get("steps_executed", []) + ["run_songwriter"]
+            "steps_executed": state.get("steps_executed", []) + ["run_songwriter"],
+            "token_usage": {"run_songwriter": prompt.tokens},
         }
 
     except Exception as e:
@@ -296,14 +473,20 @@ async def run_carlin_critic_node(state: AgentState) -> Dict[str, Any]:
             raise ValueError("State error: 'lyrics' missing for critic.")
         
         lyrics_string = format_lyrics_with_sections(lyrics_content)
-        step_input = {"song_lyrics": lyrics_string}
+        from .chains.critic_carlin import CRITIC_HUMAN_PROMPT, CRITIC_SYSTEM_PROMPT
+        prompt = prompt_budget.fit("run_carlin_critic", [
+            PromptPart("system", CRITIC_SYSTEM_PROMPT),
+            PromptPart("lyrics", lyrics_string, priority=1, min_tokens=300),
+        ], template=CRITIC_HUMAN_PROMPT)
+        step_input = {"song_lyrics": prompt["lyrics"]}
 
         # 2. Invoke global chain
-        step_output = await carlin_critic_chain.ainvoke(step_input)
+        step_output = await get_chains()["carlin_critic"].ainvoke(step_input)
         
         return {
             "carlin_critique": step_output,
-            "steps_executed": state.get("steps_executed", []) + ["run_carlin_critic"]
+            "steps_executed": state.get("steps_executed", []) + ["run_carlin_critic"],
+            "token_usage": {"run_carlin_critic": prompt.tokens},
         }
 
     except Exception as e:
@@ -328,13 +511,20 @@ async def run_refiner_node(state: AgentState) -> Dict[str, Any]:
             raise ValueError("State error: 'carlin_critique' missing for refiner.")
             
         original_lyrics_json = json.dumps([L.model_dump() for L in original_lyrics])
+        # The critique is trimmed when over budget; the song (with its locked human lines) never is
+        templates = prompt_template_text(refiner_prompt)
+        prompt = prompt_budget.fit("run_refiner", [
+            PromptPart("system", templates["system"]),
+            PromptPart("lyrics", original_lyrics_json),
+            PromptPart("critique", critique, priority=1, min_tokens=100),
+        ], template=templates["human"])
         step_input = {
-            "original_lyrics": original_lyrics_json,
-            "critique": critique
+            "original_lyrics": prompt["lyrics"],
+            "critique": prompt["critique"]
         }
 
         # 2. Invoke global chain
-        step_output = await refiner_chain.ainvoke(step_input)
+        step_output = await get_chains()["refiner"].ainvoke(step_input)
         
         # 3. Cast List[dict] to List[LyricLine]
         if isinstance(step_output, list):
@@ -344,7 +534,8 @@ async def run_refiner_node(state: AgentState) -> Dict[str, Any]:
 
         return {
             "revised_lyrics": step_output,
-            "steps_executed": state.get("steps_executed", []) + ["run_refiner"]
+            "steps_executed": state.get("steps_executed", []) + ["run_refiner"],
+            "token_usage": {"run_refiner": prompt.tokens},
         }
 
     except Exception as e:
@@ -360,68 +551,169 @@ async def run_refiner_node(state: AgentState) -> Dict[str, Any]:
 # --- LANGGRAPH GRAPH DEFINITION & COMPILATION ---
 # ==============================================================================
 
-workflow = StateGraph(AgentState)
-
-# Map node names from config to the async functions
-NODE_MAP = {
-    "get_f1_results": get_f1_results_node,
-    "run_songwriter": run_songwriter_node,
-    "run_carlin_critic": run_carlin_critic_node,
-    "run_refiner": run_refiner_node,
-}
-
-# Add all nodes defined in the config
-for step_name in AGENT_SEQUENCE:
-    if step_name in NODE_MAP:
-        workflow.add_node(step_name, NODE_MAP[step_name])
-        print(f"Added node: {step_name}")
+# Revise runs (/runs/{run_id}/revise) start here with a finished run's lyrics
+CHECKPOINT_CONFIG: Dict = AGENT_CONFIG.get('checkpoints') or {}
+REVISE_ENTRY = CHECKPOINT_CONFIG.get('revise_entry', 'run_carlin_critic')
+
+def route_entry(state: AgentState) -> str:
+    """Full runs start at the first configured step; revise runs skip research and the first draft."""
+    return "revise" if state.get("entry_point") == "revise" else "research"
+
+def build_graph():
+    """Builds and compiles the linear graph from AGENT_SEQUENCE."""
+    from langgraph.graph import StateGraph, END  # Deferred: langgraph is only needed once a song runs
+
+    workflow = StateGraph(AgentState)
+
+    # Map node names from config to the async functions
+    NODE_MAP = {
+        "get_f1_results": get_f1_results_node,
+        "run_songwriter": run_songwriter_node,
+        "run_carlin_critic": run_carlin_critic_node,
+        "run_refiner": run_refiner_node,
+    }
+
+    # Add all nodes defined in the config
+    for step_name in AGENT_SEQUENCE:
+        if step_name in NODE_MAP:
+            workflow.add_node(step_name, NODE_MAP[step_name])
+            print(f"Added node: {step_name}")
+        else:
+            print(f"Warning: Step '{step_name}' in config.yaml not found in NODE_MAP.")
+
+    # Add edges in sequence
+    if AGENT_SEQUENCE:
+        # Set the entry point to the first step; revise runs enter at REVISE_ENTRY
+        if REVISE_ENTRY in AGENT_SEQUENCE[1:] and REVISE_ENTRY in NODE_MAP:
+            workflow.set_conditional_entry_point(
+                route_entry, {"research": AGENT_SEQUENCE[0], "revise": REVISE_ENTRY}
+            )
+            print(f"Set entry point: {AGENT_SEQUENCE[0]} (revise runs: {REVISE_ENTRY})")
+        else:
+            workflow.set_entry_point(AGENT_SEQUENCE[0])
+            print(f"Set entry point: {AGENT_SEQUENCE[0]}")
+
+        # Add sequential edges
+        for i in range(len(AGENT_SEQUENCE) - 1):
+            current_step = AGENT_SEQUENCE[i]
+            next_step = AGENT_SEQUENCE[i+1]
+
+            if current_step in NODE_MAP and next_step in NODE_MAP:
+                workflow.add_edge(current_step, next_step)
+                print(f"Added edge: {current_step} -> {next_step}")
+
+        # Add edge from last node to END
+        last_step = AGENT_SEQUENCE[-1]
+        if last_step in NODE_MAP:
+            workflow.add_edge(last_step, END)
+            print(f"Added edge: {last_step} -> END")
     else:
-        print(f"Warning: Step '{step_name}' in config.yaml not found in NODE_MAP.")
+        raise ValueError("Cannot build graph: AGENT_SEQUENCE in config.yaml is empty.")
 
-# Add edges in sequence
-if AGENT_SEQUENCE:
-    # Set the entry point to the first step
-    workflow.set_entry_point(AGENT_SEQUENCE[0])
-    print(f"Set entry point: {AGENT_SEQUENCE[0]}")
-    
-    # Add sequential edges
-    for i in range(len(AGENT_SEQUENCE) - 1):
-        current_step = AGENT_SEQUENCE[i]
-        next_step = AGENT_SEQUENCE[i+1]
-        
-        if current_step in NODE_MAP and next_step in NODE_MAP:
-            workflow.add_edge(current_step, next_step)
-            print(f"Added edge: {current_step} -> {next_step}")
-    
-    # Add edge from last node to END
-    last_step = AGENT_SEQUENCE[-1]
-    if last_step in NODE_MAP:
-        workflow.add_edge(last_step, END)
-        print(f"Added edge: {last_step} -> END")
-else:
-    raise ValueError("Cannot build graph: AGENT_SEQUENCE in config.yaml is empty.")
+    # Compile the graph
+    print("Compiling graph...")
+    compiled = workflow.compile()
+    print("Graph compiled successfully.")
+    return compiled
+
+_graph_app = None
+_graph_app_lock = threading.Lock()
+
+def get_graph_app():
+    """Returns the compiled graph, building it (and its chains) on first use."""
+    global _graph_app
+    if _graph_app is None:
+        with _graph_app_lock:
+            if _graph_app is None:
+                with startup_timer.phase("langgraph_graph", kind="lazy"):
+                    get_chains()
+                    _graph_app = build_graph()
+    return _graph_app
+
+async def load_graph_app():
+    """Compiled graph; the first call builds it off the event loop."""
+    return await asyncio.to_thread(get_graph_app)
+
+# Prometheus metrics for every graph run (nodes and model calls); see /metrics
+graph_metrics = MetricsCallbackHandler(graph="f1_songwriter")
+
+# Durable checkpoints per run (opened in the lifespan); see the /runs endpoints
+run_checkpoints = RunCheckpoints(
+    db_path=os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        os.getenv("CHECKPOINT_DB_PATH", CHECKPOINT_CONFIG.get('path', 'data/checkpoints.sqlite3')),
+    ),
+    retention_seconds=float(os.getenv("CHECKPOINT_RETENTION_SECONDS", CHECKPOINT_CONFIG.get('retention_seconds', 7 * 24 * 3600))),
+    enabled=os.getenv("CHECKPOINTS_ENABLED", str(CHECKPOINT_CONFIG.get('enabled', True))).lower() in ("1", "true", "yes"),
+    state_types=[LyricLine],
+)
+
+async def load_checkpointed_graph_app():
+    """The compiled graph with the run checkpointer attached (plain graph while checkpoints are closed)."""
+    return run_checkpoints.attach(await load_graph_app())
 
-# Compile the graph
-print("Compiling graph...")
-graph_app = workflow.compile()
-print("Graph compiled successfully.")
+def graph_run_config(timeline: TimelineRecorder, run_id: Optional[str] = None) -> Dict[str, Any]:
+    """Config for every graph invocation: the metrics callback, the run's timeline recorder and checkpoint thread."""
+    config: Dict[str, Any] = {"callbacks": [graph_metrics, timeline]}
+    if run_id is not None:
+        config.update(run_checkpoints.run_config(run_id))
+    return config
+
+def without_timeline(song: Dict[str, Any], trace: bool) -> Dict[str, Any]:
+    """The timeline is always recorded (and stored for replays) but only returned on ?trace=1."""
+    if trace or "timeline" not in song.get("results", {}):
+        return song
+    return {**song, "results": {k: v for k, v in song["results"].items() if k != "timeline"}}
 
 
 # ==============================================================================
 # --- MAIN FASTAPI GENERATION ENDPOINT (NOW USING LANGGRAPH) ---
 # ==============================================================================
 
+# Identical in-flight requests share one graph run; completed responses are replayed to retries.
+IDEMPOTENCY_CONFIG: Dict = AGENT_CONFIG.get('idempotency') or {}
+generate_flight = SingleFlight(IdempotencyStore(
+    db_path=os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        os.getenv("IDEMPOTENCY_STORE_PATH", IDEMPOTENCY_CONFIG.get('path', 'data/idempotency.sqlite3')),
+    ),
+    ttl_seconds=float(os.getenv("IDEMPOTENCY_TTL_SECONDS", IDEMPOTENCY_CONFIG.get('ttl_seconds', 24 * 3600))),
+    max_entries=int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", IDEMPOTENCY_CONFIG.get('max_entries', 1000))),
+))
+
 @app.post("/generate", response_model=SongResponse)
-async def generate_song_flow(request: SongRequest):
-    print(f"\n--- Starting Generation for theme: '{request.theme}' ---")
-    
-    # 1. Prepare initial state
+async def generate_song_flow(
+    request: SongRequest,
+    response: Response,
+    idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key"),
+    trace: bool = Query(default=False, description="Include the per-node execution timeline in results.timeline."),
+):
+    fingerprint = request_fingerprint("generate", request.model_dump(exclude={"no_cache"}))
+    key = f"generate:key:{idempotency_key}" if idempotency_key else fingerprint
+
+    async def execute() -> Dict[str, Any]:
+        song = await run_generation(request)
+        return song.model_dump(mode="json")
+
+    # no_cache asks for a fresh song, so only an explicit Idempotency-Key may replay a stored one.
+    try:
+        result, outcome = await generate_flight.run(
+            key, execute, replay=bool(idempotency_key) or not request.no_cache, fingerprint=fingerprint
+        )
+    except IdempotencyKeyReused as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    response.headers["Idempotency-Status"] = outcome
+    return SongResponse(**without_timeline(result, trace))
+
+def build_initial_state(request: SongRequest) -> AgentState:
+    """Maps a request onto the initial graph state."""
     structured_draft: List[LyricLine] = [
         LyricLine(line=line_text, source="human", section="[verse 1]") 
         for line_text in request.draft_lyrics
     ]
 
-    initial_state: AgentState = {
+    return {
+        "entry_point": "research",
         "theme": request.theme,
         "draft_lyrics": structured_draft,
         "steps_executed": [],
@@ -429,45 +721,70 @@ async def generate_song_flow(request: SongRequest):
         "lyrics": None,
         "carlin_critique": None,
         "revised_lyrics": None,
+        "token_usage": {},
         "error": None
     }
 
-    try:
-        # 2. Invoke the graph
-        print("--- Invoking LangGraph ---")
-        final_state = await graph_app.ainvoke(initial_state)
-        print("--- LangGraph Execution Complete ---")
+def build_song_response(
+    request: SongRequest,
+    final_state: Dict[str, Any],
+    timeline: Optional[TimelineRecorder] = None,
+    run_id: Optional[str] = None,
+) -> SongResponse:
+    """Formats a finished graph state; raises HTTPException if a step reported an error."""
+    error = final_state.get("error")
+    if error:
+        raise HTTPException(status_code=500, detail=error)
 
-        # 3. Check for errors
-        error = final_state.get("error")
-        if error:
-            raise HTTPException(status_code=500, detail=error)
+    # Get the final lyrics (either revised or original)
+    final_lyrics_list: List[LyricLine] = final_state.get(
+        "revised_lyrics", 
+        final_state.get("lyrics", [])
+    )
 
-        # 4. Process final state
-        # Get the final lyrics (either revised or original)
-        final_lyrics_list: List[LyricLine] = final_state.get(
-            "revised_lyrics", 
-            final_state.get("lyrics", [])
-        )
+    # Transform the flat list into a nested, UI-friendly list
+    ui_lyrics = group_lyrics_by_section(final_lyrics_list)
 
-        # Transform the flat list into a nested, UI-friendly list
-        ui_lyrics = group_lyrics_by_section(final_lyrics_list)
+    # Create results log for debugging/display
+    results_log = {
+        "f1_info": final_state.get("f1_info"),
+        "lyrics": final_state.get("lyrics"),
+        "carlin_critique": final_state.get("carlin_critique"),
+        "revised_lyrics": final_state.get("revised_lyrics"),
+        "token_usage": usage_summary(final_state.get("token_usage")),
+    }
+    if timeline is not None:
+        results_log["timeline"] = timeline.timeline()
 
-        # Create results log for debugging/display
-        results_log = {
-            "f1_info": final_state.get("f1_info"),
-            "lyrics": final_state.get("lyrics"),
-            "carlin_critique": final_state.get("carlin_critique"),
-            "revised_lyrics": final_state.get("revised_lyrics")
-        }
+    return SongResponse(
+        theme=request.theme,
+        steps_executed=final_state.get("steps_executed", []),
+        results=results_log,
+        lyrics_by_section=ui_lyrics,
+        run_id=run_id
+    )
 
-        # 5. Return the response
-        return SongResponse(
-            theme=request.theme,
-            steps_executed=final_state.get("steps_executed", []),
-            results=results_log,
-            lyrics_by_section=ui_lyrics
-        )
+async def run_generation(request: SongRequest) -> SongResponse:
+    """Runs the configured agent graph for one request."""
+    print(f"\n--- Starting Generation for theme: '{request.theme}' ---")
+    
+    # 1. Prepare initial state
+    initial_state = build_initial_state(request)
+    timeline = TimelineRecorder()
+    run_id = run_checkpoints.new_run_id()
+
+    try:
+        # 2. Invoke the graph (checkpointed under run_id)
+        print("--- Invoking LangGraph ---")
+        graph_app = await load_checkpointed_graph_app()
+        await run_checkpoints.register(run_id, "generate", no_cache=request.no_cache)
+        async with run_checkpoints.claim(run_id):
+            with bypass_llm_cache(request.no_cache):
+                final_state = await graph_app.ainvoke(initial_state, config=graph_run_config(timeline, run_id))
+        print("--- LangGraph Execution Complete ---")
+
+        # 3. Check for errors and build the response
+        return build_song_response(request, final_state, timeline, run_id)
         
     except HTTPException:
         # Re-raise HTTPExceptions directly
@@ -477,3 +794,281 @@ async def generate_song_flow(request: SongRequest):
         print(f"!!! Critical Error during graph execution: {e} !!!")
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Unexpected error during song generation: {str(e)}")
+
+
+# ==============================================================================
+# --- STREAMING GENERATION ENDPOINT (SERVER-SENT EVENTS) ---
+# ==============================================================================
+
+# Nodes whose model tokens are forwarded to the client as they are generated
+TOKEN_STREAM_NODES = {"run_songwriter", "run_refiner"}
+
+# Nodes whose output is a full draft the UI can render
+DRAFT_KEYS = {"run_songwriter": "lyrics", "run_refiner": "revised_lyrics"}
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+def sse_event(event: str, data: Any) -> str:
+    """Formats one Server-Sent Event frame."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+class LineStream:
+    """Decodes one model run's tokens into validated lines and closed sections."""
+
+    def __init__(self):
+        self.decoder = IncrementalLyricDecoder(LyricLine)
+        self.grouper = SectionGrouper()
+
+    def feed(self, node: str, text: str) -> List[str]:
+        frames = []
+        for line in self.decoder.feed(text):
+            frames.append(sse_event("line", {"node": node, **line.model_dump()}))
+            closed = self.grouper.add(line)
+            if closed:
+                frames.append(self._section_frame(node, closed))
+        return frames
+
+    def close(self, node: str) -> List[str]:
+        closed = self.grouper.flush()
+        return [self._section_frame(node, closed)] if closed else []
+
+    @staticmethod
+    def _section_frame(node: str, closed) -> str:
+        return sse_event("section", {"node": node, **to_ui_section(*closed).model_dump()})
+
+async def stream_generation_events(request: SongRequest, trace: bool = False):
+    """Runs the graph and yields SSE frames for node completions, drafts, tokens and the result."""
+    initial_state = build_initial_state(request)
+    timeline = TimelineRecorder()
+    run_id = run_checkpoints.new_run_id()
+    state: Dict[str, Any] = dict(initial_state)
+    final_state = None
+    line_streams: Dict[str, LineStream] = {}  # keyed by chat model run_id
+
+    # A dropped stream leaves a checkpointed run that /runs/{run_id}/resume can finish
+    yield sse_event("start", {"theme": request.theme, "run_id": run_id})
+    try:
+        graph_app = await load_checkpointed_graph_app()
+        await run_checkpoints.register(run_id, "generate", no_cache=request.no_cache)
+        async with run_checkpoints.claim(run_id):
+            with bypass_llm_cache(request.no_cache):
+                async for event in graph_app.astream_events(initial_state, config=graph_run_config(timeline, run_id), version="v2"):
+                    kind = event["event"]
+                    node = event.get("metadata", {}).get("langgraph_node")
+                    parent_ids = event.get("parent_ids") or []
+
+                    if kind == "on_chat_model_stream" and node in TOKEN_STREAM_NODES:
+                        text = event["data"]["chunk"].content
+                        if text:
+                            yield sse_event("token", {"node": node, "text": text})
+                            for frame in line_streams.setdefault(event["run_id"], LineStream()).feed(node, text):
+                                yield frame
+
+                    elif kind == "on_chat_model_end" and event["run_id"] in line_streams:
+                        for frame in line_streams.pop(event["run_id"]).close(node):
+                            yield frame
+
+                    elif kind == "on_chain_end" and not parent_ids:
+                        # Root graph run finished: its output is the final state
+                        final_state = event["data"].get("output")
+
+                    # A node finished; LangGraph's own __start__ input step is not one of ours
+                    elif kind == "on_chain_end" and len(parent_ids) == 1 and event["name"] == node and not node.startswith("__"):
+                        update = event["data"].get("output")
+                        if not isinstance(update, dict):
+                            continue
+                        for key, value in update.items():
+                            state[key] = merge_token_usage(state.get(key), value) if key == "token_usage" else value
+                        yield sse_event("node", {"node": node, "update": jsonable_encoder(update)})
+
+                        draft = update.get(DRAFT_KEYS.get(node, ""))
+                        if draft:
+                            yield sse_event("draft", {
+                                "node": node,
+                                "lyrics_by_section": [section.model_dump() for section in group_lyrics_by_section(draft)],
+                            })
+
+        song = build_song_response(request, final_state or state, timeline, run_id)
+        yield sse_event("result", without_timeline(song.model_dump(mode="json"), trace))
+
+    except HTTPException as e:
+        yield sse_event("error", {"detail": e.detail})
+    except Exception as e:
+        print(f"!!! Critical Error during streamed graph execution: {e} !!!")
+        traceback.print_exc()
+        yield sse_event("error", {"detail": f"Unexpected error during song generation: {str(e)}"})
+
+@app.post("/generate/stream")
+async def generate_song_stream(
+    request: SongRequest,
+    trace: bool = Query(default=False, description="Include the per-node execution timeline in the result event."),
+):
+    """Streams graph progress as Server-Sent Events (POST body matches /generate)."""
+    return StreamingResponse(
+        stream_generation_events(request, trace), media_type="text/event-stream", headers=SSE_HEADERS
+    )
+
+
+# ==============================================================================
+# --- BATCH GENERATION ENDPOINT (NDJSON) ---
+# ==============================================================================
+
+# Songs in flight at once for /generate/batch (BATCH_MAX_ITEMS / BATCH_CONCURRENCY override)
+BATCH_CONFIG: Dict = AGENT_CONFIG.get('batch') or {}
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", BATCH_CONFIG.get('max_items', 100)))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", BATCH_CONFIG.get('concurrency', 4)))
+
+class BatchRequest(BaseModel):
+    requests: List[SongRequest] = Field(..., min_length=1, max_length=BATCH_MAX_ITEMS)
+    concurrency: Optional[int] = Field(default=None, ge=1)  # Songs in flight at once (capped at BATCH_CONCURRENCY)
+
+@app.post("/generate/batch")
+async def generate_song_batch(
+    body: BatchRequest,
+    trace: bool = Query(default=False, description="Include the per-node execution timeline in each song."),
+):
+    """
+    Generates many songs in one call (e.g. one per driver after a race) and
+    streams each as an NDJSON line as soon as it finishes, in completion order;
+    `index` points back into `requests`. The race results are fetched once
+    for the whole batch, identical requests share one run (and replay stored
+    responses, like /generate), and at most BATCH_CONCURRENCY songs run at
+    once. The last line is a summary.
+    """
+    # Build the graph once up front instead of in every item
+    await load_checkpointed_graph_app()
+    shared = SharedFetches()
+    concurrency = min(body.concurrency or BATCH_CONCURRENCY, BATCH_CONCURRENCY)
+    print(f"--- Batch of {len(body.requests)} songs ({concurrency} at a time) ---")
+
+    async def run_item(index: int) -> Dict[str, Any]:
+        request = body.requests[index]
+
+        async def execute() -> Dict[str, Any]:
+            # The F1 query is fixed: one fetch (or cache read) for the batch; get_f1_results then reads the warm cache
+            await shared.get("f1_results", get_f1_results_async)
+            song = await run_generation(request)
+            return song.model_dump(mode="json")
+
+        key = request_fingerprint("generate", request.model_dump(exclude={"no_cache"}))
+        result, outcome = await generate_flight.run(key, execute, replay=not request.no_cache, fingerprint=key)
+        return {"idempotency": outcome, "song": without_timeline(result, trace)}
+
+    return StreamingResponse(
+        stream_batch(len(body.requests), run_item, concurrency, shared),
+        media_type="application/x-ndjson",
+        headers=NDJSON_HEADERS,
+    )
+
+
+# ==============================================================================
+# --- CHECKPOINTED RUNS: STATUS, RESUME AND REVISE ---
+# ==============================================================================
+
+class RunStatus(BaseModel):
+    run_id: str
+    finished: bool
+    next_nodes: List[str]
+    last_checkpoint_at: Optional[str] = None
+
+class RevisionRequest(BaseModel):
+    draft_lyrics: Optional[List[LyricLine]] = None  # Edited lyrics to revise instead of the saved ones
+    no_cache: bool = False
+
+async def load_run(run_id: str):
+    """The run's latest checkpoint (StateSnapshot); 404 if checkpoints are off or the run is unknown."""
+    if run_checkpoints.saver is None:
+        raise HTTPException(status_code=404, detail="Run checkpoints are disabled.")
+    graph_app = await load_checkpointed_graph_app()
+    snapshot = await graph_app.aget_state(run_checkpoints.run_config(run_id))
+    if not snapshot.values:
+        raise HTTPException(status_code=404, detail=f"No checkpoint for run '{run_id}' (unknown or expired).")
+    return graph_app, snapshot
+
+@app.get("/runs/{run_id}", response_model=RunStatus)
+async def get_run(run_id: str):
+    """Where a checkpointed run stopped: finished, or the nodes a resume would run next."""
+    _, snapshot = await load_run(run_id)
+    return RunStatus(
+        run_id=run_id,
+        finished=not snapshot.next,
+        next_nodes=list(snapshot.next),
+        last_checkpoint_at=snapshot.created_at,
+    )
+
+@app.post("/runs/{run_id}/resume", response_model=SongResponse)
+async def resume_run(
+    run_id: str,
+    trace: bool = Query(default=False, description="Include the execution timeline of the resumed part."),
+):
+    """
+    Continues a run from its last checkpoint (after a crash, timeout or dropped
+    stream); steps that already finished are not run again. A run that already
+    finished returns its result.
+    """
+    graph_app, snapshot = await load_run(run_id)
+    request = SongRequest(theme=snapshot.values.get("theme", ""), no_cache=await run_checkpoints.no_cache(run_id))
+    if not snapshot.next:
+        return build_song_response(request, snapshot.values, run_id=run_id)
+
+    print(f"--- Resuming run {run_id} at {', '.join(snapshot.next)} ---")
+    timeline = TimelineRecorder()
+    try:
+        async with run_checkpoints.claim(run_id):
+            with bypass_llm_cache(request.no_cache):
+                final_state = await graph_app.ainvoke(None, config=graph_run_config(timeline, run_id))
+    except RunInProgressError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        print(f"!!! Critical Error resuming run {run_id}: {e} !!!")
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Unexpected error resuming run '{run_id}': {str(e)}")
+
+    song = build_song_response(request, final_state, timeline, run_id)
+    return SongResponse(**without_timeline(song.model_dump(mode="json"), trace))
+
+@app.post("/runs/{run_id}/revise", response_model=SongResponse)
+async def revise_run(
+    run_id: str,
+    body: RevisionRequest,
+    trace: bool = Query(default=False, description="Include the per-node execution timeline in results.timeline."),
+):
+    """
+    One more pass over a finished run's lyrics (or the edited ones in the body):
+    a new run enters the graph at REVISE_ENTRY with the saved race info, so
+    research and the first draft are not repeated. Returns the new run's id.
+    """
+    graph_app, snapshot = await load_run(run_id)
+    if snapshot.next:
+        raise HTTPException(status_code=409, detail=f"Run '{run_id}' has not finished; resume it first.")
+    saved = snapshot.values
+    if saved.get("error"):
+        raise HTTPException(status_code=409, detail=f"Run '{run_id}' failed; start a new generation instead.")
+
+    seed: Dict[str, Any] = {
+        **saved,
+        "entry_point": "revise",
+        "lyrics": body.draft_lyrics or saved.get("revised_lyrics") or saved.get("lyrics"),
+        "carlin_critique": None,
+        "revised_lyrics": None,
+        "steps_executed": [],
+        "token_usage": {},
+        "error": None,
+    }
+    request = SongRequest(theme=saved.get("theme", ""), no_cache=body.no_cache)
+    new_run_id = run_checkpoints.new_run_id()
+    await run_checkpoints.register(new_run_id, "revise", source_run_id=run_id, no_cache=body.no_cache)
+    print(f"--- Revising run {run_id} as {new_run_id} from {REVISE_ENTRY} ---")
+
+    timeline = TimelineRecorder()
+    try:
+        async with run_checkpoints.claim(new_run_id):
+            with bypass_llm_cache(body.no_cache):
+                final_state = await graph_app.ainvoke(seed, config=graph_run_config(timeline, new_run_id))
+    except Exception as e:
+        print(f"!!! Critical Error revising run {run_id}: {e} !!!")
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Unexpected error revising run '{run_id}': {str(e)}")
+
+    song = build_song_response(request, final_state, timeline, new_run_id)
+    return SongResponse(**without_timeline(song.model_dump(mode="json"), trace))
@@ -1,31 +1,194 @@
 import os
-from langchain_community.utilities import SerpAPIWrapper
+import json
+import time
+import threading
+from typing import Any, Dict, Optional
 import asyncio # Import asyncio
 
-# Initialize search wrapper once
-search_wrapper = SerpAPIWrapper()
+F1_RESULTS_QUERY = "latest F1 Grand Prix results summary standings key moments"
+F1_ERROR_ASYNC = "Error: Could not fetch F1 results async."
+F1_ERROR_SYNC = "Error: Could not fetch F1 results sync."
 
-async def get_f1_results_async(): # Rename to indicate async
-    """Searches for the latest F1 race results asynchronously."""
-    print("--- Running Tool (Async): get_f1_results ---")
-    try:
-        # Use the async run method
-        results = await search_wrapper.arun("latest F1 Grand Prix results summary standings key moments")
+# Search wrapper is created once, on the first actual fetch (keeps import fast and offline-safe)
+_search_wrapper = None
+
+def get_search_wrapper():
+    global _search_wrapper
+    if _search_wrapper is None:
+        from ..utils.search_endpoint import build_search_wrapper
+        # SERPAPI_BASE_URL points searches at another host (scripts/load_test.py uses a local stub)
+        _search_wrapper = build_search_wrapper(base_url=os.getenv("SERPAPI_BASE_URL"))
+    return _search_wrapper
+
+
+def use_search_wrapper(wrapper):
+    """Replaces SerpAPI with another search wrapper (scripts/bench_graph.py installs its stub)."""
+    global _search_wrapper
+    _search_wrapper = wrapper
+    return _search_wrapper
+
+
+# --- Cached F1 Results (TTL + stale-while-revalidate, persisted to disk) ---
+class F1ResultsCache:
+    """
+    Caches the fixed F1 results query. Fresh values are served directly, stale
+    values are served while a single background refresh runs, and the last good
+    value is written to disk so restarts do not start cold.
+    """
+
+    def __init__(self, cache_path: str, ttl_seconds: float = 6 * 3600, max_stale_seconds: float = 7 * 24 * 3600):
+        self.cache_path = cache_path
+        self.ttl_seconds = ttl_seconds
+        self.max_stale_seconds = max_stale_seconds
+        self.value: Optional[str] = None
+        self.fetched_at: float = 0.0
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._sync_lock = threading.Lock()
+        self._load()
+
+    def age(self) -> float:
+        return time.time() - self.fetched_at
+
+    def is_fresh(self) -> bool:
+        return self.value is not None and self.age() <= self.ttl_seconds
+
+    def is_servable(self) -> bool:
+        return self.value is not None and self.age() <= self.ttl_seconds + self.max_stale_seconds
+
+    async def get(self) -> str:
+        """Returns the cached value, revalidating in the background when stale."""
+        if self.is_fresh():
+            return self.value
+        if self.is_servable():
+            self._schedule_refresh()
+            return self.value
+        return await self.refresh()
+
+    async def refresh(self) -> str:
+        """Fetches now; concurrent callers share one in-flight SerpAPI request."""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._fetch_async())
+        return await asyncio.shield(self._refresh_task)
+
+    def get_sync(self) -> str:
+        """Synchronous read path; stale values trigger a refresh on a daemon thread."""
+        if self.is_fresh():
+            return self.value
+        if self.is_servable():
+            if self._sync_lock.acquire(blocking=False):
+                threading.Thread(target=self._fetch_sync_locked, daemon=True).start()
+            return self.value
+        with self._sync_lock:
+            if self.is_servable():
+                return self.value
+            return self._fetch_sync()
+
+    async def run_scheduled_refresh(self, interval_seconds: float) -> None:
+        """Refreshes on a fixed schedule; started from the FastAPI lifespan."""
+        while True:
+            if not self.is_fresh():
+                await self.refresh()
+            # Wake up just before the value expires; back off to the interval if the fetch failed.
+            delay = min(interval_seconds, self.ttl_seconds - self.age()) if self.is_fresh() else interval_seconds
+            await asyncio.sleep(max(delay, 1.0))
+
+    # --- Helpers ---
+
+    def _schedule_refresh(self) -> None:
+        if self._refresh_task is None or self._refresh_task.done():
+            print("--- F1 results stale: refreshing in background ---")
+            self._refresh_task = asyncio.create_task(self._fetch_async())
+
+    async def _fetch_async(self) -> str:
+        print("--- Running Tool (Async): get_f1_results ---")
+        try:
+            results = await get_search_wrapper().arun(F1_RESULTS_QUERY)
+        except Exception as e:
+            print(f"Error fetching F1 results async: {e}")
+            return self.value if self.value is not None else F1_ERROR_ASYNC
+        self._store(results)
+        return results
+
+    def _fetch_sync_locked(self) -> None:
+        try:
+            self._fetch_sync()
+        finally:
+            self._sync_lock.release()
+
+    def _fetch_sync(self) -> str:
+        print("--- Running Tool (Sync): get_f1_results ---")
+        try:
+            results = get_search_wrapper().run(F1_RESULTS_QUERY)
+        except Exception as e:
+            print(f"Error fetching F1 results sync: {e}")
+            return self.value if self.value is not None else F1_ERROR_SYNC
+        self._store(results)
         return results
-    except Exception as e:
-        print(f"Error fetching F1 results async: {e}")
-        return "Error: Could not fetch F1 results async."
+
+    def _store(self, value: str) -> None:
+        self.value = value
+        self.fetched_at = time.time()
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.cache_path)), exist_ok=True)
+            tmp_path = f"{self.cache_path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump({"query": F1_RESULTS_QUERY, "value": value, "fetched_at": self.fetched_at}, f)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            print(f"Warning: Could not persist F1 results cache: {e}")
+
+    def _load(self) -> None:
+        try:
+            with open(self.cache_path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("query") == F1_RESULTS_QUERY and isinstance(data.get("value"), str):
+            self.value = data["value"]
+            self.fetched_at = float(data.get("fetched_at", 0.0))
+
+
+def build_f1_results_cache(settings: Optional[Dict[str, Any]] = None) -> F1ResultsCache:
+    """Builds the cache from the 'f1_results' config section; env vars take precedence."""
+    settings = settings or {}
+    base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    cache_path = os.getenv("F1_RESULTS_CACHE_PATH", settings.get('cache_path', 'data/f1_results.json'))
+    return F1ResultsCache(
+        cache_path=os.path.join(base_dir, cache_path),
+        ttl_seconds=float(os.getenv("F1_RESULTS_TTL_SECONDS", settings.get('ttl_seconds', 6 * 3600))),
+        max_stale_seconds=float(os.getenv("F1_RESULTS_MAX_STALE_SECONDS", settings.get('max_stale_seconds', 7 * 24 * 3600))),
+    )
+
+# Built (and loaded from disk) on first use, with the settings app.main configured
+_f1_results_cache: Optional[F1ResultsCache] = None
+_f1_results_settings: Optional[Dict[str, Any]] = None
+_f1_results_lock = threading.Lock()
+
+def configure_f1_results_cache(settings: Optional[Dict[str, Any]]) -> None:
+    """Sets the config the cache is built from (called once by app.main, before first use)."""
+    global _f1_results_cache, _f1_results_settings
+    with _f1_results_lock:
+        _f1_results_settings = settings
+        _f1_results_cache = None
+
+def get_f1_results_cache() -> F1ResultsCache:
+    """The shared F1 results cache, built on first access."""
+    global _f1_results_cache
+    if _f1_results_cache is None:
+        with _f1_results_lock:
+            if _f1_results_cache is None:
+                _f1_results_cache = build_f1_results_cache(_f1_results_settings)
+    return _f1_results_cache
+
+
+async def get_f1_results_async(): # Rename to indicate async
+    """Returns the latest F1 race results, served from the TTL cache."""
+    return await get_f1_results_cache().get()
 
 # Keep the synchronous version if needed elsewhere, or remove it
 def get_f1_results_sync():
     """Synchronous version for potential non-async use cases."""
-    print("--- Running Tool (Sync): get_f1_results ---")
-    try:
-        results = search_wrapper.run("latest F1 Grand Prix results summary standings key moments")
-        return results
-    except Exception as e:
-        print(f"Error fetching F1 results sync: {e}")
-        return "Error: Could not fetch F1 results sync."
+    return get_f1_results_cache().get_sync()
 
 # --- Test function (optional) ---
 async def test_async_search():
@@ -38,4 +201,4 @@ async def test_async_search():
 if __name__ == '__main__':
     import nest_asyncio
     nest_asyncio.apply()
-    asyncio.run(test_async_search())
\ No newline at end of file
+    asyncio.run(test_async_search())
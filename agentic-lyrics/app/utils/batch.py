@@ -0,0 +1,88 @@
+# app/utils/batch.py
+
+import asyncio
+import json
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict
+
+NDJSON_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def ndjson_line(data: Dict[str, Any]) -> str:
+    """One newline-delimited JSON record."""
+    return json.dumps(data, default=str) + "\n"
+
+
+class SharedFetches:
+    """
+    Batch-local memo of expensive fetches (research, race data): the first
+    item asking for a key starts the fetch and every later item with the same
+    key awaits that one task, whether it is still running or done. A failed
+    fetch fails every item that shares it.
+    """
+
+    def __init__(self):
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self.requested = 0
+
+    async def get(self, key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        self.requested += 1
+        task = self._tasks.get(key)
+        if task is None:
+            task = self._tasks[key] = asyncio.create_task(fetch())
+            # Mark the outcome as retrieved even if every item waiting on it was cancelled
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        # Shielded: one item being cancelled does not cancel the fetch the others share
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, int]:
+        return {"fetches": len(self._tasks), "reused": self.requested - len(self._tasks)}
+
+
+async def stream_batch(
+    count: int,
+    run_item: Callable[[int], Awaitable[Dict[str, Any]]],
+    concurrency: int,
+    shared: SharedFetches,
+) -> AsyncIterator[str]:
+    """
+    Runs run_item(0..count-1) with at most `concurrency` in flight and yields
+    one NDJSON line per item in completion order ({"index", "status": "ok",
+    **fields} or {"index", "status": "error", "error"}), then a summary line
+    ({"status": "done", ...}). One failed item does not stop the others; a
+    client that disconnects cancels whatever is still queued or running.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    started = time.perf_counter()
+
+    async def one(index: int) -> Dict[str, Any]:
+        async with semaphore:
+            item_started = time.perf_counter()
+            try:
+                fields = await run_item(index)
+                line: Dict[str, Any] = {"index": index, "status": "ok", **fields}
+            except Exception as e:
+                print(f"!!! Batch item {index} failed: {e} !!!")
+                line = {"index": index, "status": "error", "error": str(getattr(e, "detail", e))}
+            line["elapsed_ms"] = round((time.perf_counter() - item_started) * 1000, 1)
+            return line
+
+    tasks = [asyncio.create_task(one(index)) for index in range(count)]
+    failed = 0
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            line = await next_done
+            failed += line["status"] == "error"
+            yield ndjson_line(line)
+        yield ndjson_line({
+            "status": "done",
+            "count": count,
+            "ok": count - failed,
+            "errors": failed,
+            "shared": shared.stats(),
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+        })
+    finally:
+        # Shared fetches are left to finish: a /generate call may have joined an item's run
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,49 @@
+# app/utils/llm.py
+
+import threading
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+# --- Shared Chat Model Registry ---
+# One ChatGoogleGenerativeAI per (model, temperature, options): each instance owns a
+# Gemini client and its connections, so every node and request reuses them.
+_chat_models: Dict[Tuple[Any, ...], "ChatGoogleGenerativeAI"] = {}
+_chat_models_lock = threading.Lock()
+# (model, temperature) -> stand-in chat model; scripts/bench_graph.py installs its scripted model
+_stand_in_factory: Optional[Callable[[str, Optional[float]], Any]] = None
+
+def use_stand_in_chat_models(factory: Callable[[str, Optional[float]], Any]) -> None:
+    """Chat models created from now on come from factory(model, temperature) instead of Gemini."""
+    global _stand_in_factory
+    _stand_in_factory = factory
+
+def get_chat_model(
+    model: str,
+    google_api_key: str,
+    temperature: Optional[float] = None,
+    **options: Any,
+) -> "ChatGoogleGenerativeAI":
+    """Returns the shared Gemini chat model for these settings, creating it on first use."""
+    key = (model, temperature, tuple(sorted(options.items())))
+    with _chat_models_lock:
+        chat_model = _chat_models.get(key)
+        if chat_model is None:
+            print(f"--- Creating shared chat model: {model} (temperature={temperature}) ---")
+            if _stand_in_factory is not None:
+                chat_model = _stand_in_factory(model, temperature)
+                _chat_models[key] = chat_model
+                return chat_model
+            from langchain_google_genai import ChatGoogleGenerativeAI  # Deferred: the Gemini SDK is slow to import
+
+            if temperature is not None:
+                options["temperature"] = temperature
+            chat_model = ChatGoogleGenerativeAI(model=model, google_api_key=google_api_key, **options)
+            _chat_models[key] = chat_model
+        return chat_model
+
+def registered_chat_models() -> List[Dict[str, Any]]:
+    """Describes the shared chat models, for the debug endpoint."""
+    with _chat_models_lock:
+        return [{"model": key[0], "temperature": key[1], "options": dict(key[2])} for key in _chat_models]
@@ -0,0 +1,180 @@
+# app/utils/llm_cache.py
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.load import dumps, loads
+
+# Per-request opt-out; contextvars follow the request into LangGraph tasks and executor threads.
+_bypass_cache: ContextVar[bool] = ContextVar("llm_cache_bypass", default=False)
+
+
+@contextmanager
+def bypass_llm_cache(enabled: bool = True) -> Iterator[None]:
+    """Skips cache reads and writes for every LLM call made inside the block."""
+    token = _bypass_cache.set(enabled)
+    try:
+        yield
+    finally:
+        _bypass_cache.reset(token)
+
+
+def cache_key(prompt: str, llm_string: str) -> str:
+    """Content address for a call: rendered messages + model name + sampling params."""
+    return hashlib.sha256(f"{llm_string}\x00{prompt}".encode("utf-8")).hexdigest()
+
+
+def _tag_hit(value: RETURN_VAL_TYPE, tier: str) -> RETURN_VAL_TYPE:
+    """Copies of the cached generations marked with the tier they came from (read by the request timeline)."""
+    return [gen.model_copy(update={"generation_info": {**(gen.generation_info or {}), "llm_cache": tier}}) for gen in value]
+
+
+class TieredLLMCache(BaseCache):
+    """LangChain LLM cache with an in-memory LRU tier in front of a SQLite tier.
+
+    The SQLite file uses the same schema in both services, so pointing them at
+    one path (e.g. a shared volume) lets replays hit across services.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        memory_entries: int = 256,
+        max_entries: int = 5000,
+        ttl_seconds: float = 7 * 24 * 3600,
+    ):
+        self.db_path = db_path
+        self.memory_entries = memory_entries
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        self._memory: "OrderedDict[str, Tuple[float, RETURN_VAL_TYPE]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "writes": 0,
+            "bypassed": 0,
+            "evictions": 0,
+        }
+
+        db_dir = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(db_dir, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            " key TEXT PRIMARY KEY,"
+            " llm_string TEXT NOT NULL,"
+            " value TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed ON llm_cache (accessed_at)")
+        self._conn.commit()
+
+    # --- LangChain BaseCache interface ---
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        """Returns cached generations for this exact call, or None on a miss."""
+        if _bypass_cache.get():
+            self.stats["bypassed"] += 1
+            return None
+
+        key = cache_key(prompt, llm_string)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created_at, value = entry
+                if now - created_at <= self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    self.stats["memory_hits"] += 1
+                    return _tag_hit(value, "memory")
+                del self._memory[key]
+
+            row = self._conn.execute(
+                "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                self.stats["misses"] += 1
+                return None
+
+            try:
+                value = [loads(item) for item in json.loads(row[0])]
+            except Exception as e:
+                print(f"!!! LLM cache entry {key[:12]} could not be decoded, ignoring: {e} !!!")
+                self.stats["misses"] += 1
+                return None
+
+            self._conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self._remember(key, row[1], value)
+            self.stats["disk_hits"] += 1
+            return _tag_hit(value, "disk")
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        """Stores generations in both tiers and applies TTL/size eviction."""
+        if _bypass_cache.get():
+            return
+
+        key = cache_key(prompt, llm_string)
+        now = time.time()
+        value = json.dumps([dumps(gen) for gen in return_val])
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, llm_string, value, created_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, llm_string, value, now, now),
+            )
+            self._evict(now)
+            self._conn.commit()
+            self._remember(key, now, list(return_val))
+            self.stats["writes"] += 1
+
+    def clear(self, **kwargs: Any) -> None:
+        """Drops every entry from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+    # --- Helpers ---
+
+    def _remember(self, key: str, created_at: float, value: RETURN_VAL_TYPE) -> None:
+        self._memory[key] = (created_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict(self, now: float) -> None:
+        expired = self._conn.execute(
+            "DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl_seconds,)
+        ).rowcount
+        overflow = self._conn.execute(
+            "DELETE FROM llm_cache WHERE key IN ("
+            " SELECT key FROM llm_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        ).rowcount
+        self.stats["evictions"] += max(expired, 0) + max(overflow, 0)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Counters plus derived hit ratio, for debug endpoints and metrics."""
+        with self._lock:
+            stats = dict(self.stats)
+            stats["memory_entries"] = len(self._memory)
+            stats["disk_entries"] = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_ratio"] = round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 4) if lookups else 0.0
+        return stats
+
@@ -0,0 +1,168 @@
+# app/utils/lyric_stream.py
+
+import json
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple, Type, Union
+
+from langchain_core.exceptions import OutputParserException
+from langchain_core.messages import BaseMessage
+from langchain_core.output_parsers import BaseTransformOutputParser
+from pydantic import BaseModel, ValidationError
+
+# Filled in for keys a model leaves out (or gets wrong), as the old JSON parsing did
+LINE_DEFAULTS = {"source": "machine", "section": "[verse 1]"}
+
+
+class IncrementalLyricDecoder:
+    """
+    Scans model output for a top-level JSON array and returns each element as a
+    validated model the moment its closing brace arrives. Text before the '['
+    (e.g. a ```json fence) is ignored. A missing or invalid source/section
+    falls back to LINE_DEFAULTS; only elements that are not objects or have no
+    `line` text are skipped.
+    """
+
+    def __init__(self, model_cls: Type[BaseModel]):
+        self.model_cls = model_cls
+        self.lines: List[BaseModel] = []
+        self.rejected: List[str] = []
+        self.complete = False
+        self._started = False
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._buffer: List[str] = []
+
+    def feed(self, text: str) -> List[BaseModel]:
+        """Consumes a chunk of text and returns the lines completed by it."""
+        completed: List[BaseModel] = []
+        for ch in text:
+            if self.complete:
+                break
+            if not self._started:
+                self._started = ch == "["
+                continue
+
+            if self._depth == 0:
+                # Between array elements: only an object start or the array end matter
+                if ch == "{":
+                    self._depth = 1
+                    self._buffer = [ch]
+                elif ch == "]":
+                    self.complete = True
+                continue
+
+            self._buffer.append(ch)
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    line = self._validate("".join(self._buffer))
+                    if line is not None:
+                        self.lines.append(line)
+                        completed.append(line)
+        return completed
+
+    def _validate(self, raw: str) -> Optional[BaseModel]:
+        try:
+            data = json.loads(raw)
+        except ValueError as e:
+            return self._reject(raw, str(e))
+        if not isinstance(data, dict) or not isinstance(data.get("line"), str):
+            return self._reject(raw, "no 'line' text")
+
+        fields = {**LINE_DEFAULTS, **{key: value for key, value in data.items() if value is not None}}
+        try:
+            return self.model_cls.model_validate(fields)
+        except ValidationError as e:
+            # Keep the line: invalid fields (e.g. source "ai") get their defaults
+            bad = {error["loc"][0] for error in e.errors() if error["loc"] and error["loc"][0] in LINE_DEFAULTS}
+            if not bad:
+                return self._reject(raw, str(e))
+            print(f"!!! Lyric line has invalid {', '.join(sorted(bad))}; using defaults !!!")
+        try:
+            return self.model_cls.model_validate({**fields, **{key: LINE_DEFAULTS[key] for key in bad}})
+        except ValidationError as e:
+            return self._reject(raw, str(e))
+
+    def _reject(self, raw: str, reason: str) -> None:
+        print(f"!!! Skipping malformed lyric line from stream: {reason} !!!")
+        self.rejected.append(raw)
+        return None
+
+
+class SectionGrouper:
+    """Groups consecutive lines by section as they arrive; a section closes when the next one starts."""
+
+    def __init__(self):
+        self._section: Optional[str] = None
+        self._lines: List[Any] = []
+
+    def add(self, line: Any) -> Optional[Tuple[str, List[Any]]]:
+        """Adds a line and returns the (section, lines) it closed, if any."""
+        closed = None
+        if self._lines and line.section != self._section:
+            closed = (self._section, self._lines)
+            self._lines = []
+        self._section = line.section
+        self._lines.append(line)
+        return closed
+
+    def flush(self) -> Optional[Tuple[str, List[Any]]]:
+        """Returns the still-open section at end of stream."""
+        if not self._lines:
+            return None
+        closed = (self._section, self._lines)
+        self._section, self._lines = None, []
+        return closed
+
+
+def _chunk_text(chunk: Union[str, BaseMessage]) -> str:
+    if isinstance(chunk, BaseMessage):
+        return chunk.content if isinstance(chunk.content, str) else ""
+    return chunk
+
+
+class LyricLineStreamParser(BaseTransformOutputParser[List[Dict[str, Any]]]):
+    """
+    Drop-in replacement for JsonOutputParser(pydantic_object=List[LyricLine]).
+    invoke() returns the full list of line dicts; streaming yields one-element
+    lists as each line closes, so the streamed chunks add up to the invoke() result.
+    """
+
+    model_cls: Type[BaseModel]
+
+    @property
+    def _type(self) -> str:
+        return "lyric_line_stream"
+
+    def parse(self, text: str) -> List[Dict[str, Any]]:
+        decoder = IncrementalLyricDecoder(self.model_cls)
+        decoder.feed(text)
+        # "[]" is a valid (empty) answer; no array at all, or a cut-off one with no lines, is not
+        if not decoder.lines and not decoder.complete:
+            raise OutputParserException("No valid lyric lines found in model output.", llm_output=text)
+        return [line.model_dump() for line in decoder.lines]
+
+    def _transform(self, input: Iterator[Union[str, BaseMessage]]) -> Iterator[List[Dict[str, Any]]]:
+        decoder = IncrementalLyricDecoder(self.model_cls)
+        for chunk in input:
+            for line in decoder.feed(_chunk_text(chunk)):
+                yield [line.model_dump()]
+
+    async def _atransform(
+        self, input: AsyncIterator[Union[str, BaseMessage]]
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        decoder = IncrementalLyricDecoder(self.model_cls)
+        async for chunk in input:
+            for line in decoder.feed(_chunk_text(chunk)):
+                yield [line.model_dump()]
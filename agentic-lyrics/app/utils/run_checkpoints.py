@@ -0,0 +1,170 @@
+# app/utils/run_checkpoints.py
+
+import os
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Set
+
+
+class RunInProgressError(Exception):
+    """Raised when a run is resumed while it is still executing in this process."""
+
+
+class RunCheckpoints:
+    """
+    Durable graph checkpoints keyed by run id: a LangGraph AsyncSqliteSaver
+    (one thread per run, a checkpoint after every superstep) plus a small
+    `runs` index used for retention. A run that crashed or timed out can be
+    resumed from its last checkpoint, and a finished run's state seeds
+    follow-up revisions without repeating research and drafting.
+
+    The saver needs the running event loop, so it is opened in the app
+    lifespan; until then (or when disabled) graphs run without checkpoints.
+    `state_types` are the app's own classes stored in graph state; only they
+    (and LangGraph's built-in safe types) are deserialized from checkpoints.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        retention_seconds: float = 7 * 24 * 3600,
+        enabled: bool = True,
+        state_types: Iterable[type] = (),
+    ):
+        self.db_path = db_path
+        self.retention_seconds = retention_seconds
+        self.enabled = enabled
+        self.state_types = list(state_types)
+        self.saver: Optional[Any] = None
+        self._conn: Optional[Any] = None
+        self._attached: Dict[int, Any] = {}
+        self._active: Set[str] = set()
+
+    async def open(self) -> None:
+        if not self.enabled or self.saver is not None:
+            return
+        # Deferred: aiosqlite and the saver are only needed once checkpointing is on
+        import aiosqlite
+        from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+        from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self._conn = await aiosqlite.connect(self.db_path, timeout=10)
+        await self._conn.execute("PRAGMA journal_mode=WAL")
+        await self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS runs ("
+            " run_id TEXT PRIMARY KEY,"
+            " kind TEXT NOT NULL,"
+            " source_run_id TEXT,"
+            " no_cache INTEGER NOT NULL DEFAULT 0,"
+            " created_at REAL NOT NULL)"
+        )
+        async with self._conn.execute("PRAGMA table_info(runs)") as cursor:
+            columns = {row[1] for row in await cursor.fetchall()}
+        if "no_cache" not in columns:
+            # Indexes written before the option was kept; those runs resume with the cache on
+            await self._conn.execute("ALTER TABLE runs ADD COLUMN no_cache INTEGER NOT NULL DEFAULT 0")
+        await self._conn.commit()
+        serde = JsonPlusSerializer(
+            allowed_msgpack_modules=[(cls.__module__, cls.__name__) for cls in self.state_types]
+        )
+        saver = AsyncSqliteSaver(self._conn, serde=serde)
+        await saver.setup()
+        self.saver = saver
+        pruned = await self.prune()
+        print(f"--- Run checkpoints at {self.db_path} ({pruned} expired runs pruned) ---")
+
+    async def close(self) -> None:
+        if self._conn is not None:
+            await self._conn.close()
+        self._conn = None
+        self.saver = None
+        self._attached.clear()
+
+    def attach(self, graph: Any) -> Any:
+        """The compiled graph with the saver as its checkpointer (the graph itself while closed)."""
+        if self.saver is None:
+            return graph
+        attached = self._attached.get(id(graph))
+        if attached is None:
+            attached = self._attached[id(graph)] = graph.copy(update={"checkpointer": self.saver})
+        return attached
+
+    # --- Runs ---
+
+    @staticmethod
+    def new_run_id() -> str:
+        return uuid.uuid4().hex
+
+    @staticmethod
+    def run_config(run_id: str) -> Dict[str, Any]:
+        """Config fragment selecting the run's checkpoint thread."""
+        return {"configurable": {"thread_id": run_id}}
+
+    async def steps(self, graph: Any, run_id: str) -> List[str]:
+        """Nodes the run's checkpoints record as finished, oldest first (one superstep's parallel nodes together)."""
+        history = [snapshot async for snapshot in graph.aget_state_history(self.run_config(run_id))]
+        steps: List[str] = []
+        # Each checkpoint's `next` ran before the one after it; the latest checkpoint's has not run yet
+        for snapshot in reversed(history[1:]):
+            steps.extend(node for node in snapshot.next if not node.startswith("__"))
+        return steps
+
+    async def register(
+        self, run_id: str, kind: str, source_run_id: Optional[str] = None, no_cache: bool = False
+    ) -> None:
+        """
+        Indexes a new run ("generate" | "revise") for retention, with the
+        request's no_cache so a resume bypasses the LLM cache too; expired runs
+        are pruned on the way.
+        """
+        if self._conn is None:
+            return
+        await self._conn.execute(
+            "INSERT OR IGNORE INTO runs (run_id, kind, source_run_id, no_cache, created_at) VALUES (?, ?, ?, ?, ?)",
+            (run_id, kind, source_run_id, int(no_cache), time.time()),
+        )
+        await self._conn.commit()
+        await self.prune()
+
+    async def no_cache(self, run_id: str) -> bool:
+        """Whether the run was started with no_cache (False for unindexed runs)."""
+        if self._conn is None:
+            return False
+        async with self._conn.execute("SELECT no_cache FROM runs WHERE run_id = ?", (run_id,)) as cursor:
+            row = await cursor.fetchone()
+        return bool(row and row[0])
+
+    async def prune(self) -> int:
+        """Deletes checkpoints of runs older than the retention window."""
+        if self._conn is None or self.saver is None:
+            return 0
+        cutoff = time.time() - self.retention_seconds
+        async with self._conn.execute("SELECT run_id FROM runs WHERE created_at < ?", (cutoff,)) as cursor:
+            expired: List[str] = [row[0] for row in await cursor.fetchall() if row[0] not in self._active]
+        for run_id in expired:
+            await self.saver.adelete_thread(run_id)
+            await self._conn.execute("DELETE FROM runs WHERE run_id = ?", (run_id,))
+        if expired:
+            await self._conn.commit()
+        return len(expired)
+
+    @asynccontextmanager
+    async def claim(self, run_id: str) -> AsyncIterator[None]:
+        """Marks a run as executing in this process, so it is not resumed twice at once."""
+        if run_id in self._active:
+            raise RunInProgressError(f"Run {run_id} is still executing.")
+        self._active.add(run_id)
+        try:
+            yield
+        finally:
+            self._active.discard(run_id)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "open": self.saver is not None,
+            "path": self.db_path,
+            "active_runs": len(self._active),
+        }
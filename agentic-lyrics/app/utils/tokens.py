@@ -0,0 +1,33 @@
+# app/utils/tokens.py
+
+import math
+import re
+
+# Words, numbers and single punctuation marks: roughly how BPE tokenizers split English lyrics
+_PIECE_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Local token estimate without loading a model tokenizer. Takes the larger of
+    the piece count and chars/4, which tracks Llama/Mistral tokenizers closely
+    enough for budgeting (it errs high on long words).
+    """
+    if not text:
+        return 0
+    return max(len(_PIECE_RE.findall(text)), math.ceil(len(text) / 4))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, marker: str = "…") -> str:
+    """Cuts text at a piece boundary so estimate_tokens(result) stays within max_tokens."""
+    if max_tokens <= 0:
+        return ""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    max_tokens -= estimate_tokens(marker)
+    end = 0
+    for count, match in enumerate(_PIECE_RE.finditer(text), start=1):
+        if count > max_tokens or math.ceil(match.end() / 4) > max_tokens:
+            break
+        end = match.end()
+    return text[:end].rstrip() + marker
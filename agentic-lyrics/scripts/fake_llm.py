@@ -0,0 +1,238 @@
+# scripts/fake_llm.py
+
+import asyncio
+import hashlib
+import json
+import random
+import re
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from app.utils.tokens import estimate_tokens
+
+SECTION_LIST_RE = re.compile(r"rewrite ONLY these sections:\s*([^\n]+)")
+DEFAULT_SECTIONS = ["[verse 1]", "[chorus]", "[verse 2]", "[chorus]"]
+
+
+def _seeded(text: str, seed: int) -> random.Random:
+    digest = hashlib.sha256(f"{seed}\x00{text}".encode("utf-8")).digest()
+    return random.Random(int.from_bytes(digest[:8], "big"))
+
+
+def _prompt_text(messages: Sequence[BaseMessage]) -> str:
+    return "\n".join(m.content if isinstance(m.content, str) else json.dumps(m.content) for m in messages)
+
+
+def _json_arrays(text: str) -> List[List[Any]]:
+    """Every JSON array of objects embedded in the prompt (the human lines / target lines)."""
+    decoder = json.JSONDecoder()
+    arrays: List[List[Any]] = []
+    index = text.find("[{")
+    while index != -1:
+        try:
+            value, end = decoder.raw_decode(text, index)
+            if isinstance(value, list):
+                arrays.append(value)
+            index = text.find("[{", end)
+        except ValueError:
+            index = text.find("[{", index + 2)
+    return arrays
+
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Deterministic in-process stand-in for ChatOllama / ChatGoogleGenerativeAI.
+    The reply depends only on the prompt: lyric prompts get a JSON array that
+    keeps every human line, tool-bound (structured output) calls get schema-
+    shaped arguments, anything else gets a short note. `latency_seconds`
+    (+/- `jitter_seconds`, seeded by the prompt) is slept per call and spread
+    over the chunks when streaming, so graph overhead can be measured apart
+    from model time. Each reply reports its simulated latency in
+    response_metadata["simulated_latency"].
+    """
+
+    model: str = "scripted"
+    latency_seconds: float = 0.0
+    jitter_seconds: float = 0.0
+    score: float = 0.7
+    chunk_count: int = 8
+    seed: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-fake"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"model": self.model, "score": self.score, "seed": self.seed}
+
+    def bind_tools(self, tools: Sequence[Any], tool_choice: Optional[Any] = None, **kwargs: Any):
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], **kwargs)
+
+    # --- Generation ---
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        message, delay = self._reply(messages, kwargs.get("tools"))
+        time.sleep(delay)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        message, delay = self._reply(messages, kwargs.get("tools"))
+        await asyncio.sleep(delay)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        message, delay = self._reply(messages, kwargs.get("tools"))
+        for chunk in self._chunks(message, delay):
+            time.sleep(delay / self.chunk_count)
+            if run_manager and chunk.message.content:
+                run_manager.on_llm_new_token(chunk.message.content, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        message, delay = self._reply(messages, kwargs.get("tools"))
+        for chunk in self._chunks(message, delay):
+            await asyncio.sleep(delay / self.chunk_count)
+            if run_manager and chunk.message.content:
+                await run_manager.on_llm_new_token(chunk.message.content, chunk=chunk)
+            yield chunk
+
+    # --- Scripted replies ---
+
+    def _reply(self, messages: List[BaseMessage], tools: Optional[List[Dict[str, Any]]]):
+        prompt = _prompt_text(messages)
+        rng = _seeded(prompt, self.seed)
+        delay = max(0.0, self.latency_seconds + rng.uniform(-self.jitter_seconds, self.jitter_seconds))
+
+        tool_calls: List[Dict[str, Any]] = []
+        if tools:
+            function = tools[0]["function"]
+            schema = function.get("parameters", {})
+            tool_calls = [{"name": function["name"], "args": self._fill(schema, schema.get("$defs", {}), function["name"]), "id": "call_scripted_0", "type": "tool_call"}]
+            content = ""
+        elif "JSON array" in prompt:
+            content = json.dumps(self._lyrics(prompt, rng), separators=(",", ":"))
+        else:
+            content = f"PASS: scripted note #{rng.randint(1, 999)}. Escalate the chorus punchline and cut the lazy rhyme."
+
+        message = AIMessage(
+            content=content,
+            tool_calls=tool_calls,
+            response_metadata={"model": self.model, "simulated_latency": delay},
+            usage_metadata={
+                "input_tokens": estimate_tokens(prompt),
+                "output_tokens": estimate_tokens(content or json.dumps([c["args"] for c in tool_calls])),
+                "total_tokens": estimate_tokens(prompt) + estimate_tokens(content or json.dumps([c["args"] for c in tool_calls])),
+            },
+        )
+        return message, delay
+
+    def _lyrics(self, prompt: str, rng: random.Random) -> List[Dict[str, str]]:
+        human_lines = [
+            item for array in _json_arrays(prompt) for item in array
+            if isinstance(item, dict) and item.get("source") == "human" and "line" in item
+        ]
+        match = SECTION_LIST_RE.search(prompt)
+        sections = [s.strip() for s in match.group(1).split(",")] if match else DEFAULT_SECTIONS
+
+        lines: List[Dict[str, str]] = []
+        placed = set()
+        for number, section in enumerate(sections):
+            if section not in placed:
+                # Human lines go once, into the first section carrying their tag
+                placed.add(section)
+                lines.extend(
+                    {"line": item["line"], "source": "human", "section": section}
+                    for item in human_lines if item.get("section", "[verse 1]") == section
+                )
+            lines.extend(
+                {"line": f"Scripted line {number}.{i} take {rng.randint(1, 99)}", "source": "machine", "section": section}
+                for i in range(4)
+            )
+        # Human lines in sections the script did not write are kept as well
+        lines.extend(item for item in human_lines if item.get("section", "[verse 1]") not in placed)
+        return lines
+
+    def _fill(self, schema: Dict[str, Any], defs: Dict[str, Any], name: str) -> Any:
+        """Deterministic value for a JSON schema: scores get `score`, flags True, lists one item."""
+        if "$ref" in schema:
+            return self._fill(defs.get(schema["$ref"].split("/")[-1], {}), defs, name)
+        if "anyOf" in schema:
+            options = [option for option in schema["anyOf"] if option.get("type") != "null"]
+            return self._fill(options[0] if options else {}, defs, name)
+        kind = schema.get("type")
+        if kind == "object":
+            return {key: self._fill(value, defs, key) for key, value in schema.get("properties", {}).items()}
+        if kind == "array":
+            return [self._fill(schema.get("items", {}), defs, name)]
+        if kind == "number":
+            return self.score
+        if kind == "integer":
+            return 1
+        if kind == "boolean":
+            return True
+        return f"Scripted {name.replace('_', ' ')}"
+
+    def _chunks(self, message: AIMessage, delay: float) -> Iterator[ChatGenerationChunk]:
+        content = message.content
+        size = max(1, -(-len(content) // self.chunk_count)) if content else 1
+        pieces = [content[i:i + size] for i in range(0, len(content), size)] if content else []
+        pieces += [""] * (self.chunk_count - len(pieces))
+        for index, piece in enumerate(pieces):
+            last = index == len(pieces) - 1
+            yield ChatGenerationChunk(message=AIMessageChunk(
+                content=piece,
+                tool_call_chunks=[
+                    {"name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": i}
+                    for i, call in enumerate(message.tool_calls)
+                ] if last else [],
+                response_metadata=message.response_metadata if last else {},
+                usage_metadata=message.usage_metadata if last else None,
+            ))
+
+
+class FakeSearchTool:
+    """Stand-in for SerpAPIWrapper: canned, query-dependent results after a simulated delay."""
+
+    def __init__(self, latency_seconds: float = 0.0, seed: int = 0):
+        self.latency_seconds = latency_seconds
+        self.seed = seed
+
+    def _facts(self, query: str) -> List[str]:
+        rng = _seeded(query, self.seed)
+        return [f"Scripted fact {i} about '{query}': figure {rng.randint(10, 999)} from source {rng.randint(1, 9)}." for i in range(5)]
+
+    def _results(self, query: str) -> str:
+        return " ".join(self._facts(query))
+
+    def _serp_json(self, query: str) -> Dict[str, Any]:
+        """The facts as a SerpAPI response (organic results), as results()/aresults() return it."""
+        return {
+            "search_metadata": {"status": "Success"},
+            "search_parameters": {"q": query, "engine": "google"},
+            "organic_results": [
+                {"position": i + 1, "title": f"Result {i + 1} for {query}", "link": f"https://example.com/{i + 1}", "snippet": fact}
+                for i, fact in enumerate(self._facts(query))
+            ],
+        }
+
+    def run(self, query: str, **kwargs: Any) -> str:
+        time.sleep(self.latency_seconds)
+        return self._results(query)
+
+    async def arun(self, query: str, **kwargs: Any) -> str:
+        await asyncio.sleep(self.latency_seconds)
+        return self._results(query)
+
+    def results(self, query: str) -> Dict[str, Any]:
+        time.sleep(self.latency_seconds)
+        return self._serp_json(query)
+
+    async def aresults(self, query: str) -> Dict[str, Any]:
+        await asyncio.sleep(self.latency_seconds)
+        return self._serp_json(query)
@@ -0,0 +1,152 @@
+# scripts/graph_bench.py
+
+import json
+import os
+import statistics
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+Interval = Tuple[float, float]
+
+
+def _union_seconds(intervals: List[Interval]) -> float:
+    """Length of the union of time intervals (parallel model calls are not double counted)."""
+    total = 0.0
+    end = float("-inf")
+    for start, stop in sorted(intervals):
+        if stop <= end:
+            continue
+        total += stop - max(start, end)
+        end = stop
+    return total
+
+
+def _simulated_interval(output: Any, ended: float) -> Optional[Interval]:
+    metadata = getattr(output, "response_metadata", None) or {}
+    latency = metadata.get("simulated_latency")
+    return (ended - latency, ended) if latency is not None else None
+
+
+async def profile_graph(app: Any, state: Dict[str, Any], config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Runs the compiled graph once through astream_events and splits wall time
+    into model time (the scripted models' simulated latency) and overhead
+    (everything else: prompt building, parsing, state merges, scheduling),
+    end to end and per node.
+    """
+    node_starts: Dict[str, Tuple[str, float]] = {}
+    node_wall: Dict[str, float] = {}
+    node_calls: Dict[str, int] = {}
+    model_intervals: Dict[str, List[Interval]] = {}
+    all_intervals: List[Interval] = []
+
+    started = time.perf_counter()
+    async for event in app.astream_events(state, config=config or {}, version="v2"):
+        now = time.perf_counter()
+        node = (event.get("metadata") or {}).get("langgraph_node")
+        if not node or node.startswith("__"):  # "__start__" runs as a node when the entry point routes
+            continue
+        kind = event["event"]
+        # Node runs are direct children of the graph run (nested runnables may share the node's name)
+        if kind == "on_chain_start" and event["name"] == node and len(event.get("parent_ids", [])) == 1:
+            node_starts[event["run_id"]] = (node, now)
+        elif kind == "on_chain_end" and event["run_id"] in node_starts:
+            node, node_started = node_starts.pop(event["run_id"])
+            node_wall[node] = node_wall.get(node, 0.0) + now - node_started
+            node_calls[node] = node_calls.get(node, 0) + 1
+        elif kind in ("on_chat_model_end", "on_llm_end"):
+            interval = _simulated_interval(event["data"].get("output"), now)
+            if interval:
+                model_intervals.setdefault(node, []).append(interval)
+                all_intervals.append(interval)
+    wall = time.perf_counter() - started
+
+    nodes = {}
+    for node, seconds in node_wall.items():
+        model = _union_seconds(model_intervals.get(node, []))
+        nodes[node] = {"calls": node_calls[node], "wall": seconds, "model": model, "overhead": max(0.0, seconds - model)}
+    model = _union_seconds(all_intervals)
+    return {"wall": wall, "model": model, "overhead": max(0.0, wall - model), "nodes": nodes}
+
+
+async def profile_node(runnable: Any, state: Dict[str, Any]) -> Dict[str, Any]:
+    """Runs one node's runnable alone on a state and splits its wall time the same way."""
+    from langchain_core.runnables import RunnableLambda
+
+    async def call_node(node_state: Dict[str, Any], config: Dict[str, Any]) -> Any:
+        return await runnable.ainvoke(node_state, config)
+
+    # Graph nodes are built untraced; the wrapper gives their model calls a parent run to report to
+    traced = RunnableLambda(call_node, name="node")
+    intervals: List[Interval] = []
+    started = time.perf_counter()
+    async for event in traced.astream_events(state, version="v2"):
+        if event["event"] in ("on_chat_model_end", "on_llm_end"):
+            interval = _simulated_interval(event["data"].get("output"), time.perf_counter())
+            if interval:
+                intervals.append(interval)
+    wall = time.perf_counter() - started
+    model = _union_seconds(intervals)
+    return {"calls": 1, "wall": wall, "model": model, "overhead": max(0.0, wall - model)}
+
+
+def summarize(runs: List[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    """Median milliseconds per metric: "graph" for the end-to-end runs, "node:<name>" per node."""
+    def median_ms(values: List[float]) -> float:
+        return round(statistics.median(values) * 1000, 2) if values else 0.0
+
+    summary = {"graph": {key: median_ms([run[key] for run in runs]) for key in ("wall", "model", "overhead")}}
+    for node in sorted({node for run in runs for node in run["nodes"]}):
+        samples = [run["nodes"][node] for run in runs if node in run["nodes"]]
+        summary[f"node:{node}"] = {
+            "calls": statistics.median([s["calls"] for s in samples]),
+            **{key: median_ms([s[key] for s in samples]) for key in ("wall", "model", "overhead")},
+        }
+    return summary
+
+
+def print_summary(title: str, summary: Dict[str, Dict[str, float]], baseline: Optional[Dict[str, Dict[str, float]]] = None) -> None:
+    print(f"--- {title} (median ms) ---")
+    print(f"{'metric':<28}{'calls':>7}{'wall':>10}{'model':>10}{'overhead':>10}{'baseline':>10}")
+    for metric, values in summary.items():
+        base = (baseline or {}).get(metric, {}).get("overhead")
+        print(
+            f"{metric:<28}{values.get('calls', 1):>7}{values['wall']:>10}{values['model']:>10}"
+            f"{values['overhead']:>10}{base if base is not None else '-':>10}"
+        )
+
+
+def find_regressions(
+    summary: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    max_regression: float,
+    min_delta_ms: float,
+) -> List[str]:
+    """
+    Metrics whose overhead grew by more than max_regression (a fraction) over
+    the baseline and by at least min_delta_ms, so sub-millisecond noise on
+    fast nodes does not fail the run.
+    """
+    regressions = []
+    for metric, values in summary.items():
+        base = baseline.get(metric, {}).get("overhead")
+        if base is None:
+            continue
+        delta = values["overhead"] - base
+        if delta >= min_delta_ms and values["overhead"] > base * (1 + max_regression):
+            regressions.append(f"{metric}: overhead {values['overhead']} ms vs baseline {base} ms (+{round(delta, 2)} ms)")
+    return regressions
+
+
+def load_baseline(path: str) -> Optional[Dict[str, Dict[str, float]]]:
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_baseline(path: str, summary: Dict[str, Dict[str, float]]) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(summary, f, indent=2, sort_keys=True)
@@ -0,0 +1,175 @@
+# scripts/stub_backends.py
+
+import asyncio
+import json
+import time
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+
+from scripts.fake_llm import FakeSearchTool, ScriptedChatModel
+
+
+class StubSettings:
+    """Simulated latency of the stub backends (seconds); per-call jitter is seeded by the prompt."""
+
+    def __init__(self, llm_latency: float = 0.5, llm_jitter: float = 0.1, search_latency: float = 0.3, chunk_count: int = 8):
+        self.llm_latency = llm_latency
+        self.llm_jitter = llm_jitter
+        self.search_latency = search_latency
+        self.chunk_count = chunk_count
+
+
+def _ndjson(payload: Dict[str, Any]) -> bytes:
+    return (json.dumps(payload) + "\n").encode("utf-8")
+
+
+def _sse(payload: Dict[str, Any]) -> bytes:
+    return f"data: {json.dumps(payload)}\r\n\r\n".encode("utf-8")
+
+
+def _pieces(content: str, count: int) -> List[str]:
+    if not content:
+        return [""]
+    size = max(1, -(-len(content) // count))
+    return [content[i:i + size] for i in range(0, len(content), size)]
+
+
+def build_stub_app(settings: StubSettings) -> FastAPI:
+    """
+    One local server speaking the three upstream protocols the services call:
+    Ollama POST /api/chat (NDJSON stream or single JSON), Gemini
+    :generateContent / :streamGenerateContent (SSE) and SerpAPI GET /search.
+    Replies come from the scripted model, so lyrics keep human lines and
+    structured output matches the requested schema; latency is slept with
+    asyncio, spread over the chunks when streaming.
+    """
+    app = FastAPI(title="Stub LLM and search backends")
+    model = ScriptedChatModel(latency_seconds=settings.llm_latency, jitter_seconds=settings.llm_jitter)
+    search = FakeSearchTool()
+    counters = {"ollama_chat": 0, "gemini": 0, "serpapi": 0}
+
+    def reply(messages: List[BaseMessage], schema: Optional[Dict[str, Any]], tools: Optional[List[Dict[str, Any]]]) -> Tuple[AIMessage, float]:
+        if schema is not None:
+            tools = [{"function": {"name": "output", "parameters": schema}}]
+        message, delay = model._reply(messages, tools)
+        if schema is not None:
+            message = AIMessage(content=json.dumps(message.tool_calls[0]["args"]), usage_metadata=message.usage_metadata)
+        return message, delay
+
+    # --- Ollama ---
+
+    @app.post("/api/chat")
+    async def ollama_chat(request: Request):
+        body = await request.json()
+        counters["ollama_chat"] += 1
+        kinds = {"system": SystemMessage, "user": HumanMessage, "assistant": AIMessage}
+        messages = [kinds.get(m.get("role"), HumanMessage)(content=m.get("content") or "") for m in body.get("messages", [])]
+        schema = body.get("format") if isinstance(body.get("format"), dict) else None
+        message, delay = reply(messages, schema, body.get("tools"))
+        usage = message.usage_metadata or {}
+
+        def frame(content: str, done: bool, tool_calls: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+            payload: Dict[str, Any] = {
+                "model": body.get("model", "stub"),
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "message": {"role": "assistant", "content": content},
+                "done": done,
+            }
+            if tool_calls:
+                payload["message"]["tool_calls"] = tool_calls
+            if done:
+                payload.update({
+                    "done_reason": "stop",
+                    "total_duration": int(delay * 1e9),
+                    "prompt_eval_count": usage.get("input_tokens", 0),
+                    "eval_count": usage.get("output_tokens", 0),
+                })
+            return payload
+
+        tool_calls = [{"function": {"name": c["name"], "arguments": c["args"]}} for c in message.tool_calls]
+        if not body.get("stream", True):
+            await asyncio.sleep(delay)
+            return JSONResponse(frame(message.content, True, tool_calls))
+
+        async def stream() -> AsyncIterator[bytes]:
+            pieces = _pieces(message.content, settings.chunk_count)
+            for piece in pieces:
+                await asyncio.sleep(delay / len(pieces))
+                yield _ndjson(frame(piece, False))
+            yield _ndjson(frame("", True, tool_calls))
+
+        return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+    @app.get("/api/tags")
+    async def ollama_tags():
+        return {"models": []}
+
+    # --- Gemini ---
+
+    @app.post("/{version}/models/{model_action:path}")
+    async def gemini_generate(version: str, model_action: str, request: Request):
+        body = await request.json()
+        counters["gemini"] += 1
+        model_name, _, action = model_action.partition(":")
+        messages: List[BaseMessage] = []
+        system = body.get("systemInstruction") or body.get("system_instruction")
+        if system:
+            messages.append(SystemMessage(content="".join(p.get("text", "") for p in system.get("parts", []))))
+        for content in body.get("contents", []):
+            text = "".join(p.get("text", "") for p in content.get("parts", []))
+            messages.append(AIMessage(content=text) if content.get("role") == "model" else HumanMessage(content=text))
+        config = body.get("generationConfig") or {}
+        schema = config.get("responseJsonSchema") or config.get("responseSchema")
+        declarations = [d for tool in body.get("tools", []) for d in tool.get("functionDeclarations", [])]
+        tools = [{"function": {"name": d["name"], "parameters": d.get("parametersJsonSchema") or d.get("parameters") or {}}} for d in declarations]
+        message, delay = reply(messages, schema, tools or None)
+        usage = message.usage_metadata or {}
+
+        def frame(parts: List[Dict[str, Any]], done: bool) -> Dict[str, Any]:
+            candidate: Dict[str, Any] = {"content": {"role": "model", "parts": parts}, "index": 0}
+            if done:
+                candidate["finishReason"] = "STOP"
+            return {
+                "candidates": [candidate],
+                "usageMetadata": {
+                    "promptTokenCount": usage.get("input_tokens", 0),
+                    "candidatesTokenCount": usage.get("output_tokens", 0),
+                    "totalTokenCount": usage.get("total_tokens", 0),
+                },
+                "modelVersion": model_name,
+            }
+
+        calls = [{"functionCall": {"name": c["name"], "args": c["args"]}} for c in message.tool_calls]
+        if action != "streamGenerateContent":
+            await asyncio.sleep(delay)
+            return JSONResponse(frame(calls or [{"text": message.content}], True))
+
+        async def stream() -> AsyncIterator[bytes]:
+            pieces = _pieces(message.content, settings.chunk_count)
+            for index, piece in enumerate(pieces):
+                await asyncio.sleep(delay / len(pieces))
+                last = index == len(pieces) - 1
+                yield _sse(frame((calls if last and calls else []) + ([{"text": piece}] if piece else []), last))
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    # --- SerpAPI ---
+
+    @app.get("/search")
+    @app.get("/search.json")
+    async def serpapi_search(q: str = ""):
+        counters["serpapi"] += 1
+        await asyncio.sleep(settings.search_latency)
+        response = search._serp_json(q)
+        response["search_metadata"]["created_at"] = time.strftime("%Y-%m-%d %H:%M:%S UTC", time.gmtime())
+        return response
+
+    @app.get("/stub/stats")
+    async def stub_stats():
+        return {"requests": dict(counters)}
+
+    return app
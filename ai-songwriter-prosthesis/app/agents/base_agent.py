@@ -2,17 +2,14 @@
 
 from typing import Dict, Any
 from app.graph.state import SongWritingState
-from app.utils.llm import OLLAMA_BASE_URL, search_tool  # Import URL and tool
+from app.config import PROMPT_TOKEN_BUDGETS
+from app.utils.llm import get_chat_model  # Shared model registry
+from app.utils.prompt_budget import PromptBudget
 from app.utils.prompt_manager import prompt_manager
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_ollama import ChatOllama  # Import here for per-agent creation
+from langchain_core.runnables import RunnableLambda
 
-# Phoenix OTel instrumentation (global, runs on import—traces all models)
-from phoenix.otel import register
-from openinference.instrumentation.langchain import LangChainInstrumentor
-
-tracer_provider = register()  # Configures Phoenix as OTel exporter
-LangChainInstrumentor().instrument(tracer_provider=tracer_provider)
+# Phoenix OTel instrumentation now runs from the app lifespan (app/utils/tracing.py)
 
 # Model mapping for dynamic loading (creative vs. research tasks) - FIXED: Swapped for better specialization
 MODEL_MAP = {
@@ -20,6 +17,9 @@ MODEL_MAP = {
     "research": "mistral-nemo:12b"  # Precise, low-hallucination for facts/critique
 }
 
+# Per-node prompt budgets and token accounting (see /debug/tokens)
+prompt_budget = PromptBudget(PROMPT_TOKEN_BUDGETS)
+
 class BaseAgent:
     """Foundational class for all agents to enforce node signature and centralize config."""
     
@@ -29,21 +29,9 @@ class BaseAgent:
         # Select model based on task_type (loads dynamically in Ollama)
         model_name = MODEL_MAP.get(task_type, MODEL_MAP["creative"])  # Default to creative
         
-        # Create model fresh with temperature in constructor (puts it in options; no bind/kwarg leak)
-        if use_tools:
-            # Research: Low temp for factual (overrides task_type if needed)
-            self.llm = ChatOllama(
-                model=model_name,
-                base_url=OLLAMA_BASE_URL,
-                temperature=0.2
-            )
-        else:
-            # Creative: Agent-specific temp
-            self.llm = ChatOllama(
-                model=model_name,
-                base_url=OLLAMA_BASE_URL,
-                temperature=temperature  # e.g., 0.9 for collaborator, 0.8 for YesAnd
-            )
+        # Shared model from the registry (temperature lives in the model options; no bind/kwarg leak)
+        # Research agents with tools run low temp for factual output
+        self.llm = get_chat_model(model_name, temperature=0.2 if use_tools else temperature)
             
         self.system_prompt_key = f"{self.agent_name.lower()}_system"
         self.human_prompt_key = f"{self.agent_name.lower()}_human"
@@ -52,6 +40,13 @@ class BaseAgent:
         """Retrieves prompt dynamically and handles potential missing keys."""
         return prompt_manager.get_prompt(key)
 
-    def __call__(self, state: SongWritingState) -> Dict[str, Any]:
-        """The mandatory LangGraph Node signature method."""
-        raise NotImplementedError(f"Agent {self.agent_name} must implement the __call__ method.")
\ No newline at end of file
+    async def acall(self, state: SongWritingState) -> Dict[str, Any]:
+        """The native async LangGraph node; agents await ainvoke/arun here."""
+        raise NotImplementedError(f"Agent {self.agent_name} must implement the acall method.")
+
+    def as_node(self) -> RunnableLambda:
+        """
+        Graph node backed by acall. The workflow is async-only (ainvoke/astream):
+        the shared chat clients and the model scheduler belong to the app's event loop.
+        """
+        return RunnableLambda(self.acall, name=self.agent_name)
\ No newline at end of file
@@ -1,47 +1,31 @@
 # ==============================================================================
 # --- app/agents/brainstorm.py ---
 # ==============================================================================
-from app.agents.base_agent import BaseAgent
+from app.agents.base_agent import BaseAgent, prompt_budget
 from app.graph.state import SongWritingState
+from app.utils.prompt_budget import PromptPart
 from typing import Dict, Any
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_ollama import ChatOllama
-import json
-
-# --- Helper Function to Extract Plain Lyrics ---
-def extract_plain_lyrics(draft_lyrics_json_str: str) -> str:
-    """Extracts a simple, readable string from the structured lyrics JSON."""
-    if not draft_lyrics_json_str:
-        return "No current draft."
-    try:
-        lyrics_list = json.loads(draft_lyrics_json_str)
-        # Join only the 'line' field
-        return "\n".join([item.get('line', '') for item in lyrics_list if isinstance(item, dict)])
-    except:
-        # Fallback if it's not structured JSON
-        return draft_lyrics_json_str
-# --- End Helper Function ---
 
 
 # --- 1. AI_YesAnd Agent ---
 class YesAndAgent(BaseAgent):
     def __init__(self):
         super().__init__(agent_name="YesAnd", task_type="creative", use_tools=False, temperature=0.8)
-        # Override for creative amp-up
-        self.llm = ChatOllama(
-            model="llama3.1:8b",
-            base_url="http://host.docker.internal:11434",
-            temperature=0.8
-        )
 
-    def __call__(self, state: SongWritingState) -> Dict[str, Any]:
+    async def acall(self, state: SongWritingState) -> Dict[str, Any]:
         """Provides positive brainstorming feedback."""
         
-        plain_lyrics = extract_plain_lyrics(state['draft_lyrics'])
+        plain_lyrics = state['draft_lyrics'].plain_text or "No current draft."
         
         system_prompt = self._get_prompt_template(self.system_prompt_key)
-        human_prompt = self._get_prompt_template(self.human_prompt_key).format(
-            draft_lyrics=plain_lyrics
+        human_prompt_template = self._get_prompt_template(self.human_prompt_key)
+        prompt = prompt_budget.fit("yes_and", [
+            PromptPart("system", system_prompt),
+            PromptPart("draft", plain_lyrics, priority=1, min_tokens=200),
+        ], template=human_prompt_template)
+        human_prompt = human_prompt_template.format(
+            draft_lyrics=prompt["draft"]
         )
         chain = ChatPromptTemplate.from_messages([
             ("system", system_prompt),
@@ -49,33 +33,32 @@ class YesAndAgent(BaseAgent):
         ]) | self.llm
         
         try:
-            response = chain.invoke({})
+            response = await chain.ainvoke({})
             new_feedback = f"POSITIVE: {response.content}"
-            return {"feedback": [new_feedback]}
+            return {"feedback": [new_feedback], "token_usage": {"yes_and": prompt.tokens}}
             
         except Exception as e:
             error_feedback = f"POSITIVE: Feedback generation failed - {str(e)}"
-            return {"feedback": [error_feedback]}
+            return {"feedback": [error_feedback], "token_usage": {"yes_and": prompt.tokens}}
 
 # --- 2. AI_NoBut Agent ---
 class NoButAgent(BaseAgent):
     def __init__(self):
         super().__init__(agent_name="NoBut", task_type="research", use_tools=False, temperature=0.6)
-        # Override for balanced critique (factual base)
-        self.llm = ChatOllama(
-            model="mistral-nemo:12b",
-            base_url="http://host.docker.internal:11434",
-            temperature=0.6
-        )
 
-    def __call__(self, state: SongWritingState) -> Dict[str, Any]:
+    async def acall(self, state: SongWritingState) -> Dict[str, Any]:
         """Provides critical, actionable feedback."""
         
-        plain_lyrics = extract_plain_lyrics(state['draft_lyrics'])
+        plain_lyrics = state['draft_lyrics'].plain_text or "No current draft."
 
         system_prompt = self._get_prompt_template(self.system_prompt_key)
-        human_prompt = self._get_prompt_template(self.human_prompt_key).format(
-            draft_lyrics=plain_lyrics
+        human_prompt_template = self._get_prompt_template(self.human_prompt_key)
+        prompt = prompt_budget.fit("no_but", [
+            PromptPart("system", system_prompt),
+            PromptPart("draft", plain_lyrics, priority=1, min_tokens=200),
+        ], template=human_prompt_template)
+        human_prompt = human_prompt_template.format(
+            draft_lyrics=prompt["draft"]
         )
         chain = ChatPromptTemplate.from_messages([
             ("system", system_prompt),
@@ -83,34 +66,33 @@ class NoButAgent(BaseAgent):
         ]) | self.llm
         
         try:
-            response = chain.invoke({})
+            response = await chain.ainvoke({})
             new_feedback = f"CRITICAL: {response.content}"
-            return {"feedback": [new_feedback]}
+            return {"feedback": [new_feedback], "token_usage": {"no_but": prompt.tokens}}
             
         except Exception as e:
             error_feedback = f"CRITICAL: Feedback generation failed - {str(e)}"
-            return {"feedback": [error_feedback]}
+            return {"feedback": [error_feedback], "token_usage": {"no_but": prompt.tokens}}
 
 # --- 3. AI_NonSequitur Agent (Lateral Thinking) ---
 class NonSequiturAgent(BaseAgent):
     
     def __init__(self):
         super().__init__(agent_name="NonSequitur", task_type="creative", use_tools=False, temperature=1.0)
-        # Override for chaos via creativity
-        self.llm = ChatOllama(
-            model="llama3.1:8b",
-            base_url="http://host.docker.internal:11434",
-            temperature=1.0
-        )
 
-    def __call__(self, state: SongWritingState) -> Dict[str, Any]:
+    async def acall(self, state: SongWritingState) -> Dict[str, Any]:
         """Generates a random, unrelated input to spark lateral thinking."""
         
-        plain_lyrics = extract_plain_lyrics(state['draft_lyrics'])
+        plain_lyrics = state['draft_lyrics'].plain_text or "No current draft."
         
         system_prompt = self._get_prompt_template(self.system_prompt_key) 
-        human_prompt = self._get_prompt_template(self.human_prompt_key).format(
-            current_draft=plain_lyrics
+        human_prompt_template = self._get_prompt_template(self.human_prompt_key)
+        prompt = prompt_budget.fit("non_sequitur", [
+            PromptPart("system", system_prompt),
+            PromptPart("draft", plain_lyrics, priority=1, min_tokens=200),
+        ], template=human_prompt_template)
+        human_prompt = human_prompt_template.format(
+            current_draft=prompt["draft"]
         )
         
         chain = ChatPromptTemplate.from_messages([
@@ -119,10 +101,10 @@ class NonSequiturAgent(BaseAgent):
         ]) | self.llm
         
         try:
-            response = chain.invoke({})
+            response = await chain.ainvoke({})
             new_feedback = f"LATERAL INPUT (Random): {response.content}"
-            return {"feedback": [new_feedback]}
+            return {"feedback": [new_feedback], "token_usage": {"non_sequitur": prompt.tokens}}
             
         except Exception as e:
             error_feedback = f"LATERAL INPUT (Random): Generation failed - {str(e)}"
-            return {"feedback": [error_feedback]}
\ No newline at end of file
+            return {"feedback": [error_feedback], "token_usage": {"non_sequitur": prompt.tokens}}
\ No newline at end of file
@@ -1,103 +1,165 @@
 # ==============================================================================
 # --- app/agents/collaborator.py ---
 # ==============================================================================
-from app.agents.base_agent import BaseAgent
+from app.agents.base_agent import BaseAgent, prompt_budget
 from app.graph.state import SongWritingState
+from app.config import (
+    FEEDBACK_MAX_ITEM_TOKENS,
+    FEEDBACK_MAX_ITEMS,
+    FEEDBACK_SUMMARY_ENABLED,
+    FEEDBACK_TOKEN_BUDGET,
+    REVISION_MODE,
+)
+from app.utils.feedback import FeedbackWindow
+from app.utils.prompt_budget import PromptPart
+from app.utils.lyric_stream import LyricLineStreamParser
+from app.utils.revision import Block, find_target_blocks, splice_blocks
+from app.utils.song_document import SongDocument, SongLine
+from langchain_core.messages import HumanMessage, SystemMessage
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import JsonOutputParser
-from langchain_ollama import ChatOllama
-from pydantic import BaseModel, Field
-from typing import Dict, Any, List, Literal
+from typing import Dict, Any, List, Set
 import json
 
-# --- Pydantic Model for Structured Output (MUST match API model) ---
-class LyricLine(BaseModel):
-    """Defines the required output structure for each lyric line."""
-    line: str = Field(..., description="The text of the lyric line.")
-    source: Literal["human", "machine"] = Field(..., description="The origin of the line.")
-    section: str = Field(..., description="Song section (e.g., '[verse 1]', '[chorus]').")
-# --- End Pydantic Model ---
-
 
 class CollaboratorAgent(BaseAgent):
     
     def __init__(self):
         super().__init__(agent_name="Collaborator", task_type="creative", use_tools=False, temperature=0.9)
-        # Override for satirical escalation
-        self.llm = ChatOllama(
-            model="llama3.1:8b",
-            base_url="http://host.docker.internal:11434",
-            temperature=0.9
+        # Validates each line as its JSON object closes, so streamed runs emit lines early;
+        # SongLine fills in a missing source/section, as the old API-side fix did
+        self.json_parser = LyricLineStreamParser(model_cls=SongLine)
+        # Keeps the feedback part of the prompt a fixed size however much the other agents wrote
+        self.feedback_window = FeedbackWindow(
+            token_budget=FEEDBACK_TOKEN_BUDGET,
+            max_items=FEEDBACK_MAX_ITEMS,
+            max_item_tokens=FEEDBACK_MAX_ITEM_TOKENS,
+            summarize=FEEDBACK_SUMMARY_ENABLED,
         )
-        self.json_parser = JsonOutputParser(pydantic_object=List[LyricLine])
-
-    def _prepare_draft_input(self, draft_lyrics_str: str) -> List[Dict[str, str]]:
-        """Converts the raw string draft_lyrics from the initial state into structured 'human' lines."""
-        if not draft_lyrics_str or draft_lyrics_str.lower() in ("none (initial draft)", "none"):
-            return []
-            
-        # If the lyrics are already structured JSON (from a previous revision), return them.
-        try:
-            parsed_lyrics = json.loads(draft_lyrics_str)
-            if isinstance(parsed_lyrics, list) and all('line' in item for item in parsed_lyrics):
-                return parsed_lyrics
-        except:
-            pass # Not structured JSON, proceed to treat as raw human input.
 
-        lines = [line.strip() for line in draft_lyrics_str.split('\n') if line.strip()]
-        
-        # Structure the raw human-provided lines for the initial prompt
-        structured_human_lines = [
-            LyricLine(line=line, source="human", section="[verse 1]").model_dump()
-            for line in lines
-        ]
-        return structured_human_lines
-
-    def __call__(self, state: SongWritingState) -> Dict[str, Any]:
+    def _build_chain(self, system_prompt: str, human_prompt: str):
+        # Pre-rendered prompts go in as message objects: the JSON braces in them are not template variables
+        return ChatPromptTemplate.from_messages([
+            SystemMessage(content=system_prompt),
+            HumanMessage(content=human_prompt)
+        ]) | self.llm | self.json_parser # Force JSON output
+
+    async def acall(self, state: SongWritingState) -> Dict[str, Any]:
         """Implements the core logic for drafting and revising lyrics."""
         
-        all_feedback = state.get('feedback', []) + state.get('critic_suggestions', [])
-        feedback_str = "\n- " + "\n- ".join(all_feedback) if all_feedback else "No feedback provided yet."
+        feedback_str = self.feedback_window.render(state.get('critic_suggestions', []), state.get('feedback', []))
+
+        # 1. The draft is already structured (the request's human lines on the first pass)
+        draft: SongDocument = state['draft_lyrics']
 
-        # 1. Prepare structured human/draft lines for the prompt
-        structured_draft = self._prepare_draft_input(state['draft_lyrics'])
-        structured_draft_json = json.dumps(structured_draft, indent=2)
+        # Section mode: when the critics pointed at specific sections, regenerate only those
+        if REVISION_MODE == "section" and state['revision_number'] > 0 and draft:
+            blocks = draft.blocks()
+            targets = find_target_blocks(
+                blocks, state.get('critic_suggestions', []), state.get('critic_target_sections', [])
+            )
+            if targets and len(targets) < len(blocks):
+                return await self._revise_sections(state, draft, blocks, targets, feedback_str)
+
+        structured_draft_json = json.dumps(draft.to_dicts(), separators=(",", ":"))
 
         system_prompt = self._get_prompt_template(self.system_prompt_key)
         human_prompt_template = self._get_prompt_template(self.human_prompt_key)
+
+        # Over budget, facts are trimmed first, then feedback; the draft (with its human lines) never is
+        prompt = prompt_budget.fit("collaborator", [
+            PromptPart("system", system_prompt),
+            PromptPart("inspiration", state['inspiration']),
+            PromptPart("draft", structured_draft_json),
+            PromptPart("facts", "\n".join(state['original_facts']), priority=2, min_tokens=40),
+            PromptPart("feedback", feedback_str, priority=1, min_tokens=60),
+        ], template=human_prompt_template)
         
         human_prompt = human_prompt_template.format(
             revision_number=state['revision_number'] + 1,
-            inspiration=state['inspiration'],
-            original_facts="\n".join(state['original_facts']),
+            inspiration=prompt["inspiration"],
+            original_facts=prompt["facts"],
             # Pass the structured lines for the agent to include/preserve
-            human_lines_json=structured_draft_json, 
-            feedback_and_suggestions=feedback_str
+            human_lines_json=prompt["draft"], 
+            feedback_and_suggestions=prompt["feedback"]
         )
 
-        chain = ChatPromptTemplate.from_messages([
-            ("system", system_prompt),
-            ("human", human_prompt)
-        ]) | self.llm | self.json_parser # Force JSON output
+        chain = self._build_chain(system_prompt, human_prompt)
         
         try:
-            # Invoke chain, which returns a List[Dict]
-            new_lyrics_list = chain.invoke({})
-
-            # Store the structured list as a JSON string in the state
-            new_lyrics_str = json.dumps(new_lyrics_list) 
+            # Invoke chain, which returns a List[Dict] of validated lines
+            new_draft = SongDocument.from_lines(await chain.ainvoke({}))
         except Exception as e:
             print(f"!!! Collaborator JSON parsing failed: {e} !!!")
-            new_lyrics_str = state['draft_lyrics'] # Revert to last known good draft
-            if not new_lyrics_str: 
-                new_lyrics_str = f"Drafting/Revision failed (JSON error): {str(e)}"
+            new_draft = draft # Revert to last known good draft
+            if not new_draft:
+                new_draft = SongDocument.from_lines([{"line": f"Drafting/Revision failed (JSON error): {str(e)}"}])
+
+        return self._revision_update(state, new_draft, revised_sections=[], prompt_tokens=prompt.tokens)
+
+    async def _revise_sections(
+        self,
+        state: SongWritingState,
+        draft: SongDocument,
+        blocks: List[Block],
+        targets: Set[int],
+        feedback_str: str,
+    ) -> Dict[str, Any]:
+        """Regenerates the target sections and splices them into the draft; other sections are carried over as-is."""
+        target_sections: List[str] = []
+        target_lines: List[Dict[str, Any]] = []
+        for i in sorted(targets):
+            section, block_lines = blocks[i]
+            if section not in target_sections:  # Repeated choruses are written once and reused
+                target_sections.append(section)
+                target_lines.extend(block_lines)
+        print(f"[COLLABORATOR] Section revision: {', '.join(target_sections)} ({len(targets)} of {len(blocks)} sections)")
+
+        system_prompt = self._get_prompt_template(self.system_prompt_key)
+        human_prompt_template = self._get_prompt_template("collaborator_section_human")
+        prompt = prompt_budget.fit("collaborator", [
+            PromptPart("system", system_prompt),
+            PromptPart("inspiration", state['inspiration']),
+            PromptPart("draft", draft.numbered_text),
+            PromptPart("target_lines", json.dumps(target_lines, separators=(",", ":"))),
+            PromptPart("facts", "\n".join(state['original_facts']), priority=2, min_tokens=40),
+            PromptPart("feedback", feedback_str, priority=1, min_tokens=60),
+        ], template=human_prompt_template)
+
+        human_prompt = human_prompt_template.format(
+            revision_number=state['revision_number'] + 1,
+            inspiration=prompt["inspiration"],
+            original_facts=prompt["facts"],
+            target_sections=", ".join(target_sections),
+            song_text=prompt["draft"],
+            target_lines_json=prompt["target_lines"],
+            feedback_and_suggestions=prompt["feedback"]
+        )
+        chain = self._build_chain(system_prompt, human_prompt)
+
+        try:
+            new_lines = await chain.ainvoke({})
+        except Exception as e:
+            print(f"!!! Collaborator section revision failed, keeping the current draft: {e} !!!")
+            new_lines = []
+
+        spliced, replaced = splice_blocks(blocks, targets, new_lines)
+        return self._revision_update(
+            state, SongDocument.from_lines(spliced), revised_sections=sorted(set(replaced)), prompt_tokens=prompt.tokens
+        )
 
+    def _revision_update(
+        self, state: SongWritingState, new_draft: SongDocument, revised_sections: List[str], prompt_tokens: Dict[str, int]
+    ) -> Dict[str, Any]:
         # Clear iteration-specific state keys upon revision start
         return {
-            "draft_lyrics": new_lyrics_str, # The structured JSON string
+            "draft_lyrics": new_draft,
             "revision_number": state['revision_number'] + 1,
-            "feedback": [],
-            "critic_suggestions": [],
+            "feedback": None,  # None resets the append reducers
+            "critic_suggestions": None,
             "critic_scores": {},
+            "qa_checks": None,
             "qa_status": False,
-        }
\ No newline at end of file
+            "critic_target_sections": [],
+            "revised_sections": revised_sections,
+            "token_usage": {"collaborator": prompt_tokens},
+        }
@@ -1,14 +1,16 @@
 # ==============================================================================
 # --- app/agents/critics.py ---
 # ==============================================================================
-from app.agents.base_agent import BaseAgent
+from app.agents.base_agent import BaseAgent, MODEL_MAP, prompt_budget
+from app.config import CRITIC_MODE
+from app.utils.llm import get_chat_model
+from app.utils.prompt_budget import PromptPart, add_tokens
 from app.graph.state import SongWritingState
+from langchain_core.messages import HumanMessage, SystemMessage
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.runnables import RunnableParallel
 from pydantic import BaseModel, Field
 from typing import Dict, Any, List
-from langchain_ollama import ChatOllama
-import json
 
 # --- Pydantic Schema for Structured Output ---
 class CriticScoresOutput(BaseModel):
@@ -31,88 +33,78 @@ class CriticScoresOutput(BaseModel):
     verdict: str = Field(
         description="A concise ensemble verdict like 'Yes, this is funny as hell and it's factual' or 'No, creative but inaccurate—revise.'"
     )
-# --- Helper Function (Copied for local use) ---
-def extract_plain_lyrics_critics(draft_lyrics_json_str: str) -> str:
-    """Extracts a simple, readable string from the structured lyrics JSON."""
-    if not draft_lyrics_json_str:
-        return "No current draft."
-    try:
-        lyrics_list = json.loads(draft_lyrics_json_str)
-        return "\n".join([item.get('line', '') for item in lyrics_list if isinstance(item, dict)])
-    except:
-        return draft_lyrics_json_str
-# --- End Helper Function ---
+    target_sections: List[str] = Field(
+        default_factory=list,
+        description="Section tags from the draft (e.g. '[chorus]', '[verse 2]') that the suggestions apply to. Empty if the whole song needs rework."
+    )
 
+# --- Critic Prompts ---
+CREATIVE_EVAL_SYSTEM = "Lonely Island comedian: Score humor (0-1) and creativity (0-1) for satirical escalation and wit."
+FACTUAL_EVAL_SYSTEM = "Fact-checker: Score freshness (0-1) for originality, check facts (true/false), and suggest fixes."
+DECISION_SYSTEM = """You are a decision-maker. Review creative eval (humor/creativity) and factual eval (freshness/QA).
+            Output JSON with scores, fact_check_pass, suggestions (2-3 items), and verdict like: "Yes, this is funny as hell and it's factual" or "No, revise [issue]".
+            Name the sections the suggestions target in target_sections (e.g. "[chorus]") and cite line numbers in suggestions where useful. Use the schema."""
 
-class CriticsAgent(BaseAgent):
-    
-    def __init__(self):
-        super().__init__(agent_name="Critics", task_type="research", use_tools=False, temperature=0.3)
-        # Override for grounded scoring/QA
-        self.llm = ChatOllama(
-            model="mistral-nemo:12b",
-            base_url="http://host.docker.internal:11434",
-            temperature=0.3
-        )
 
-    def __call__(self, state: SongWritingState) -> Dict[str, Any]:
-        """Scores Creativity, Freshness, Humor, and provides structured suggestions with ensemble verdict."""
-        
-        # 1. Prepare input: Convert JSON to plain text for the critic prompt
-        plain_lyrics = extract_plain_lyrics_critics(state['draft_lyrics'])
-        
-        system_prompt = self._get_prompt_template("critics_system")
-        human_prompt_template = self._get_prompt_template("critics_human")
+class CreativeEval(BaseModel):
+    """Structured creative eval (used by the 'agree' critic mode)."""
+    humor: float = Field(description="Score from 0.0 to 1.0 for comedic timing and escalation.")
+    creativity: float = Field(description="Score from 0.0 to 1.0 for inventive twists and concepts.")
+    suggestions: List[str] = Field(description="1-2 specific suggestions for humor or creativity.")
+    target_sections: List[str] = Field(default_factory=list, description="Section tags the suggestions apply to.")
 
-        formatted_human = human_prompt_template.format(
-            draft_lyrics=plain_lyrics,
-            inspiration=state['inspiration']
-        )
 
-        # Ensemble: Parallel creative (humor/creativity) and factual (freshness/QA) evals
-        creative_llm = ChatOllama(model="llama3.1:8b", base_url="http://host.docker.internal:11434", temperature=0.7)
-        factual_llm = ChatOllama(model="mistral-nemo:12b", base_url="http://host.docker.internal:11434", temperature=0.3)
+class FactualEval(BaseModel):
+    """Structured factual/freshness eval (used by the 'agree' critic mode)."""
+    freshness: float = Field(description="Score from 0.0 to 1.0 for originality; 1.0 means no clichés.")
+    fact_check_pass: bool = Field(description="True if the lyrics are factually correct or plausible.")
+    suggestions: List[str] = Field(description="1-2 specific fixes for facts or clichés.")
+    target_sections: List[str] = Field(default_factory=list, description="Section tags the suggestions apply to.")
 
-        creative_prompt = ChatPromptTemplate.from_messages([
-            ("system", "Lonely Island comedian: Score humor (0-1) and creativity (0-1) for satirical escalation and wit."),
-            ("human", formatted_human)
-        ])
-        factual_prompt = ChatPromptTemplate.from_messages([
-            ("system", "Fact-checker: Score freshness (0-1) for originality, check facts (true/false), and suggest fixes."),
-            ("human", formatted_human)
-        ])
 
-        # Parallel chains
-        parallel_eval = RunnableParallel(
-            creative=(creative_prompt | creative_llm),
-            factual=(factual_prompt | factual_llm)
-        )
-        results = parallel_eval.invoke({})
+# Critic modes (CRITIC_MODE): model calls per revision and round-trips on the critical path
+#   ensemble: creative + factual evals in parallel, then a decision call      (3 calls, 2 round-trips)
+#   agree:    structured evals in parallel; decision call only if they disagree (2-3 calls, 1-2 round-trips)
+#   single:   one structured call produces CriticScoresOutput directly          (1 call, 1 round-trip)
+CRITIC_MODES = ("ensemble", "agree", "single")
 
-        # Synthesize verdict with factual_llm
-        decision_prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are a decision-maker. Review creative eval (humor/creativity) and factual eval (freshness/QA).
-            Output JSON with scores, fact_check_pass, suggestions (2-3 items), and verdict like: "Yes, this is funny as hell and it's factual" or "No, revise [issue]". Use the schema."""),
-            ("human", f"Creative eval: {results['creative'].content}\nFactual eval: {results['factual'].content}")
-        ])
 
-        critic_chain = decision_prompt | self.llm.with_structured_output(schema=CriticScoresOutput)
+class CriticsAgent(BaseAgent):
+    
+    def __init__(self, mode: str = CRITIC_MODE):
+        super().__init__(agent_name="Critics", task_type="research", use_tools=False, temperature=0.3)
+        if mode not in CRITIC_MODES:
+            print(f"Warning: Unknown CRITIC_MODE '{mode}', using 'ensemble'.")
+            mode = "ensemble"
+        self.mode = mode
+
+    async def acall(self, state: SongWritingState) -> Dict[str, Any]:
+        """Scores Creativity, Freshness, Humor, and provides structured suggestions with a verdict."""
+        
+        # Prompt tokens summed over every model call this pass makes
+        usage: Dict[str, int] = {}
 
-        # 3. Execution
+        # 1. Execution (each mode builds its prompts through _eval_prompt / _decide)
         try:
-            result: CriticScoresOutput = critic_chain.invoke({})
+            if self.mode == "single":
+                result = await self._critique_single(state, usage)
+            elif self.mode == "agree":
+                result = await self._critique_agree(state, usage)
+            else:
+                result = await self._critique_ensemble(state, usage)
         except Exception as e:
             print(f"Critics Agent failed to parse output: {e}")
             return {
                 "critic_scores": {"creativity": 0.0, "freshness": 0.0, "humor": 0.0},
                 "critic_suggestions": ["CRITICAL: Critic scoring failed. Review LLM output."],
-                "qa_status": False,
+                "qa_checks": {"critics": False},
+                "critic_target_sections": [],
+                "token_usage": {"critics": usage},
             }
 
-        # 4. State Update
-        # Combine new suggestions with existing feedback for the next cycle.
-        combined_feedback = state.get("feedback", []) + result.suggestions
-        
+        # 2. State Update
+        # Deltas only: runs in parallel with fact_check; the collaborator reads
+        # feedback and critic_suggestions together on the next cycle.
         return {
             "critic_scores": {
                 "creativity": result.creativity, 
@@ -120,6 +112,84 @@ class CriticsAgent(BaseAgent):
                 "humor": result.humor,
             },
             "critic_suggestions": result.suggestions,
-            "feedback": combined_feedback, 
-            "qa_status": result.fact_check_pass,
-        }
\ No newline at end of file
+            "qa_checks": {"critics": result.fact_check_pass},
+            "critic_target_sections": result.target_sections,
+            "token_usage": {"critics": usage},
+        }
+
+    # --- Critic Modes ---
+
+    async def _critique_ensemble(self, state: SongWritingState, usage: Dict[str, int]) -> CriticScoresOutput:
+        """Parallel creative (humor/creativity) and factual (freshness/QA) evals, then a decision call."""
+        creative_llm = get_chat_model(MODEL_MAP["creative"], temperature=0.7)
+        factual_llm = get_chat_model(MODEL_MAP["research"], temperature=0.3)
+
+        parallel_eval = RunnableParallel(
+            creative=(self._eval_prompt(CREATIVE_EVAL_SYSTEM, state, usage) | creative_llm),
+            factual=(self._eval_prompt(FACTUAL_EVAL_SYSTEM, state, usage) | factual_llm)
+        )
+        results = await parallel_eval.ainvoke({})
+        return await self._decide(results['creative'].content, results['factual'].content, usage)
+
+    async def _critique_single(self, state: SongWritingState, usage: Dict[str, int]) -> CriticScoresOutput:
+        """One structured call with the panel prompt."""
+        chain = self._eval_prompt(self._get_prompt_template("critics_system"), state, usage) | \
+            self.llm.with_structured_output(schema=CriticScoresOutput)
+        return await chain.ainvoke({})
+
+    async def _critique_agree(self, state: SongWritingState, usage: Dict[str, int]) -> CriticScoresOutput:
+        """Structured evals in parallel; the decision call runs only when they reach different verdicts."""
+        creative_llm = get_chat_model(MODEL_MAP["creative"], temperature=0.7)
+        factual_llm = get_chat_model(MODEL_MAP["research"], temperature=0.3)
+
+        parallel_eval = RunnableParallel(
+            creative=(self._eval_prompt(CREATIVE_EVAL_SYSTEM, state, usage) | creative_llm.with_structured_output(schema=CreativeEval)),
+            factual=(self._eval_prompt(FACTUAL_EVAL_SYSTEM, state, usage) | factual_llm.with_structured_output(schema=FactualEval))
+        )
+        results = await parallel_eval.ainvoke({})
+        creative: CreativeEval = results['creative']
+        factual: FactualEval = results['factual']
+
+        thresholds = state.get("thresholds", {})
+        creative_pass = (creative.humor >= thresholds.get("humor", 0.4) and
+                         creative.creativity >= thresholds.get("creativity", 0.5))
+        factual_pass = factual.freshness >= thresholds.get("freshness", 0.5) and factual.fact_check_pass
+        if creative_pass != factual_pass:
+            print("[CRITICS] Evals disagree; running decision call")
+            return await self._decide(creative.model_dump_json(), factual.model_dump_json(), usage)
+
+        return CriticScoresOutput(
+            creativity=creative.creativity,
+            freshness=factual.freshness,
+            humor=creative.humor,
+            fact_check_pass=factual.fact_check_pass,
+            suggestions=(creative.suggestions + factual.suggestions)[:3],
+            verdict="Yes, both evals pass." if creative_pass else "No, both evals want a revision.",
+            target_sections=list(dict.fromkeys(creative.target_sections + factual.target_sections)),
+        )
+
+    async def _decide(self, creative_eval: str, factual_eval: str, usage: Dict[str, int]) -> CriticScoresOutput:
+        """Synthesizes the verdict from the two evals with the factual model."""
+        prompt = prompt_budget.fit("critics", [
+            PromptPart("system", DECISION_SYSTEM),
+            PromptPart("evals", f"Creative eval: {creative_eval}\nFactual eval: {factual_eval}", priority=1, min_tokens=200),
+        ])
+        add_tokens(usage, prompt.tokens)
+        chain = self._messages(DECISION_SYSTEM, prompt["evals"]) | self.llm.with_structured_output(schema=CriticScoresOutput)
+        return await chain.ainvoke({})
+
+    def _eval_prompt(self, system_prompt: str, state: SongWritingState, usage: Dict[str, int]) -> ChatPromptTemplate:
+        """The draft under review, with section headers and line numbers the critics can cite, fitted to the budget."""
+        template = self._get_prompt_template("critics_human")
+        prompt = prompt_budget.fit("critics", [
+            PromptPart("system", system_prompt),
+            PromptPart("inspiration", state['inspiration']),
+            PromptPart("draft", state['draft_lyrics'].numbered_text or "No current draft.", priority=1, min_tokens=300),
+        ], template=template)
+        add_tokens(usage, prompt.tokens)
+        return self._messages(system_prompt, template.format(draft_lyrics=prompt["draft"], inspiration=prompt["inspiration"]))
+
+    @staticmethod
+    def _messages(system_prompt: str, human_prompt: str) -> ChatPromptTemplate:
+        # Message objects, so braces in the draft are not read as template variables
+        return ChatPromptTemplate.from_messages([SystemMessage(content=system_prompt), HumanMessage(content=human_prompt)])
@@ -1,73 +1,94 @@
 # ==============================================================================
 # --- app/agents/researcher.py (Including fact_check_node) ---
 # ==============================================================================
-from app.agents.base_agent import BaseAgent
+from app.agents.base_agent import BaseAgent, MODEL_MAP, prompt_budget
+from app.config import (
+    FACTS_TOKEN_BUDGET,
+    RESEARCH_FACT_MAX_TOKENS,
+    RESEARCH_MAX_FACTS,
+    RESEARCH_QUERIES,
+    RESEARCH_QUERY_TIMEOUT_SECONDS,
+)
 from app.graph.state import SongWritingState
-from app.utils.llm import search_tool 
+from app.utils.llm import fact_store, get_chat_model, get_search_tool
+from app.utils.prompt_budget import PromptPart
+from app.utils.research import dedupe_snippets, expand_queries, rank_snippets, search_many
+from app.utils.tokens import estimate_tokens, truncate_to_tokens
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_ollama import ChatOllama
-from typing import Dict, Any
-import json
+from langchain_core.runnables import RunnableLambda
+from typing import Dict, Any, List
+import asyncio
 
-# --- Helper Function (Copied for local use) ---
-def extract_plain_lyrics_researcher(draft_lyrics_json_str: str) -> str:
-    """Extracts a simple, readable string from the structured lyrics JSON."""
-    if not draft_lyrics_json_str:
-        return "No current draft."
-    try:
-        lyrics_list = json.loads(draft_lyrics_json_str)
-        return "\n".join([item.get('line', '') for item in lyrics_list if isinstance(item, dict)])
-    except:
-        return draft_lyrics_json_str
-# --- End Helper Function ---
+
+def format_facts(facts: List[Dict[str, Any]], budget: int = FACTS_TOKEN_BUDGET) -> List[str]:
+    """Best facts first as "Source: <link>, Result: <snippet>" lines (each capped), packed into the facts token budget."""
+    lines: List[str] = []
+    for fact in facts:
+        line = truncate_to_tokens(f"Source: {fact['source']}, Result: {fact['snippet']}", RESEARCH_FACT_MAX_TOKENS)
+        tokens = estimate_tokens(line)
+        if tokens > budget:
+            if not lines:
+                lines.append(truncate_to_tokens(line, budget))
+            break
+        lines.append(line)
+        budget -= tokens
+    return lines
+
+
+async def research_facts(inspiration: str) -> List[str]:
+    """Fact lines for an inspiration: from the local fact store when it covers the theme, else a concurrent search fan-out."""
+    # Facts stored for earlier (related) themes, ranked against this one; sqlite runs off the event loop
+    facts = await asyncio.to_thread(fact_store.lookup, inspiration, RESEARCH_MAX_FACTS * 2) if fact_store else None
+    if facts is not None:
+        facts = dedupe_snippets(facts)[:RESEARCH_MAX_FACTS]
+        print(f"--- Researcher: {len(facts)} stored facts cover '{inspiration}', skipping search ---")
+    else:
+        # One targeted query per aspect (who/when/stats/...), run concurrently: wall time ~ one search
+        queries = expand_queries(inspiration, RESEARCH_QUERIES)
+        snippets = await search_many(get_search_tool(), queries, RESEARCH_QUERY_TIMEOUT_SECONDS)
+        facts = rank_snippets(inspiration, snippets, RESEARCH_MAX_FACTS)
+        print(f"--- Researcher: {len(queries)} queries, {len(snippets)} snippets, kept {len(facts)} facts ---")
+        if fact_store and snippets:
+            await asyncio.to_thread(fact_store.add, inspiration, dedupe_snippets(snippets))
+
+    # Capped in tokens: the facts go into every collaborator and fact_check prompt
+    return format_facts(facts) or ["No facts found."]
 
 
 class ResearcherAgent(BaseAgent):
     
     def __init__(self):
         super().__init__(agent_name="Researcher", task_type="research", use_tools=True, temperature=0.2) 
-        # Override for factual precision
-        self.llm = ChatOllama(
-            model="mistral-nemo:12b",
-            base_url="http://host.docker.internal:11434",
-            temperature=0.2
-        )
 
-    def __call__(self, state: SongWritingState) -> Dict[str, Any]:
-        """Gathers initial facts using the search tool."""
-        
-        # We manually invoke the tool for simplicity in this node
-        search_query = f"Key facts and context for song about: {state['inspiration']}"
-        # Assuming search_tool has a run method that accepts num_results
-        facts_result = search_tool.run(search_query, num_results=5) 
-        
-        # The result might be a long string; convert to a list for the state
-        # Truncate for state brevity
-        facts_list = [f"Source: SERP, Result: {facts_result[:300]}..."] if facts_result else ["No facts found."]
+    async def acall(self, state: SongWritingState) -> Dict[str, Any]:
+        """Gathers initial facts, unless the caller seeded them (batches research each inspiration once)."""
+        facts_list = state.get('original_facts') or await research_facts(state['inspiration'])
 
         # Initialize feedback list here, as this is the entry node
-        return {"original_facts": facts_list, "feedback": []}
+        return {"original_facts": facts_list, "feedback": None}
 
 # Fact check node
-def fact_check_node(state: SongWritingState) -> Dict[str, Any]:
+async def afact_check_node(state: SongWritingState) -> Dict[str, Any]:
     """Node for AI_Researcher to fact-check the current draft."""
     
-    # Create factual LLM for check
-    llm = ChatOllama(
-        model="mistral-nemo:12b",
-        base_url="http://host.docker.internal:11434",
-        temperature=0.1
-    )
+    # Shared factual LLM for the check
+    llm = get_chat_model(MODEL_MAP["research"], temperature=0.1)
     
-    # --- NEW: Convert structured JSON to plain text for prompt ---
-    plain_lyrics = extract_plain_lyrics_researcher(state['draft_lyrics'])
+    # Plain-text render is cached on the document
+    plain_lyrics = state['draft_lyrics'].plain_text or "No current draft."
     
     # Get the specific fact-check prompt
     from app.utils.prompt_manager import prompt_manager
     system_prompt = prompt_manager.get_prompt("fact_check_system")
-    human_prompt = prompt_manager.get_prompt("fact_check_human").format(
-        draft_lyrics=plain_lyrics, # Use plain text
-        original_facts="\n".join(state['original_facts'])
+    human_prompt_template = prompt_manager.get_prompt("fact_check_human")
+    prompt = prompt_budget.fit("fact_check", [
+        PromptPart("system", system_prompt),
+        PromptPart("draft", plain_lyrics, priority=1, min_tokens=200),
+        PromptPart("facts", "\n".join(state['original_facts']), priority=2, min_tokens=40),
+    ], template=human_prompt_template)
+    human_prompt = human_prompt_template.format(
+        draft_lyrics=prompt["draft"], # Use plain text
+        original_facts=prompt["facts"]
     )
     
     # Create a simple chain: messages -> LLM -> extract content
@@ -78,14 +99,18 @@ def fact_check_node(state: SongWritingState) -> Dict[str, Any]:
     ]) | llm | (lambda msg: msg.content)
     
     try:
-        response_content = chain.invoke({})
+        response_content = await chain.ainvoke({})
     except Exception as e:
         response_content = f"Fact-check failed: {str(e)}"
     
-    # Update both the specific fact check list AND the general feedback list
+    # Deltas only: runs in parallel with critics, the reducers merge both into the state
     return {
         # fact_checked_feedback is not in the official state, but good for local logging/debug
         # "fact_checked_feedback": [response_content], 
-        "feedback": state['feedback'] + [response_content],
-        "qa_status": "pass" in response_content.lower(),  # Simple heuristic
-    }
\ No newline at end of file
+        "feedback": [response_content],
+        "qa_checks": {"fact_check": "pass" in response_content.lower()},  # Simple heuristic
+        "token_usage": {"fact_check": prompt.tokens},
+    }
+
+# Async-only, like the agent nodes
+fact_check_runnable = RunnableLambda(afact_check_node, name="fact_check")
@@ -0,0 +1,70 @@
+# app/api/batch_routes.py
+
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, Query
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+
+from app.api.routes import (
+    SongRequestOld,
+    generate_flight,
+    load_song_writer_app,
+    run_song_workflow,
+    without_timeline,
+)
+from app.config import BATCH_CONCURRENCY, BATCH_MAX_ITEMS
+from app.utils.batch import NDJSON_HEADERS, SharedFetches, stream_batch
+from app.utils.single_flight import request_fingerprint
+
+batch_router = APIRouter(tags=["song"])
+
+
+class BatchRequest(BaseModel):
+    requests: List[SongRequestOld] = Field(..., min_length=1, max_length=BATCH_MAX_ITEMS)
+    concurrency: Optional[int] = Field(default=None, ge=1) # Songs in flight at once (capped at BATCH_CONCURRENCY)
+
+
+def inspiration_key(theme: str) -> str:
+    """Themes that differ only in case or spacing share one research fetch."""
+    return " ".join(theme.lower().split())
+
+
+@batch_router.post("/generate/batch")
+async def generate_batch(
+    body: BatchRequest,
+    trace: bool = Query(default=False, description="Include the per-node execution timeline in each song."),
+):
+    """
+    Generates many songs in one call (e.g. one per driver after a race) and
+    streams each as an NDJSON line as soon as it finishes, in completion
+    order; `index` points back into `requests`. Requests with the same
+    inspiration share one research fetch, identical requests share one run
+    (and replay stored responses, like /generate), and at most
+    BATCH_CONCURRENCY songs run at once. The last line is a summary.
+    """
+    # Build the graph once up front instead of in every item
+    await load_song_writer_app()
+    from app.agents.researcher import research_facts
+
+    research = SharedFetches()
+    concurrency = min(body.concurrency or BATCH_CONCURRENCY, BATCH_CONCURRENCY)
+    print(f"--- Batch of {len(body.requests)} songs ({len({inspiration_key(r.theme) for r in body.requests})} inspirations, {concurrency} at a time) ---")
+
+    async def run_item(index: int) -> Dict[str, Any]:
+        request = body.requests[index]
+
+        async def execute() -> Dict[str, Any]:
+            facts = await research.get(inspiration_key(request.theme), lambda: research_facts(request.theme))
+            song = await run_song_workflow(request, original_facts=facts)
+            return song.model_dump(mode="json")
+
+        key = request_fingerprint("generate", request.model_dump(exclude={"no_cache"}))
+        result, outcome = await generate_flight.run(key, execute, replay=not request.no_cache, fingerprint=key)
+        return {"idempotency": outcome, "song": without_timeline(result, trace)}
+
+    return StreamingResponse(
+        stream_batch(len(body.requests), run_item, concurrency, research),
+        media_type="application/x-ndjson",
+        headers=NDJSON_HEADERS,
+    )
@@ -0,0 +1,74 @@
+# app/api/debug_routes.py
+
+from typing import Any, Dict
+
+from fastapi import APIRouter
+
+from app.api.job_routes import job_queue
+from app.utils.loop_lag import EventLoopLagMonitor
+from app.utils.startup import startup_timer
+
+debug_router = APIRouter(prefix="/debug", tags=["debug"])
+
+# Started in the lifespan; sampled every 100 ms
+loop_lag_monitor = EventLoopLagMonitor()
+
+
+@debug_router.get("/llm-cache")
+async def llm_cache_stats() -> Dict[str, Any]:
+    """Hit/miss counters for the LLM response cache."""
+    from app.utils.llm import llm_cache  # Model clients load lazily; see /debug/startup
+    if llm_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **llm_cache.snapshot()}
+
+
+@debug_router.get("/fact-store")
+async def fact_store_stats() -> Dict[str, Any]:
+    """Stored research facts, and how often the researcher reused them instead of searching."""
+    from app.utils.llm import fact_store
+    if fact_store is None:
+        return {"enabled": False}
+    return {"enabled": True, **fact_store.snapshot()}
+
+
+@debug_router.get("/jobs")
+async def job_queue_stats() -> Dict[str, Any]:
+    """Worker pool size, running jobs and queue depth."""
+    return job_queue.stats()
+
+
+@debug_router.get("/models")
+async def chat_model_registry() -> Dict[str, Any]:
+    """Shared chat models handed out by the registry."""
+    from app.utils.llm import registered_chat_models
+    return {"chat_models": registered_chat_models()}
+
+
+@debug_router.get("/scheduler")
+async def model_scheduler_stats() -> Dict[str, Any]:
+    """Active model, per-model queue depth and wait times, and swap count."""
+    from app.utils.llm import model_scheduler
+    return model_scheduler.snapshot()
+
+
+@debug_router.get("/startup")
+async def startup_report() -> Dict[str, Any]:
+    """Import and init time by component, plus lazily built components once used."""
+    return startup_timer.report()
+
+
+@debug_router.get("/tokens")
+async def prompt_token_stats() -> Dict[str, Any]:
+    """Estimated prompt tokens by node and section, budgets, and how often prompts were trimmed."""
+    from app.agents.base_agent import prompt_budget
+    return prompt_budget.snapshot()
+
+
+@debug_router.get("/event-loop")
+async def event_loop_lag(reset: bool = False) -> Dict[str, Any]:
+    """Event-loop lag percentiles for this worker; reset=true clears the window (load tests do this first)."""
+    snapshot = loop_lag_monitor.snapshot()
+    if reset:
+        loop_lag_monitor.reset()
+    return snapshot
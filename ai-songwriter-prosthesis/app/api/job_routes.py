@@ -0,0 +1,116 @@
+# app/api/job_routes.py
+
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
+
+from app.api.routes import (
+    SongRequestOld,
+    SongResponseOld,
+    build_initial_state,
+    graph_run_config,
+    build_song_response,
+    extract_final_lyrics,
+    group_lyrics_by_section,
+    load_song_writer_app,
+    run_checkpoints,
+    without_timeline,
+)
+from app.api.stream_routes import SILENT_NODES, merge_node_update
+from app.config import JOB_MAX_QUEUE, JOB_RETENTION_SECONDS, JOB_STORE_PATH, JOB_WORKERS
+from app.utils.job_queue import JobQueue, JobStore, ProgressFn, QueueFullError
+from app.utils.llm_cache import bypass_llm_cache
+from app.utils.timeline import TimelineRecorder
+
+job_router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+
+class JobCreated(BaseModel):
+    id: str
+    status: str
+
+
+class JobStatus(BaseModel):
+    id: str
+    status: str
+    request: Dict[str, Any]
+    partial: Optional[Dict[str, Any]] = None
+    result: Optional[SongResponseOld] = None
+    error: Optional[str] = None
+    queue_depth: Optional[int] = None
+    created_at: float
+    updated_at: float
+
+
+async def run_song_job(job_id: str, payload: Dict[str, Any], report_progress: ProgressFn) -> Dict[str, Any]:
+    """Runs one queued request, recording a compact partial state after every node."""
+    request = SongRequestOld(**payload)
+    initial_state = build_initial_state(request)
+    state: Dict[str, Any] = dict(initial_state)
+    song_writer_app = await load_song_writer_app()
+    timeline = TimelineRecorder()
+    # The job id doubles as the run id: a job failed by a restart can be finished via /runs/{job_id}/resume
+    await run_checkpoints.register(job_id, "generate", no_cache=request.no_cache)
+
+    async with run_checkpoints.claim(job_id):
+        with bypass_llm_cache(request.no_cache):
+            async for chunk in song_writer_app.astream(
+                initial_state, config=graph_run_config(timeline, job_id), stream_mode="updates"
+            ):
+                for node, update in chunk.items():
+                    if not isinstance(update, dict):
+                        continue
+                    merge_node_update(state, update)
+                    if node in SILENT_NODES:
+                        continue
+                    await report_progress({
+                        "last_node": node,
+                        "revision": state.get("revision_number", 0),
+                        "qa_status": state.get("qa_status", False),
+                        "critic_scores": state.get("critic_scores", {}),
+                        "score_history": state.get("score_history", []),
+                        "lyrics_by_section": [
+                            section.model_dump() for section in group_lyrics_by_section(extract_final_lyrics(state))
+                        ],
+                    })
+
+    # The timeline only fixes steps_executed here; job results stay compact
+    return without_timeline(build_song_response(request, state, timeline, job_id).model_dump(mode="json"), trace=False)
+
+
+# Workers start in the app lifespan; their count is the concurrency limit for queued songs.
+job_queue = JobQueue(
+    JobStore(JOB_STORE_PATH, retention_seconds=JOB_RETENTION_SECONDS),
+    runner=run_song_job,
+    workers=JOB_WORKERS,
+    max_queue=JOB_MAX_QUEUE,
+)
+
+
+@job_router.post("", response_model=JobCreated, status_code=202)
+async def create_job(request: SongRequestOld):
+    """Queues a song run and returns immediately with its job id (body matches /generate)."""
+    try:
+        job_id = await job_queue.submit(request.model_dump())
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return JobCreated(id=job_id, status="queued")
+
+
+@job_router.get("/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str):
+    """Status, latest partial draft, and the final result once the job succeeds."""
+    job = await job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found.")
+    return JobStatus(**job)
+
+
+@job_router.delete("/{job_id}", response_model=JobStatus)
+async def cancel_job(job_id: str):
+    """Cancels a queued or running job."""
+    job = await job_queue.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found.")
+    return JobStatus(**job)
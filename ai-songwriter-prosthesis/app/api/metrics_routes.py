@@ -0,0 +1,14 @@
+# app/api/metrics_routes.py
+
+from fastapi import APIRouter, Response
+
+from app.utils.metrics import render_metrics
+
+metrics_router = APIRouter(tags=["metrics"])
+
+
+@metrics_router.get("/metrics")
+async def metrics() -> Response:
+    """Prometheus scrape endpoint: node, model call, router, in-flight and cache metrics for this worker."""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
@@ -1,15 +1,23 @@
-import itertools
-import json
+import asyncio
 from operator import itemgetter
 from typing import Dict, Any, List, Literal, Optional, TypedDict
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Header, HTTPException, Query, Response
 from pydantic import BaseModel, Field
 
 # --- Import New Workflow Components (Adjust these paths as necessary) ---
-# Assuming these are imported from where your new workflow is defined:
-from app.graph.workflow import song_writer_app 
+# The compiled workflow is loaded lazily (see load_song_writer_app) to keep startup fast.
 from app.graph.state import SongWritingState 
+from app.config import IDEMPOTENCY_STORE_PATH, IDEMPOTENCY_TTL_SECONDS, IDEMPOTENCY_MAX_ENTRIES
+from app.config import CHECKPOINTS_ENABLED, CHECKPOINT_DB_PATH, CHECKPOINT_RETENTION_SECONDS
+from app.utils.llm_cache import bypass_llm_cache
+from app.utils.lyric_stream import SectionGrouper
+from app.utils.metrics import MetricsCallbackHandler
+from app.utils.prompt_budget import usage_summary
+from app.utils.run_checkpoints import RunCheckpoints
+from app.utils.song_document import SongDocument
+from app.utils.timeline import TimelineRecorder
+from app.utils.single_flight import IdempotencyKeyReused, IdempotencyStore, SingleFlight, request_fingerprint
 
 # --- Pydantic Model for Structured Output (MUST match Collaborator output) ---
 class LyricLine(BaseModel):
@@ -22,6 +30,9 @@ class SongRequestOld(BaseModel):
     theme: str # Maps to 'inspiration'
     mood: str = "normal" 
     draft_lyrics: List[str] = [] # Lines marked as 'human'
+    no_cache: bool = False # Bypass the LLM response cache for this request
+    max_revisions: Optional[int] = Field(default=None, ge=1) # Revision budget (defaults to MAX_REVISIONS)
+    min_improvement: Optional[float] = Field(default=None, ge=0) # Stop early when scores gain less than this
 
 class UILyricLine(BaseModel):
     line: str
@@ -36,6 +47,7 @@ class SongResponseOld(BaseModel):
     steps_executed: list[str]
     results: Dict[str, Any]
     lyrics_by_section: List[UILyricSection] = []
+    run_id: Optional[str] = None # Checkpointed run: resume or revise it under /runs/{run_id}
 
 # --- TypedDict for LangGraph State (Copied for reference) ---
 class AgentState(TypedDict):
@@ -55,118 +67,180 @@ router = APIRouter(tags=["song"])
 # ==============================================================================
 
 def group_lyrics_by_section(lyrics_list: List[LyricLine]) -> List[UILyricSection]:
-    """Transforms a flat List[LyricLine] into a nested list grouped by section."""
+    """Transforms a flat List[LyricLine] into a nested list grouped by consecutive section, in song order."""
     if not lyrics_list:
         return []
-    
-    grouped_sections = []
-    # Sort by section to ensure correct grouping
-    sorted_lyrics = sorted(lyrics_list, key=lambda L: L.section)
-
-    for section_name, group_iter in itertools.groupby(sorted_lyrics, key=lambda L: L.section):
-        lines_in_group = [
-            UILyricLine(line=L.line, source=L.source) 
-            for L in group_iter
-        ]
-        grouped_sections.append(
-            UILyricSection(section=section_name, lines=lines_in_group)
-        )
-        
-    return grouped_sections
 
-def extract_final_lyrics(state: SongWritingState) -> List[LyricLine]:
-    """
-    Extracts the final structured lyrics from the new workflow's state,
-    and defensively cleans up malformed dictionaries.
-    """
-    lyrics_data = state.get("draft_lyrics")
-    
-    if isinstance(lyrics_data, str):
-        try:
-            # Attempt to parse it as the expected JSON List[LyricLine]
-            parsed = json.loads(lyrics_data)
-            lyrics_data = parsed
-        except (json.JSONDecodeError, TypeError):
-            # Fallback for simple string output (e.g., from an error)
-            lines = lyrics_data.split('\n')
-            return [LyricLine(line=line.strip(), source="machine", section="[verse 1]") 
-                    for line in lines if line.strip()]
-
-    # If the state holds the list of dictionaries
-    if isinstance(lyrics_data, list):
-        cleaned_lyrics = []
-        for item in lyrics_data:
-            if not isinstance(item, dict):
-                continue
-            
-            # --- CRITICAL FIX: Supply default values if keys are missing ---
-            cleaned_lyrics.append(LyricLine(
-                line=item.get('line', 'Error: Missing Line Content'),
-                source=item.get('source', 'machine'),
-                section=item.get('section', '[verse 1]') # Default to [verse 1] if missing
-            ))
-        return cleaned_lyrics
-        
-    return []
+    grouper = SectionGrouper()
+    closed_sections = [grouper.add(L) for L in lyrics_list] + [grouper.flush()]
+    return [to_ui_section(section_name, lines) for section_name, lines in filter(None, closed_sections)]
 
-# ==============================================================================
-# --- /generate Compatibility Endpoint (Root path as per old frontend JS) ---
-# ==============================================================================
+def to_ui_section(section_name: str, lines: List[LyricLine]) -> UILyricSection:
+    """Builds one UI section from the lines the SectionGrouper closed."""
+    return UILyricSection(
+        section=section_name,
+        lines=[UILyricLine(line=L.line, source=L.source) for L in lines],
+    )
 
-@router.post("/generate", response_model=SongResponseOld)
-async def generate_song_flow_old_app(request: SongRequestOld):
+def extract_final_lyrics(state: SongWritingState) -> List[LyricLine]:
     """
-    Compatibility layer for the old F1 Lyric Editor frontend.
-    Invokes the new, generic, iterative songwriting workflow.
+    Extracts the final structured lyrics from the workflow's state. The draft is
+    a SongDocument whose lines were validated when it was built, so this is the
+    only place it is converted for the API.
     """
-    
-    # 1. Map Old Request to New State
-    initial_state: SongWritingState = {
+    draft: Optional[SongDocument] = state.get("draft_lyrics")
+    if not draft:
+        return []
+    return [LyricLine(line=L.line, source=L.source, section=L.section) for L in draft.lines]
+
+def build_initial_state(request: SongRequestOld, original_facts: Optional[List[str]] = None) -> SongWritingState:
+    """Maps an old-frontend request onto the new workflow state; seeded facts skip the research search."""
+    return {
+        "entry_point": "research",
         "inspiration": request.theme, 
-        "draft_lyrics": "\n".join(request.draft_lyrics), 
+        "draft_lyrics": SongDocument.from_human_text("\n".join(request.draft_lyrics)),
         "revision_number": 0,
         "thresholds": {"creativity": 0.5, "freshness": 0.5, "humor": 0.4},
-        "original_facts": [],
+        "original_facts": list(original_facts or []),
         "feedback": [],
         "critic_suggestions": [],
         "critic_scores": {},
+        "qa_checks": {},
         "qa_status": False,
+        "critic_target_sections": [],
+        "revised_sections": [],
+        "max_revisions": request.max_revisions,
+        "min_improvement": request.min_improvement,
+        "score_history": [],
+        "best_draft": {},
+        "token_usage": {},
         "current_revision_lyrics": "\n".join(request.draft_lyrics)
     }
 
+def build_song_response(
+    request: SongRequestOld,
+    final_state: SongWritingState,
+    timeline: Optional[TimelineRecorder] = None,
+    run_id: Optional[str] = None,
+    steps: Optional[List[str]] = None,
+) -> SongResponseOld:
+    """Formats a finished workflow state for the old frontend; steps_executed is what actually ran (`steps`, else the timeline's)."""
+    final_lyrics_list: List[LyricLine] = extract_final_lyrics(final_state)
+    ui_lyrics = group_lyrics_by_section(final_lyrics_list)
+
+    results_log = {
+        "f1_info": final_state.get("original_facts", "Research data not available."), 
+        "carlin_critique": final_state.get("critic_suggestions", "No critique generated."), 
+        "final_scores": final_state.get("critic_scores", {}),
+        "last_revised_sections": final_state.get("revised_sections", []),
+        "score_history": final_state.get("score_history", []),
+        "released_revision": (final_state.get("best_draft") or {}).get("revision"),
+        "stop_reason": final_state.get("loop_reason", ""),
+        "token_usage": usage_summary(final_state.get("token_usage")),
+    }
+    if timeline is not None:
+        results_log["timeline"] = timeline.timeline()
+    if steps is None:
+        steps = timeline.steps() if timeline is not None else []
+
+    return SongResponseOld(
+        theme=request.theme,
+        steps_executed=steps,
+        results=results_log,
+        lyrics_by_section=ui_lyrics,
+        run_id=run_id
+    )
+
+# Prometheus metrics for every graph run (nodes, model calls, router decisions); see /metrics
+graph_metrics = MetricsCallbackHandler(graph="song_writer")
+
+# Durable checkpoints per run (opened in the app lifespan); see app/api/run_routes.py
+run_checkpoints = RunCheckpoints(
+    db_path=CHECKPOINT_DB_PATH,
+    retention_seconds=CHECKPOINT_RETENTION_SECONDS,
+    enabled=CHECKPOINTS_ENABLED,
+    state_types=[SongDocument],
+)
+
+def graph_run_config(timeline: Optional[TimelineRecorder] = None, run_id: Optional[str] = None) -> Dict[str, Any]:
+    """Config for every workflow invocation: recursion limit, the metrics callback, the run's timeline recorder and checkpoint thread."""
+    callbacks: List[Any] = [graph_metrics]
+    if timeline is not None:
+        callbacks.append(timeline)
+    config: Dict[str, Any] = {"recursion_limit": 50, "callbacks": callbacks}
+    if run_id is not None:
+        config.update(run_checkpoints.run_config(run_id))
+    return config
+
+def without_timeline(song: Dict[str, Any], trace: bool) -> Dict[str, Any]:
+    """The timeline is always recorded (and stored for replays) but only returned on ?trace=1."""
+    if trace or "timeline" not in song.get("results", {}):
+        return song
+    return {**song, "results": {k: v for k, v in song["results"].items() if k != "timeline"}}
+
+def _get_song_writer_app():
+    # Importing the workflow pulls in the agents, langgraph and the model clients.
+    from app.graph.workflow import get_song_writer_app
+    return get_song_writer_app()
+
+async def load_song_writer_app():
+    """Compiled workflow (checkpointed once the saver is open); the first call imports and builds it off the event loop."""
+    return run_checkpoints.attach(await asyncio.to_thread(_get_song_writer_app))
+
+async def run_song_workflow(request: SongRequestOld, original_facts: Optional[List[str]] = None) -> SongResponseOld:
+    """Runs the full iterative workflow for one request, checkpointed under a new run id."""
+    initial_state = build_initial_state(request, original_facts)
+    song_writer_app = await load_song_writer_app()
+    timeline = TimelineRecorder()
+    run_id = run_checkpoints.new_run_id()
+    await run_checkpoints.register(run_id, "generate", no_cache=request.no_cache)
+    async with run_checkpoints.claim(run_id):
+        with bypass_llm_cache(request.no_cache):
+            final_state = await song_writer_app.ainvoke(
+                initial_state,
+                config=graph_run_config(timeline, run_id)
+            )
+    return build_song_response(request, final_state, timeline, run_id)
+
+# ==============================================================================
+# --- /generate Compatibility Endpoint (Root path as per old frontend JS) ---
+# ==============================================================================
+
+# Identical in-flight requests share one graph run; completed responses are replayed to retries.
+generate_flight = SingleFlight(IdempotencyStore(
+    db_path=IDEMPOTENCY_STORE_PATH,
+    ttl_seconds=IDEMPOTENCY_TTL_SECONDS,
+    max_entries=IDEMPOTENCY_MAX_ENTRIES,
+))
+
+@router.post("/generate", response_model=SongResponseOld)
+async def generate_song_flow_old_app(
+    request: SongRequestOld,
+    response: Response,
+    idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key"),
+    trace: bool = Query(default=False, description="Include the per-node execution timeline in results.timeline."),
+):
+    """
+    Compatibility layer for the old F1 Lyric Editor frontend.
+    Invokes the new, generic, iterative songwriting workflow.
+    """
+    fingerprint = request_fingerprint("generate", request.model_dump(exclude={"no_cache"}))
+    key = f"generate:key:{idempotency_key}" if idempotency_key else fingerprint
+
+    async def execute() -> Dict[str, Any]:
+        song = await run_song_workflow(request)
+        return song.model_dump(mode="json")
+
     try:
-        # 2. Invoke the Graph (runs the full iterative workflow)
-        final_state = await song_writer_app.ainvoke(
-            initial_state,
-            config={"recursion_limit": 50}
-        )
-        
-        # 3. Extract and Format Final Lyrics
-        # This function now handles the malformed dictionary error.
-        final_lyrics_list: List[LyricLine] = extract_final_lyrics(final_state)
-        ui_lyrics = group_lyrics_by_section(final_lyrics_list)
-
-        # 4. Construct Results Log
-        results_log = {
-            "f1_info": final_state.get("original_facts", "Research data not available."), 
-            "carlin_critique": final_state.get("critic_suggestions", "No critique generated."), 
-            "final_scores": final_state.get("critic_scores", {})
-        }
-
-        # 5. Return the Response
-        return SongResponseOld(
-            theme=request.theme,
-            steps_executed=[
-                "researcher", 
-                "collaborator", 
-                "brainstorm (parallel)",
-                "fact_check",
-                f"critics ({final_state.get('revision_number', 0)} revisions)"
-            ], 
-            results=results_log,
-            lyrics_by_section=ui_lyrics
+        # no_cache asks for a fresh song, so only an explicit Idempotency-Key may replay a stored one.
+        result, outcome = await generate_flight.run(
+            key, execute, replay=bool(idempotency_key) or not request.no_cache, fingerprint=fingerprint
         )
+        response.headers["Idempotency-Status"] = outcome
+        return SongResponseOld(**without_timeline(result, trace))
         
+    except IdempotencyKeyReused as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
         import traceback
         traceback.print_exc()
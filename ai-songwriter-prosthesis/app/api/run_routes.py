@@ -0,0 +1,146 @@
+# app/api/run_routes.py
+
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from pydantic import BaseModel, Field
+
+from app.api.routes import (
+    LyricLine,
+    SongRequestOld,
+    SongResponseOld,
+    build_song_response,
+    graph_run_config,
+    load_song_writer_app,
+    run_checkpoints,
+    without_timeline,
+)
+from app.utils.llm_cache import bypass_llm_cache
+from app.utils.run_checkpoints import RunInProgressError
+from app.utils.song_document import SongDocument
+from app.utils.timeline import TimelineRecorder
+
+run_router = APIRouter(prefix="/runs", tags=["runs"])
+
+
+class RunStatus(BaseModel):
+    run_id: str
+    finished: bool
+    next_nodes: List[str]
+    revision: int
+    last_checkpoint_at: Optional[str] = None
+
+
+class RevisionRequest(BaseModel):
+    revisions: int = Field(default=1, ge=1) # Extra revision passes on top of the saved run
+    draft_lyrics: Optional[List[LyricLine]] = None # Edited draft to revise instead of the saved one
+    no_cache: bool = False
+
+
+async def load_run(run_id: str):
+    """The run's latest checkpoint (StateSnapshot); 404 if checkpoints are off or the run is unknown."""
+    if run_checkpoints.saver is None:
+        raise HTTPException(status_code=404, detail="Run checkpoints are disabled.")
+    song_writer_app = await load_song_writer_app()
+    snapshot = await song_writer_app.aget_state(run_checkpoints.run_config(run_id))
+    if not snapshot.values:
+        raise HTTPException(status_code=404, detail=f"No checkpoint for run '{run_id}' (unknown or expired).")
+    return song_writer_app, snapshot
+
+
+def request_for(values: Dict[str, Any], no_cache: bool = False) -> SongRequestOld:
+    """A request carrying the saved run's theme, for building the response."""
+    return SongRequestOld(theme=values.get("inspiration", ""), no_cache=no_cache)
+
+
+@run_router.get("/{run_id}", response_model=RunStatus)
+async def get_run(run_id: str):
+    """Where a checkpointed run stopped: finished, or the nodes a resume would run next."""
+    _, snapshot = await load_run(run_id)
+    return RunStatus(
+        run_id=run_id,
+        finished=not snapshot.next,
+        next_nodes=list(snapshot.next),
+        revision=snapshot.values.get("revision_number", 0),
+        last_checkpoint_at=snapshot.created_at,
+    )
+
+
+@run_router.post("/{run_id}/resume", response_model=SongResponseOld)
+async def resume_run(
+    run_id: str,
+    trace: bool = Query(default=False, description="Include the execution timeline of the resumed part."),
+):
+    """
+    Continues a run from its last checkpoint (after a crash, timeout or
+    dropped stream); nodes that already finished are not run again. A run
+    that already finished returns its result.
+    """
+    song_writer_app, snapshot = await load_run(run_id)
+    request = request_for(snapshot.values, no_cache=await run_checkpoints.no_cache(run_id))
+    if not snapshot.next:
+        steps = await run_checkpoints.steps(song_writer_app, run_id)
+        return build_song_response(request, snapshot.values, run_id=run_id, steps=steps)
+
+    print(f"--- Resuming run {run_id} at {', '.join(snapshot.next)} (revision {snapshot.values.get('revision_number', 0)}) ---")
+    timeline = TimelineRecorder()
+    try:
+        async with run_checkpoints.claim(run_id):
+            with bypass_llm_cache(request.no_cache):
+                final_state = await song_writer_app.ainvoke(None, config=graph_run_config(timeline, run_id))
+    except RunInProgressError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Error resuming run '{run_id}': {str(e)}")
+
+    # The timeline only saw the resumed part; the checkpoints cover the whole run
+    steps = await run_checkpoints.steps(song_writer_app, run_id)
+    song = build_song_response(request, final_state, timeline, run_id, steps=steps)
+    return SongResponseOld(**without_timeline(song.model_dump(mode="json"), trace))
+
+
+@run_router.post("/{run_id}/revise", response_model=SongResponseOld)
+async def revise_run(
+    run_id: str,
+    body: RevisionRequest,
+    trace: bool = Query(default=False, description="Include the per-node execution timeline in results.timeline."),
+):
+    """
+    Starts a new run from a finished run's saved state: research and the first
+    drafting pass are skipped and the collaborator revises the saved draft (or
+    the edited one in the body) with the last critique. One extra revision
+    costs one revision, not a full run. Returns the new run's id.
+    """
+    song_writer_app, snapshot = await load_run(run_id)
+    if snapshot.next:
+        raise HTTPException(status_code=409, detail=f"Run '{run_id}' has not finished; resume it first.")
+
+    seed: Dict[str, Any] = dict(snapshot.values)
+    seed.update({
+        "entry_point": "revise",
+        "max_revisions": seed.get("revision_number", 0) + body.revisions,
+        "best_draft": {},  # Release the best of the new revisions, not the saved run's draft
+        "token_usage": {},  # Counted per run
+    })
+    if body.draft_lyrics:
+        seed["draft_lyrics"] = SongDocument.from_lines(body.draft_lyrics)
+
+    request = request_for(seed, no_cache=body.no_cache)
+    new_run_id = run_checkpoints.new_run_id()
+    await run_checkpoints.register(new_run_id, "revise", source_run_id=run_id, no_cache=body.no_cache)
+    print(f"--- Revising run {run_id} as {new_run_id} ({body.revisions} more revisions from revision {seed.get('revision_number', 0)}) ---")
+
+    timeline = TimelineRecorder()
+    try:
+        async with run_checkpoints.claim(new_run_id):
+            with bypass_llm_cache(body.no_cache):
+                final_state = await song_writer_app.ainvoke(seed, config=graph_run_config(timeline, new_run_id))
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Error revising run '{run_id}': {str(e)}")
+
+    song = build_song_response(request, final_state, timeline, new_run_id)
+    return SongResponseOld(**without_timeline(song.model_dump(mode="json"), trace))
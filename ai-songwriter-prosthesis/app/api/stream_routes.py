@@ -0,0 +1,176 @@
+# app/api/stream_routes.py
+
+import json
+import traceback
+from typing import Any, AsyncIterator, Dict, List
+
+from fastapi import APIRouter, Query
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from app.api.routes import (
+    LyricLine,
+    SongRequestOld,
+    build_initial_state,
+    graph_run_config,
+    build_song_response,
+    extract_final_lyrics,
+    group_lyrics_by_section,
+    load_song_writer_app,
+    run_checkpoints,
+    to_ui_section,
+    without_timeline,
+)
+from app.graph.state import STATE_REDUCERS
+from app.utils.llm_cache import bypass_llm_cache
+from app.utils.lyric_stream import IncrementalLyricDecoder, SectionGrouper
+from app.utils.song_document import SongDocument
+from app.utils.timeline import TimelineRecorder
+
+stream_router = APIRouter(tags=["song"])
+
+# Nodes whose model tokens are forwarded to the client as they are generated
+TOKEN_STREAM_NODES = {"collaborator"}
+
+# Graph-internal nodes that carry nothing useful for the client
+SILENT_NODES = {"aggregate_feedback"}
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, SongDocument):
+        return value.to_dicts()
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    return str(value)
+
+
+def sse_event(event: str, data: Any) -> str:
+    """Formats one Server-Sent Event frame."""
+    return f"event: {event}\ndata: {json.dumps(data, default=_json_default)}\n\n"
+
+
+class LineStream:
+    """Decodes one model run's tokens into validated lines and closed sections."""
+
+    def __init__(self):
+        self.decoder = IncrementalLyricDecoder(LyricLine)
+        self.grouper = SectionGrouper()
+
+    def feed(self, node: str, revision: int, text: str) -> List[str]:
+        frames = []
+        for line in self.decoder.feed(text):
+            frames.append(sse_event("line", {"node": node, "revision": revision, **line.model_dump()}))
+            closed = self.grouper.add(line)
+            if closed:
+                frames.append(self._section_frame(node, revision, closed))
+        return frames
+
+    def close(self, node: str, revision: int) -> List[str]:
+        closed = self.grouper.flush()
+        return [self._section_frame(node, revision, closed)] if closed else []
+
+    @staticmethod
+    def _section_frame(node: str, revision: int, closed) -> str:
+        section = to_ui_section(*closed)
+        return sse_event("section", {"node": node, "revision": revision, **section.model_dump()})
+
+
+def merge_node_update(state: Dict[str, Any], update: Dict[str, Any]) -> None:
+    """Applies a node update to the locally tracked state, using the graph's reducers where it has them."""
+    for key, value in update.items():
+        reducer = STATE_REDUCERS.get(key)
+        state[key] = reducer(state.get(key), value) if reducer else value
+
+
+async def stream_song_events(request: SongRequestOld, trace: bool = False) -> AsyncIterator[str]:
+    """Runs the workflow and yields SSE frames for node completions, drafts, tokens and the result."""
+    initial_state = build_initial_state(request)
+    timeline = TimelineRecorder()
+    run_id = run_checkpoints.new_run_id()
+    state: Dict[str, Any] = dict(initial_state)
+    final_state = None
+    line_streams: Dict[str, LineStream] = {}  # keyed by chat model run_id
+
+    # A dropped stream leaves a checkpointed run that /runs/{run_id}/resume can finish
+    yield sse_event("start", {"theme": request.theme, "run_id": run_id})
+    try:
+        song_writer_app = await load_song_writer_app()
+        await run_checkpoints.register(run_id, "generate", no_cache=request.no_cache)
+        async with run_checkpoints.claim(run_id):
+            with bypass_llm_cache(request.no_cache):
+                async for event in song_writer_app.astream_events(
+                    initial_state, config=graph_run_config(timeline, run_id), version="v2"
+                ):
+                    kind = event["event"]
+                    node = event.get("metadata", {}).get("langgraph_node")
+                    parent_ids = event.get("parent_ids") or []
+
+                    if kind == "on_chat_model_stream" and node in TOKEN_STREAM_NODES:
+                        text = event["data"]["chunk"].content
+                        if text:
+                            yield sse_event("token", {"node": node, "text": text})
+                            stream = line_streams.setdefault(event["run_id"], LineStream())
+                            for frame in stream.feed(node, state.get("revision_number", 0) + 1, text):
+                                yield frame
+
+                    elif kind == "on_chat_model_end" and event["run_id"] in line_streams:
+                        for frame in line_streams.pop(event["run_id"]).close(node, state.get("revision_number", 0) + 1):
+                            yield frame
+
+                    elif kind == "on_chain_end" and not parent_ids:
+                        # Root graph run finished: its output is the final state
+                        final_state = event["data"].get("output")
+
+                    # A node finished; LangGraph's own __start__ input step is not one of ours
+                    elif kind == "on_chain_end" and len(parent_ids) == 1 and event["name"] == node and not node.startswith("__"):
+                        update = event["data"].get("output")
+                        if not isinstance(update, dict) or node in SILENT_NODES:
+                            continue
+                        merge_node_update(state, update)
+                        yield sse_event("node", {
+                            "node": node,
+                            "revision": state.get("revision_number", 0),
+                            "update": update,
+                        })
+
+                        if node == "collaborator":
+                            draft = group_lyrics_by_section(extract_final_lyrics(update))
+                            yield sse_event("draft", {
+                                "revision": state.get("revision_number", 0),
+                                "lyrics_by_section": [section.model_dump() for section in draft],
+                            })
+                        elif node == "loop_controller":
+                            yield sse_event("decision", {
+                                "revision": state.get("revision_number", 0),
+                                "decision": update.get("loop_decision"),
+                                "reason": update.get("loop_reason"),
+                                "score": (update.get("score_history") or [None])[-1],
+                                "best_revision": (update.get("best_draft") or {}).get("revision"),
+                            })
+                            if "draft_lyrics" in update:
+                                # Releasing an earlier, better-scored draft
+                                draft = group_lyrics_by_section(extract_final_lyrics(update))
+                                yield sse_event("draft", {
+                                    "revision": (update.get("best_draft") or {}).get("revision"),
+                                    "lyrics_by_section": [section.model_dump() for section in draft],
+                                })
+
+        song = build_song_response(request, final_state or state, timeline, run_id)
+        yield sse_event("result", without_timeline(song.model_dump(mode="json"), trace))
+
+    except Exception as e:
+        traceback.print_exc()
+        yield sse_event("error", {"detail": f"Error executing songwriting workflow: {str(e)}"})
+
+
+@stream_router.post("/generate/stream")
+async def generate_song_stream(
+    request: SongRequestOld,
+    trace: bool = Query(default=False, description="Include the per-node execution timeline in the result event."),
+):
+    """Streams workflow progress as Server-Sent Events (POST body matches /generate)."""
+    return StreamingResponse(
+        stream_song_events(request, trace), media_type="text/event-stream", headers=SSE_HEADERS
+    )
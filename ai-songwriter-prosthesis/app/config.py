@@ -18,5 +18,109 @@ if not GOOGLE_API_KEY:
 SERPAPI_API_KEY = os.getenv("SERPAPI_API_KEY")
 if not SERPAPI_API_KEY:
     raise ValueError("SERPAPI_API_KEY is required for SERP searches. Set in .env file.")
+# SerpAPI-compatible host (unset: serpapi.com); scripts/load_test.py points it at a local stub
+SERPAPI_BASE_URL = os.getenv("SERPAPI_BASE_URL", "")
 
-max_revisions = int(os.getenv("MAX_REVISIONS", "5"))
\ No newline at end of file
+max_revisions = int(os.getenv("MAX_REVISIONS", "5"))
+# Early stop: release once the best score improves by less than MIN_SCORE_IMPROVEMENT
+# over the last PLATEAU_PATIENCE revisions (0 disables plateau detection)
+MIN_SCORE_IMPROVEMENT = float(os.getenv("MIN_SCORE_IMPROVEMENT", "0.02"))
+PLATEAU_PATIENCE = int(os.getenv("PLATEAU_PATIENCE", "1"))
+
+# Revision mode for the collaborator: "section" regenerates only the sections the critics
+# pointed at and splices them into the draft; "full" rewrites the whole song every pass.
+REVISION_MODE = os.getenv("REVISION_MODE", "section").lower()
+
+# Collaborator feedback window: deduplicated, highest-priority items first, capped by an
+# estimated token budget; items that do not fit are compressed into one summary line.
+FEEDBACK_TOKEN_BUDGET = int(os.getenv("FEEDBACK_TOKEN_BUDGET", "600"))
+FEEDBACK_MAX_ITEMS = int(os.getenv("FEEDBACK_MAX_ITEMS", "8"))
+FEEDBACK_MAX_ITEM_TOKENS = int(os.getenv("FEEDBACK_MAX_ITEM_TOKENS", "160"))
+FEEDBACK_SUMMARY_ENABLED = os.getenv("FEEDBACK_SUMMARY_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Prompt token budgets per graph node (estimated tokens; PROMPT_BUDGET_<NODE> overrides one).
+# Over budget, the lowest-priority sections (facts, then feedback, then draft context) are trimmed.
+_DEFAULT_PROMPT_BUDGETS = {
+    "collaborator": 3000,
+    "critics": 2000,
+    "fact_check": 1500,
+    "yes_and": 1200,
+    "no_but": 1200,
+    "non_sequitur": 1200,
+}
+PROMPT_TOKEN_BUDGETS = {
+    node: int(os.getenv(f"PROMPT_BUDGET_{node.upper()}", str(budget))) for node, budget in _DEFAULT_PROMPT_BUDGETS.items()
+}
+# Search results kept as facts (estimated tokens); facts go into the collaborator and fact_check prompts
+FACTS_TOKEN_BUDGET = int(os.getenv("FACTS_TOKEN_BUDGET", "300"))
+
+# Critic mode: "ensemble" (two evals + decision call), "agree" (decision call only when the
+# evals disagree) or "single" (one structured call). Compare with scripts/bench_critics.py.
+CRITIC_MODE = os.getenv("CRITIC_MODE", "ensemble").lower()
+
+# Startup: Phoenix tracing is registered in the lifespan; the graph is built on first use,
+# or in the background right after startup when WARM_START is on.
+PHOENIX_TRACING_ENABLED = os.getenv("PHOENIX_TRACING_ENABLED", "true").lower() in ("1", "true", "yes")
+WARM_START = os.getenv("WARM_START", "true").lower() in ("1", "true", "yes")
+
+# Ollama host (resolves host from Docker; set to "http://localhost:11434" if not containerized)
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://host.docker.internal:11434")
+# How long Ollama keeps a model loaded after a request (e.g. "30m", "-1" for forever)
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+
+# Model-affinity scheduler: one model active on the Ollama host at a time. Calls to the active model
+# run concurrently (fan-outs stay parallel); only calls for a different model queue.
+# MAX_CONCURRENT caps calls to the active model and defaults to OLLAMA_NUM_PARALLEL (Ollama's own
+# per-model parallelism, 4); 0 means no cap. MAX_CONSECUTIVE bounds how long one model can hold the host.
+MODEL_SCHEDULER_ENABLED = os.getenv("MODEL_SCHEDULER_ENABLED", "true").lower() in ("1", "true", "yes")
+MODEL_SCHEDULER_MAX_CONCURRENT = int(os.getenv("MODEL_SCHEDULER_MAX_CONCURRENT", os.getenv("OLLAMA_NUM_PARALLEL", "4")))
+MODEL_SCHEDULER_MAX_CONSECUTIVE = int(os.getenv("MODEL_SCHEDULER_MAX_CONSECUTIVE", "8"))
+
+# Local data directory for caches and stores (mount a volume here in containers)
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.getenv("DATA_DIR", os.path.join(BASE_DIR, "data"))
+
+# LLM response cache (point LLM_CACHE_PATH at the same file as agentic-lyrics to share entries)
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(DATA_DIR, "llm_cache.sqlite3"))
+LLM_CACHE_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "256"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+# Completed /generate responses kept for retries (keyed by Idempotency-Key or request hash)
+IDEMPOTENCY_STORE_PATH = os.getenv("IDEMPOTENCY_STORE_PATH", os.path.join(DATA_DIR, "idempotency.sqlite3"))
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", str(24 * 3600)))
+IDEMPOTENCY_MAX_ENTRIES = int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "1000"))
+
+# Background song jobs (/jobs): worker count caps concurrent workflows against the Ollama host
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_MAX_QUEUE = int(os.getenv("JOB_MAX_QUEUE", "100"))
+JOB_STORE_PATH = os.getenv("JOB_STORE_PATH", os.path.join(DATA_DIR, "jobs.sqlite3"))
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", str(24 * 3600)))
+
+# Graph checkpoints (/runs): every run is checkpointed after each step so it can be resumed or revised
+CHECKPOINTS_ENABLED = os.getenv("CHECKPOINTS_ENABLED", "true").lower() in ("1", "true", "yes")
+CHECKPOINT_DB_PATH = os.getenv("CHECKPOINT_DB_PATH", os.path.join(DATA_DIR, "checkpoints.sqlite3"))
+CHECKPOINT_RETENTION_SECONDS = float(os.getenv("CHECKPOINT_RETENTION_SECONDS", str(7 * 24 * 3600)))
+
+# Research fact store: search snippets kept in a local full-text index and reused across themes;
+# SerpAPI is only called when fewer than FACT_STORE_MIN_FACTS fresh facts cover FACT_STORE_MIN_COVERAGE
+# of the inspiration's topic words.
+FACT_STORE_ENABLED = os.getenv("FACT_STORE_ENABLED", "true").lower() in ("1", "true", "yes")
+FACT_STORE_PATH = os.getenv("FACT_STORE_PATH", os.path.join(DATA_DIR, "facts.sqlite3"))
+FACT_STORE_TTL_SECONDS = float(os.getenv("FACT_STORE_TTL_SECONDS", str(30 * 24 * 3600)))
+FACT_STORE_MAX_FACTS = int(os.getenv("FACT_STORE_MAX_FACTS", "20000"))
+FACT_STORE_MIN_FACTS = int(os.getenv("FACT_STORE_MIN_FACTS", "3"))
+FACT_STORE_MIN_COVERAGE = float(os.getenv("FACT_STORE_MIN_COVERAGE", "0.6"))
+
+# Research fan-out: the inspiration is expanded into one query per aspect, searched concurrently;
+# snippets are deduplicated and ranked into at most RESEARCH_MAX_FACTS facts (each capped in tokens).
+RESEARCH_QUERIES = [aspect.strip() for aspect in os.getenv("RESEARCH_QUERIES", "what,who,when,stats,quotes").split(",") if aspect.strip()]
+RESEARCH_QUERY_TIMEOUT_SECONDS = float(os.getenv("RESEARCH_QUERY_TIMEOUT_SECONDS", "8"))
+RESEARCH_MAX_FACTS = int(os.getenv("RESEARCH_MAX_FACTS", "8"))
+RESEARCH_FACT_MAX_TOKENS = int(os.getenv("RESEARCH_FACT_MAX_TOKENS", "60"))
+
+# Batch generation (/generate/batch): songs run BATCH_CONCURRENCY at a time (keep near JOB_WORKERS,
+# the Ollama host is the bottleneck); requests with the same inspiration share one research fetch.
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "100"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "2"))
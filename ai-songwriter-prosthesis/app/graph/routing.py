@@ -0,0 +1,99 @@
+# app/graph/routing.py
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import max_revisions as DEFAULT_MAX_REVISIONS, MIN_SCORE_IMPROVEMENT, PLATEAU_PATIENCE
+from app.graph.state import SongWritingState, combined_qa
+
+SCORE_KEYS = ("creativity", "freshness", "humor")
+
+def score_draft(scores: Dict[str, float], qa_status: bool) -> float:
+    """Single number used to rank drafts: mean critic score, with a penalty for failing fact-check."""
+    mean = sum(float(scores.get(key, 0.0)) for key in SCORE_KEYS) / len(SCORE_KEYS)
+    return round(mean - (0.0 if qa_status else 0.1), 4)
+
+def thresholds_met(state: SongWritingState) -> bool:
+    thresholds = state.get("thresholds", {})
+    scores = state.get("critic_scores", {})
+    return (
+        scores.get("creativity", 0) >= thresholds.get("creativity", 0.5) and
+        scores.get("freshness", 0) >= thresholds.get("freshness", 0.5) and
+        scores.get("humor", 0) >= thresholds.get("humor", 0.4) and
+        state.get("qa_status", False)
+    )
+
+def has_plateaued(history: List[float], min_improvement: float, patience: int) -> bool:
+    """True when the last `patience` scores failed to beat the earlier best by `min_improvement`."""
+    if patience <= 0 or len(history) <= patience:
+        return False
+    return max(history[-patience:]) - max(history[:-patience]) < min_improvement
+
+def decide_revision(state: SongWritingState, history: Optional[List[float]] = None) -> Tuple[str, str]:
+    """Pure routing decision after critics: ("release" | "revise", reason)."""
+    history = history if history is not None else state.get("score_history", [])
+    current_revision = state.get("revision_number", 0)
+    limit = state.get("max_revisions") or DEFAULT_MAX_REVISIONS
+    min_improvement = state.get("min_improvement")
+    if min_improvement is None:
+        min_improvement = MIN_SCORE_IMPROVEMENT
+
+    if thresholds_met(state):
+        return "release", "Thresholds met: Releasing."
+    if current_revision >= limit:
+        return "release", f"Max revisions ({limit}) hit: Releasing best draft."
+    if has_plateaued(history, min_improvement, PLATEAU_PATIENCE):
+        return "release", f"Scores plateaued (gain < {min_improvement}): Releasing best draft."
+    return "revise", "Thresholds not met: Revising."
+
+async def loop_controller(state: SongWritingState) -> Dict[str, Any]:
+    """
+    Joins fact_check and critics: folds their QA checks into qa_status,
+    records the score, keeps the best-scoring draft, and stores the
+    release/revise decision. On release the best draft (not necessarily the
+    latest) becomes the final draft_lyrics.
+    """
+    state = {**state, "qa_status": combined_qa(state.get("qa_checks"))}
+    score = score_draft(state.get("critic_scores", {}), state["qa_status"])
+    history = list(state.get("score_history") or []) + [score]
+
+    best = state.get("best_draft") or {}
+    if not best or score > best.get("score", float("-inf")):
+        best = {
+            "score": score,
+            "revision": state.get("revision_number", 0),
+            "draft_lyrics": state.get("draft_lyrics"),
+            "critic_scores": state.get("critic_scores", {}),
+            "qa_status": state.get("qa_status", False),
+        }
+
+    decision, reason = decide_revision(state, history)
+    update: Dict[str, Any] = {
+        "qa_status": state["qa_status"],
+        "score_history": history,
+        "best_draft": best,
+        "loop_decision": decision,
+        "loop_reason": reason,
+    }
+    if decision == "release" and best["revision"] != state.get("revision_number", 0):
+        print(f"[LOOP] Releasing revision {best['revision']} (score {best['score']}) over latest (score {score})")
+        update.update({
+            "draft_lyrics": best["draft_lyrics"],
+            "critic_scores": best["critic_scores"],
+            "qa_status": best["qa_status"],
+        })
+    return update
+
+def route_entry(state: SongWritingState) -> str:
+    """
+    Where a run starts. "revise" runs are seeded with a finished run's state
+    (facts, draft, feedback, scores), so they skip research and the first
+    drafting pass and go straight to the collaborator's next revision.
+    """
+    return "revise" if state.get("entry_point") == "revise" else "research"
+
+def revision_router(state: SongWritingState) -> str:
+    """Follows the loop controller's decision: release the best draft or loop back for another revision."""
+    # Enhanced logging: Write to file or console for tracing
+    print(f"[ROUTER DEBUG] Revision: {state.get('revision_number', 0)}, Scores: {state.get('critic_scores', {})}, QA: {state.get('qa_status', False)}, History: {state.get('score_history', [])}")
+    print(f"[ROUTER] {state.get('loop_reason', '')}")
+    return state.get("loop_decision", "release")
@@ -1,16 +1,59 @@
 # app/graph/state.py
 
-from typing import TypedDict, Dict, Any, List, Annotated
-from operator import add
+from typing import TypedDict, Dict, Any, List, Annotated, Optional
+
+from app.utils.feedback import dedupe_feedback
+from app.utils.prompt_budget import TokenUsage, merge_token_usage
+from app.utils.song_document import SongDocument
+
+# --- Reducers ---
+# Parallel branches (brainstorm, fact_check + critics) return deltas; these merge them
+# in a fixed way regardless of which branch finishes first.
+
+def append_or_reset(current: Optional[List[str]], update: Optional[List[str]]) -> List[str]:
+    """Appends entries not already present; None clears the list (used when a new revision starts)."""
+    if update is None:
+        return []
+    return dedupe_feedback((current or []) + update)
+
+def merge_checks(current: Optional[Dict[str, bool]], update: Optional[Dict[str, bool]]) -> Dict[str, bool]:
+    """Merges per-checker QA verdicts by name; None clears them."""
+    if update is None:
+        return {}
+    return {**(current or {}), **update}
+
+def combined_qa(checks: Optional[Dict[str, bool]]) -> bool:
+    """The draft passes QA only if every checker that ran passed it."""
+    return bool(checks) and all(checks.values())
+
+# Keys merged through a reducer rather than overwritten (mirrored by the stream/job state tracking)
+STATE_REDUCERS = {
+    "feedback": append_or_reset,
+    "critic_suggestions": append_or_reset,
+    "qa_checks": merge_checks,
+    "token_usage": merge_token_usage,
+}
 
 class SongWritingState(TypedDict):
     """Shared state schema for the LangGraph workflow."""
+    entry_point: str  # "research" (full run) | "revise" (continue from a saved draft; see route_entry)
     inspiration: str
     thresholds: Dict[str, float]  # e.g., {"creativity": 0.8, "freshness": 0.7, "humor": 0.6}
     revision_number: int
-    draft_lyrics: str
+    draft_lyrics: SongDocument  # Structured draft; serialized only at the API boundary
     original_facts: List[str]
-    feedback: Annotated[List[str], add]  # Allows parallel nodes to append concurrently
-    critic_suggestions: List[str]
+    feedback: Annotated[List[str], append_or_reset]  # Allows parallel nodes to append concurrently
+    critic_suggestions: Annotated[List[str], append_or_reset]
     critic_scores: Dict[str, float]  # e.g., {"creativity": 0.85, "freshness": 0.75, "humor": 0.65}
-    qa_status: bool  # Fact-check pass
\ No newline at end of file
+    qa_checks: Annotated[Dict[str, bool], merge_checks]  # e.g., {"fact_check": True, "critics": False}
+    qa_status: bool  # All qa_checks passed; set by the loop controller after the evaluation join
+    critic_target_sections: List[str]  # Sections the critics' suggestions point at (e.g. ["[chorus]"])
+    revised_sections: List[str]  # Sections the last revision regenerated; empty means a full rewrite
+    # Loop control (see app/graph/routing.py)
+    max_revisions: Optional[int]  # Per-request revision budget; None uses config.max_revisions
+    min_improvement: Optional[float]  # Per-request plateau threshold; None uses MIN_SCORE_IMPROVEMENT
+    score_history: List[float]  # One combined score per critics pass
+    best_draft: Dict[str, Any]  # {"score", "revision", "draft_lyrics" (SongDocument), "critic_scores", "qa_status"}
+    loop_decision: str  # "release" | "revise"
+    loop_reason: str
+    token_usage: Annotated[TokenUsage, merge_token_usage]  # Estimated prompt tokens per node and section, summed over the run
\ No newline at end of file
@@ -1,21 +1,25 @@
 # app/graph/workflow.py
 
 from langgraph.graph import StateGraph, END
+import threading
 from typing import Dict, Any
 
 from app.agents.researcher import ResearcherAgent
 from app.agents.collaborator import CollaboratorAgent
 from app.agents.brainstorm import YesAndAgent, NoButAgent, NonSequiturAgent
-from app.agents.researcher import fact_check_node
+from app.agents.researcher import fact_check_runnable
 from app.agents.critics import CriticsAgent
 from app.graph.state import SongWritingState
+from app.graph.routing import loop_controller, revision_router, route_entry
+from app.utils.startup import startup_timer
 
 def build_workflow():
+    """The songwriting graph; every node is async, so run it with ainvoke/astream (sync invoke is not supported)."""
     workflow = StateGraph(SongWritingState)
     
     agent_researcher = ResearcherAgent()
     agent_collaborator = CollaboratorAgent()
-    agent_fact_check = fact_check_node
+    agent_fact_check = fact_check_runnable
     agent_critics = CriticsAgent()
     
     # Instantiate brainstorm agents
@@ -23,17 +27,18 @@ def build_workflow():
     agent_no_but = NoButAgent()
     agent_non_sequitur = NonSequiturAgent()
     
-    # Add all nodes
-    workflow.add_node("researcher", agent_researcher)
-    workflow.add_node("collaborator", agent_collaborator)
-    workflow.add_node("yes_and", agent_yes_and)
-    workflow.add_node("no_but", agent_no_but)
-    workflow.add_node("non_sequitur", agent_non_sequitur)
+    # Add all nodes (async agents: parallel brainstorm branches overlap instead of blocking the loop)
+    workflow.add_node("researcher", agent_researcher.as_node())
+    workflow.add_node("collaborator", agent_collaborator.as_node())
+    workflow.add_node("yes_and", agent_yes_and.as_node())
+    workflow.add_node("no_but", agent_no_but.as_node())
+    workflow.add_node("non_sequitur", agent_non_sequitur.as_node())
     workflow.add_node("fact_check", agent_fact_check)
-    workflow.add_node("critics", agent_critics)
+    workflow.add_node("critics", agent_critics.as_node())
+    workflow.add_node("loop_controller", loop_controller)
     
     # Aggregator node to collect parallel feedback
-    def aggregate_feedback(state: SongWritingState) -> Dict[str, Any]:
+    async def aggregate_feedback(state: SongWritingState) -> Dict[str, Any]:
         """Collect feedback from parallel brainstorm agents."""
         feedback = state.get("feedback", [])
         print(f"[AGGREGATE] Collected {len(feedback)} feedback items")
@@ -43,8 +48,11 @@ def build_workflow():
     
     workflow.add_node("aggregate_feedback", aggregate_feedback)
     
-    # Sequential edges
-    workflow.set_entry_point("researcher")
+    # Sequential edges (revise runs enter at the collaborator with a saved run's state)
+    workflow.set_conditional_entry_point(
+        route_entry,
+        {"research": "researcher", "revise": "collaborator"}
+    )
     workflow.add_edge("researcher", "collaborator")
     
     # Parallel edges: all three brainstorm agents run in parallel
@@ -57,43 +65,31 @@ def build_workflow():
     workflow.add_edge("no_but", "aggregate_feedback")
     workflow.add_edge("non_sequitur", "aggregate_feedback")
     
-    # Continue sequential flow
+    # Evaluation fan-out: fact_check and critics both read only the draft, facts and
+    # inspiration, so they run together; loop_controller waits for both
     workflow.add_edge("aggregate_feedback", "fact_check")
-    workflow.add_edge("fact_check", "critics")
+    workflow.add_edge("aggregate_feedback", "critics")
+    workflow.add_edge(["fact_check", "critics"], "loop_controller")
     
-    def router(state: SongWritingState) -> str:
-        thresholds = state.get("thresholds", {})
-        scores = state.get("critic_scores", {})
-        qa_status = state.get("qa_status", False)
-        current_revision = state.get("revision_number", 0)
-        
-        creativity_thresh = thresholds.get("creativity", 0.5)
-        freshness_thresh = thresholds.get("freshness", 0.5)
-        humor_thresh = thresholds.get("humor", 0.4)
-        
-        # Enhanced logging: Write to file or console for tracing
-        print(f"[ROUTER DEBUG] Revision: {current_revision}, Scores: {scores}, QA: {qa_status}")
-        
-        if current_revision >= 5:
-            print("[ROUTER] Max revisions hit: Forcing release.")
-            return "release"
-        
-        if (scores.get("creativity", 0) >= creativity_thresh and
-            scores.get("freshness", 0) >= freshness_thresh and
-            scores.get("humor", 0) >= humor_thresh and
-            qa_status):
-            print("[ROUTER] Thresholds met: Releasing.")
-            return "release"
-        else:
-            print(f"[ROUTER] Thresholds not met: Revising.")
-            return "revise"
-
     workflow.add_conditional_edges(
-        "critics",
-        router,
+        "loop_controller",
+        revision_router,
         {"release": END, "revise": "collaborator"}
     )
     
     return workflow.compile()
 
-song_writer_app = build_workflow()
\ No newline at end of file
+# Compiled lazily: importing this module stays cheap, and the first request (or the
+# lifespan warm-up) pays for agent construction and graph compilation once.
+_song_writer_app = None
+_song_writer_app_lock = threading.Lock()
+
+def get_song_writer_app():
+    """Returns the compiled workflow, building it on first use."""
+    global _song_writer_app
+    if _song_writer_app is None:
+        with _song_writer_app_lock:
+            if _song_writer_app is None:
+                with startup_timer.phase("song_writer_graph", kind="lazy"):
+                    _song_writer_app = build_workflow()
+    return _song_writer_app
@@ -1,13 +1,26 @@
+from app.utils.startup import startup_timer  # First import: starts the startup clock
+
+import asyncio
 import os
-from fastapi import FastAPI
-from fastapi.responses import FileResponse, JSONResponse
-from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
 
-from app.api.routes import router
-from app.api.config_routes import configure_routes
+with startup_timer.phase("fastapi", kind="import"):
+    from fastapi import FastAPI
+    from fastapi.responses import FileResponse, JSONResponse
+    from fastapi.staticfiles import StaticFiles
+
+with startup_timer.phase("api_routes", kind="import"):
+    from app.api.routes import router, load_song_writer_app, run_checkpoints
+    from app.api.debug_routes import debug_router, loop_lag_monitor
+    from app.api.stream_routes import stream_router
+    from app.api.job_routes import job_router, job_queue
+    from app.api.run_routes import run_router
+    from app.api.batch_routes import batch_router
+    from app.api.metrics_routes import metrics_router
+    from app.api.config_routes import configure_routes
 
-from app.graph.workflow import song_writer_app
+from app.config import WARM_START
+from app.utils.tracing import init_tracing
 
 # --- Static File Configuration ---
 # Determine the base directory of the project
@@ -17,7 +30,41 @@ INDEX_PATH = os.path.join(STATIC_DIR, "index.html")
 # --- End Static File Configuration ---
 
 
-app = FastAPI(title="AI Songwriter Prosthesis", version="0.1.0")
+async def warm_song_writer_app():
+    """Registers tracing and builds the graph right after startup so the first request does not pay for it."""
+    try:
+        await asyncio.to_thread(init_tracing)
+        await load_song_writer_app()
+    except Exception as e:
+        print(f"!!! Graph warm-up failed (will retry on first request): {e} !!!")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Opens run checkpoints, starts the job workers and the loop-lag monitor; tracing and the graph warm up in the background."""
+    with startup_timer.phase("lifespan"):
+        if not WARM_START:
+            init_tracing()
+        try:
+            await run_checkpoints.open()
+        except Exception as e:
+            print(f"!!! Run checkpoints unavailable, runs will not be resumable: {e} !!!")
+        await job_queue.start()
+        loop_lag_monitor.start()
+    warm_task = asyncio.create_task(warm_song_writer_app()) if WARM_START else None
+    startup_timer.mark_ready()
+    yield
+    # Cancelled and awaited, so the warm-up is not still attaching the graph when the checkpoint connection closes
+    if warm_task is not None and not warm_task.done():
+        warm_task.cancel()
+        try:
+            await warm_task
+        except asyncio.CancelledError:
+            pass
+    await loop_lag_monitor.stop()
+    await job_queue.stop()
+    await run_checkpoints.close()
+
+app = FastAPI(title="AI Songwriter Prosthesis", version="0.1.0", lifespan=lifespan)
 
 # Mount static files (optional but good practice for assets)
 if os.path.isdir(STATIC_DIR):
@@ -26,6 +73,12 @@ if os.path.isdir(STATIC_DIR):
 # Configure routes
 configure_routes(app)
 app.include_router(router)
+app.include_router(stream_router)
+app.include_router(batch_router)
+app.include_router(job_router)
+app.include_router(run_router)
+app.include_router(debug_router)
+app.include_router(metrics_router)
 
 @app.get("/")
 async def serve_frontend():
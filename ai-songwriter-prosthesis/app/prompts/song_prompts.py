@@ -26,6 +26,15 @@ Human Lines to Preserve (JSON): {human_lines_json}
 Feedback/Suggestions: {feedback_and_suggestions}
 
 Draft/Revise the entire song. Output ONLY the complete, valid JSON array:""",
+    "collaborator_section_human": """Revision {revision_number}: rewrite ONLY these sections: {target_sections}
+Inspiration: {inspiration}
+Facts: {original_facts}
+Current song (context only; every other section stays exactly as it is):
+{song_text}
+Lines in the sections to rewrite (JSON): {target_lines_json}
+Feedback/Suggestions: {feedback_and_suggestions}
+
+Keep every `source: 'human'` line in these sections unchanged and use the same section tags. Output ONLY a JSON array of the new lines for these sections:""",
 
     # YesAnd (positive amp)
     "yesand_system": "Lonely Island improv: Affirm gag, amp with 1-2 wild escalations (e.g., 'crotch anomaly → alien probe'). Positive, rhythmic, satirical.",
@@ -41,5 +50,5 @@ Draft/Revise the entire song. Output ONLY the complete, valid JSON array:""",
 
     # Critics (satire scoring) - ENHANCED: Added few-shot examples for consistent JSON output
     "critics_system": "Lonely Island panel: Score 0-1 creativity (twists), freshness (no lazy refs), humor (escalation). Fact-check. Suggest tweaks: 'Add cultural roasts' or 'Escalate like \"Dick in a Box\"'. JSON only.",
-    "critics_human": ""
+    "critics_human": "Inspiration: {inspiration}\nDraft (section headers, numbered lines):\n{draft_lyrics}\n\nScore and critique this draft:"
 }
\ No newline at end of file
@@ -0,0 +1,169 @@
+# app/utils/fact_store.py
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set
+
+# Words that say nothing about a topic; left out of full-text queries and coverage
+STOPWORDS = {
+    "the", "and", "for", "with", "about", "from", "into", "that", "this", "who", "what", "when",
+    "where", "why", "how", "are", "was", "were", "his", "her", "their", "its", "our", "your",
+    "song", "songs", "lyrics", "a", "an", "of", "to", "in", "on", "at", "by", "is", "it",
+}
+
+
+def topic_terms(text: str) -> List[str]:
+    """Lowercased content words in order of first appearance (no stopwords, no 1-2 letter words)."""
+    seen: List[str] = []
+    for word in re.findall(r"[a-z0-9]+", (text or "").lower()):
+        if len(word) > 2 and word not in STOPWORDS and word not in seen:
+            seen.append(word)
+    return seen
+
+
+def _stem(word: str) -> str:
+    """Crude plural folding for coverage, close enough to FTS5's porter tokenizer for topic words."""
+    return word[:-1] if len(word) > 4 and word.endswith("s") else word
+
+
+class FactStore:
+    """
+    Local research memory: every search snippet is kept with its source, the
+    inspiration it was found for and when, in an SQLite FTS5 index. The
+    researcher asks it first; stored facts are ranked against the new
+    inspiration with BM25, and the lookup counts as a hit only when enough
+    fresh facts cover most of the inspiration's topic words. Related themes
+    reuse each other's research instead of searching again.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        ttl_seconds: float = 7 * 24 * 3600,
+        max_facts: int = 20000,
+        min_facts: int = 3,
+        min_coverage: float = 0.6,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_facts = max_facts
+        self.min_facts = min_facts
+        self.min_coverage = min_coverage
+        self.stats = {"hits": 0, "misses": 0, "stored": 0, "duplicates": 0}
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS facts ("
+            " id INTEGER PRIMARY KEY,"
+            " key TEXT UNIQUE NOT NULL,"
+            " snippet TEXT NOT NULL,"
+            " title TEXT NOT NULL,"
+            " source TEXT NOT NULL,"
+            " query TEXT NOT NULL,"
+            " created_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS facts_created_at ON facts (created_at)")
+        # External-content index over the facts table; rows are added/removed alongside it
+        self._conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS facts_fts USING fts5("
+            " snippet, title, query, content='facts', content_rowid='id', tokenize='porter unicode61')"
+        )
+        self._conn.commit()
+
+    # --- Lookup ---
+
+    def search(self, inspiration: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """Fresh facts matching the inspiration's topic words, best BM25 score first."""
+        terms = topic_terms(inspiration)
+        if not terms:
+            return []
+        # Only the fact itself counts: the inspiration a fact was stored under may be a different event
+        match = "{snippet title} : (" + " OR ".join(f'"{term}"' for term in terms) + ")"
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT f.snippet, f.title, f.source, f.query, f.created_at, bm25(facts_fts, 1.0, 0.5, 0.0)"
+                " FROM facts_fts JOIN facts f ON f.id = facts_fts.rowid"
+                " WHERE facts_fts MATCH ? AND f.created_at >= ?"
+                " ORDER BY bm25(facts_fts, 1.0, 0.5, 0.0) LIMIT ?",
+                (match, time.time() - self.ttl_seconds, limit),
+            ).fetchall()
+        return [
+            {"snippet": row[0], "title": row[1], "source": row[2], "query": row[3], "created_at": row[4], "score": round(-row[5], 3)}
+            for row in rows
+        ]
+
+    def coverage(self, inspiration: str, facts: List[Dict[str, Any]]) -> float:
+        """Share of the inspiration's topic words that appear in the facts' snippets and titles."""
+        terms = {_stem(term) for term in topic_terms(inspiration)}
+        if not terms:
+            return 0.0
+        found: Set[str] = set()
+        for fact in facts:
+            found.update(_stem(term) for term in topic_terms(f"{fact['snippet']} {fact['title']}"))
+        return len(terms & found) / len(terms)
+
+    def lookup(self, inspiration: str, limit: int = 5) -> Optional[List[Dict[str, Any]]]:
+        """Stored facts when they are enough to skip a live search, else None (and the miss is counted)."""
+        facts = self.search(inspiration, limit)
+        if len(facts) >= self.min_facts and self.coverage(inspiration, facts) >= self.min_coverage:
+            self.stats["hits"] += 1
+            return facts
+        self.stats["misses"] += 1
+        return None
+
+    # --- Storage ---
+
+    def add(self, inspiration: str, snippets: List[Dict[str, str]]) -> int:
+        """Stores new snippets (duplicates only refresh their timestamp); returns how many were new."""
+        now = time.time()
+        added = 0
+        with self._lock:
+            for item in snippets:
+                key = hashlib.sha256(item["snippet"].strip().lower().encode("utf-8")).hexdigest()
+                if self._conn.execute("UPDATE facts SET created_at = ? WHERE key = ?", (now, key)).rowcount:
+                    self.stats["duplicates"] += 1
+                    continue
+                cursor = self._conn.execute(
+                    "INSERT INTO facts (key, snippet, title, source, query, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, item["snippet"], item.get("title", ""), item.get("source", ""), inspiration, now),
+                )
+                self._conn.execute(
+                    "INSERT INTO facts_fts (rowid, snippet, title, query) VALUES (?, ?, ?, ?)",
+                    (cursor.lastrowid, item["snippet"], item.get("title", ""), inspiration),
+                )
+                added += 1
+            self._evict(now)
+            self._conn.commit()
+        self.stats["stored"] += added
+        return added
+
+    def _evict(self, now: float) -> None:
+        """Drops expired facts, then the oldest beyond max_facts. Caller holds the lock."""
+        rows = self._conn.execute(
+            "SELECT id, snippet, title, query FROM facts WHERE created_at < ?"
+            " UNION SELECT id, snippet, title, query FROM facts WHERE id NOT IN"
+            " (SELECT id FROM facts ORDER BY created_at DESC LIMIT ?)",
+            (now - self.ttl_seconds, self.max_facts),
+        ).fetchall()
+        for row in rows:
+            # External-content FTS rows are removed with the 'delete' command and the old values
+            self._conn.execute(
+                "INSERT INTO facts_fts (facts_fts, rowid, snippet, title, query) VALUES ('delete', ?, ?, ?, ?)", row
+            )
+            self._conn.execute("DELETE FROM facts WHERE id = ?", (row[0],))
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            count = self._conn.execute("SELECT COUNT(*) FROM facts").fetchone()[0]
+        return {
+            **self.stats,
+            "facts": count,
+            "ttl_seconds": self.ttl_seconds,
+            "min_facts": self.min_facts,
+            "min_coverage": self.min_coverage,
+        }
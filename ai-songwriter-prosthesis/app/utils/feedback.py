@@ -0,0 +1,104 @@
+# app/utils/feedback.py
+
+import re
+from typing import Iterable, List, Tuple
+
+from app.utils.tokens import estimate_tokens, truncate_to_tokens
+
+# Lower number = kept first. Critic suggestions drive the scores, so they outrank everything;
+# a failed fact check is next; passing checks and brainstorm color go last.
+CRITIC_PRIORITY = 0
+FEEDBACK_PRIORITIES: Tuple[Tuple[str, int], ...] = (
+    ("FAIL", 1),
+    ("CRITICAL", 2),
+    ("POSITIVE", 3),
+    ("LATERAL INPUT", 4),
+    ("PASS", 5),
+    ("Fact-check failed", 6),
+)
+DEFAULT_PRIORITY = 3
+
+_WS_RE = re.compile(r"\s+")
+
+
+def feedback_priority(item: str) -> int:
+    for prefix, priority in FEEDBACK_PRIORITIES:
+        if item.startswith(prefix):
+            return priority
+    return DEFAULT_PRIORITY
+
+
+def normalize_feedback(item: str) -> str:
+    """Dedup key: case- and whitespace-insensitive."""
+    return _WS_RE.sub(" ", item).strip().lower()
+
+
+def dedupe_feedback(items: Iterable[str]) -> List[str]:
+    """Drops blank entries and repeats, keeping the first occurrence in order."""
+    seen = set()
+    unique: List[str] = []
+    for item in items:
+        key = normalize_feedback(item)
+        if key and key not in seen:
+            seen.add(key)
+            unique.append(item.strip())
+    return unique
+
+
+class FeedbackWindow:
+    """
+    Picks the feedback that goes into the collaborator prompt: deduplicated,
+    highest priority first (most recent first within a priority), each item
+    clipped to `max_item_tokens`, and the whole window kept under
+    `token_budget`. Items that do not fit are optionally compressed into one
+    summary line instead of being dropped silently.
+    """
+
+    def __init__(self, token_budget: int = 600, max_items: int = 8, max_item_tokens: int = 160, summarize: bool = True):
+        self.token_budget = token_budget
+        self.max_items = max_items
+        self.max_item_tokens = max_item_tokens
+        self.summarize = summarize
+
+    def select(self, critic_suggestions: Iterable[str], feedback: Iterable[str]) -> List[str]:
+        """Window entries in their original order (critic suggestions first), plus the summary line if any."""
+        entries = [(CRITIC_PRIORITY, item) for item in dedupe_feedback(critic_suggestions)]
+        seen = {normalize_feedback(item) for _, item in entries}
+        entries += [
+            (feedback_priority(item), item) for item in dedupe_feedback(feedback) if normalize_feedback(item) not in seen
+        ]
+
+        # Rank by priority, newest first within a priority
+        ranked = sorted(range(len(entries)), key=lambda i: (entries[i][0], -i))
+        kept: List[int] = []
+        dropped: List[int] = []
+        used = 0
+        for i in ranked:
+            clipped = truncate_to_tokens(entries[i][1], self.max_item_tokens)
+            cost = estimate_tokens(clipped)
+            if len(kept) < self.max_items and used + cost <= self.token_budget:
+                entries[i] = (entries[i][0], clipped)
+                kept.append(i)
+                used += cost
+            else:
+                dropped.append(i)
+
+        window = [entries[i][1] for i in sorted(kept)]
+        if self.summarize and dropped:
+            summary = self._summary([entries[i][1] for i in sorted(dropped)], self.token_budget - used)
+            if summary:
+                window.append(summary)
+        return window
+
+    def render(self, critic_suggestions: Iterable[str], feedback: Iterable[str]) -> str:
+        """The bulleted feedback block for the prompt."""
+        window = self.select(critic_suggestions, feedback)
+        return "\n- " + "\n- ".join(window) if window else "No feedback provided yet."
+
+    @staticmethod
+    def _summary(items: List[str], budget: int) -> str:
+        """Extractive compression: the first sentence of each item that did not fit."""
+        if budget <= 8:
+            return ""
+        heads = [re.split(r"(?<=[.!?])\s", _WS_RE.sub(" ", item).strip(), maxsplit=1)[0] for item in items]
+        return truncate_to_tokens(f"Also raised ({len(items)} more): " + " / ".join(heads), budget)
@@ -0,0 +1,246 @@
+# app/utils/job_queue.py
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+# Job lifecycle states
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED_STATES = {SUCCEEDED, FAILED, CANCELLED}
+
+# runner(job_id, payload, report_progress) -> result dict
+ProgressFn = Callable[[Dict[str, Any]], Awaitable[None]]
+JobRunner = Callable[[str, Dict[str, Any], ProgressFn], Awaitable[Dict[str, Any]]]
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at capacity."""
+
+
+class JobStore:
+    """SQLite record of every job: request payload, status, latest partial state and result."""
+
+    def __init__(self, db_path: str, retention_seconds: float = 24 * 3600):
+        self.retention_seconds = retention_seconds
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY,"
+            " status TEXT NOT NULL,"
+            " payload TEXT NOT NULL,"
+            " partial TEXT,"
+            " result TEXT,"
+            " error TEXT,"
+            " created_at REAL NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def create(self, job_id: str, payload: Dict[str, Any]) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, payload, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, QUEUED, json.dumps(payload), now, now),
+            )
+            self._conn.execute(
+                "DELETE FROM jobs WHERE updated_at < ? AND status IN (?, ?, ?)",
+                (now - self.retention_seconds, *FINISHED_STATES),
+            )
+            self._conn.commit()
+
+    def update(self, job_id: str, expect_status: Optional[str] = None, **fields: Any) -> bool:
+        """
+        Updates status/error and JSON-encodes partial/result. With expect_status
+        the row only changes while the job is still in that state (so a cancel
+        is never overwritten); returns whether it changed.
+        """
+        for key in ("partial", "result"):
+            if key in fields:
+                fields[key] = json.dumps(fields[key], default=str)
+        fields["updated_at"] = time.time()
+        columns = ", ".join(f"{key} = ?" for key in fields)
+        condition, params = ("id = ?", (job_id,)) if expect_status is None else ("id = ? AND status = ?", (job_id, expect_status))
+        with self._lock:
+            changed = self._conn.execute(f"UPDATE jobs SET {columns} WHERE {condition}", (*fields.values(), *params)).rowcount
+            self._conn.commit()
+        return changed > 0
+
+    def claim(self, job_id: str) -> bool:
+        """Moves a queued job to running; False if it was cancelled (or claimed) first."""
+        return self.update(job_id, expect_status=QUEUED, status=RUNNING)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, status, payload, partial, result, error, created_at, updated_at"
+                " FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "id": row[0],
+            "status": row[1],
+            "request": json.loads(row[2]),
+            "partial": json.loads(row[3]) if row[3] else None,
+            "result": json.loads(row[4]) if row[4] else None,
+            "error": row[5],
+            "created_at": row[6],
+            "updated_at": row[7],
+        }
+
+    def mark_cancelled(self, job_id: str) -> None:
+        """Cancels only if the job has not already finished."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, updated_at = ? WHERE id = ? AND status IN (?, ?)",
+                (CANCELLED, time.time(), job_id, QUEUED, RUNNING),
+            )
+            self._conn.commit()
+
+    def ids_with_status(self, status: str) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id FROM jobs WHERE status = ? ORDER BY created_at", (status,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+
+class JobQueue:
+    """
+    Bounded queue drained by a fixed pool of asyncio workers, so the number of
+    workflows running against the model backend never exceeds `workers`.
+    Queued jobs survive a restart; jobs that were running are marked failed.
+    """
+
+    def __init__(self, store: JobStore, runner: JobRunner, workers: int = 2, max_queue: int = 100):
+        self.store = store
+        self.runner = runner
+        self.workers = max(1, workers)
+        self.max_queue = max_queue
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker_tasks: List[asyncio.Task] = []
+        self._running: Dict[str, asyncio.Task] = {}
+        # Jobs waiting for a worker; cancelled jobs leave it at once although their ids stay in the asyncio queue
+        self._pending: Set[str] = set()
+
+    async def start(self) -> None:
+        """Starts the worker pool (called from the FastAPI lifespan)."""
+        self._queue = asyncio.Queue()
+        for job_id in self.store.ids_with_status(RUNNING):
+            self.store.update(job_id, status=FAILED, error="Interrupted by server restart.")
+        for job_id in self.store.ids_with_status(QUEUED):
+            self._pending.add(job_id)
+            self._queue.put_nowait(job_id)
+        self._worker_tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        print(f"--- Job queue started: {self.workers} workers, {len(self._pending)} jobs pending ---")
+
+    async def stop(self) -> None:
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+
+    async def submit(self, payload: Dict[str, Any]) -> str:
+        if self._queue is None:
+            raise RuntimeError("Job queue is not running.")
+        if len(self._pending) >= self.max_queue:
+            raise QueueFullError(f"Job queue is full ({self.max_queue} pending).")
+        job_id = uuid.uuid4().hex
+        self._pending.add(job_id)
+        try:
+            await asyncio.to_thread(self.store.create, job_id, payload)
+        except Exception:
+            self._pending.discard(job_id)
+            raise
+        self._queue.put_nowait(job_id)
+        return job_id
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = await asyncio.to_thread(self.store.get, job_id)
+        if job is not None and job["status"] == QUEUED and self._queue is not None:
+            job["queue_depth"] = len(self._pending)
+        return job
+
+    async def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Cancels a queued or running job; finished jobs are returned unchanged."""
+        job = await asyncio.to_thread(self.store.get, job_id)
+        if job is None or job["status"] in FINISHED_STATES:
+            return job
+        # Marked first: a worker that has not claimed the job yet will fail to claim it
+        await asyncio.to_thread(self.store.mark_cancelled, job_id)
+        self._pending.discard(job_id)
+        # A worker registers its task as soon as it takes the job, so one that already did is stopped here
+        task = self._running.get(job_id)
+        if task is not None:
+            task.cancel()
+        return await asyncio.to_thread(self.store.get, job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "running": len(self._running),
+            "queued": len(self._pending),
+            "max_queue": self.max_queue,
+        }
+
+    # --- Helpers ---
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run_job(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"!!! Job worker {index} error on {job_id}: {e} !!!")
+            finally:
+                self._queue.task_done()
+
+    async def _run_job(self, job_id: str) -> None:
+        if job_id not in self._pending:
+            return  # Cancelled while queued
+        self._pending.discard(job_id)
+        # Registered before any await, so a cancel from here on finds and stops the task
+        task = asyncio.create_task(self._claim_and_run(job_id))
+        self._running[job_id] = task
+        try:
+            result = await task
+            if result is not None:
+                await asyncio.to_thread(self.store.update, job_id, expect_status=RUNNING, status=SUCCEEDED, result=result)
+        except asyncio.CancelledError:
+            if not task.cancelled():
+                # The worker itself is shutting down; leave the job for restart handling.
+                task.cancel()
+                raise
+            print(f"--- Job {job_id} cancelled ---")
+        except Exception as e:
+            print(f"!!! Job {job_id} failed: {e} !!!")
+            await asyncio.to_thread(self.store.update, job_id, expect_status=RUNNING, status=FAILED, error=str(e))
+        finally:
+            self._running.pop(job_id, None)
+
+    async def _claim_and_run(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Claims the job (QUEUED -> RUNNING in one conditional update) and runs it; None if it was cancelled first."""
+        if not await asyncio.to_thread(self.store.claim, job_id):
+            return None
+        job = await asyncio.to_thread(self.store.get, job_id)
+
+        async def report_progress(partial: Dict[str, Any]) -> None:
+            await asyncio.to_thread(self.store.update, job_id, expect_status=RUNNING, partial=partial)
+
+        return await self.runner(job_id, job["request"], report_progress)
@@ -1,8 +1,7 @@
 # app/utils/llm.py
 
 # from langchain_google_genai import ChatGoogleGenerativeAI
-# from langchain_community.utilities import SerpAPIWrapper
-# from app.config import GOOGLE_API_KEY, SERPAPI_API_KEY  # Assuming your structure
+# # from app.config import GOOGLE_API_KEY, SERPAPI_API_KEY  # Assuming your structure
 
 # # Creative model (default higher temp for drafting/brainstorm)
 # creative_model = ChatGoogleGenerativeAI(
@@ -24,11 +23,145 @@
  # app/utils/llm.py
 # app/utils/llm.py
 
-from langchain_community.utilities import SerpAPIWrapper
-from app.config import SERPAPI_API_KEY  # Only SERP key needed now
+import threading
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
 
-# Ollama base URL (resolves host from Docker; change to "http://localhost:11434" if not containerized)
-OLLAMA_BASE_URL = "http://host.docker.internal:11434"
+from langchain_core.globals import set_llm_cache
+from langchain_ollama import ChatOllama
+from app.config import (
+    SERPAPI_API_KEY,
+    SERPAPI_BASE_URL,
+    OLLAMA_BASE_URL,
+    OLLAMA_KEEP_ALIVE,
+    MODEL_SCHEDULER_ENABLED,
+    MODEL_SCHEDULER_MAX_CONCURRENT,
+    MODEL_SCHEDULER_MAX_CONSECUTIVE,
+    LLM_CACHE_ENABLED,
+    LLM_CACHE_PATH,
+    LLM_CACHE_MEMORY_ENTRIES,
+    LLM_CACHE_MAX_ENTRIES,
+    LLM_CACHE_TTL_SECONDS,
+    FACT_STORE_ENABLED,
+    FACT_STORE_PATH,
+    FACT_STORE_TTL_SECONDS,
+    FACT_STORE_MAX_FACTS,
+    FACT_STORE_MIN_FACTS,
+    FACT_STORE_MIN_COVERAGE,
+)
+from app.utils.fact_store import FactStore
+from app.utils.llm_cache import TieredLLMCache
+from app.utils.metrics import cache_collector, llm_cache_counts
+from app.utils.model_scheduler import ModelAffinityScheduler
+from app.utils.startup import startup_timer
 
-# SERP search tool for facts (use .run(query, num_results=5) in agents)
-search_tool = SerpAPIWrapper(serpapi_api_key=SERPAPI_API_KEY)  # Unchanged
\ No newline at end of file
+# SERP search tool for facts (use .run(query, num_results=5) in agents); built on first use
+_search_tool = None
+
+def get_search_tool():
+    """Returns the shared SerpAPI wrapper, importing langchain_community only when research first runs."""
+    global _search_tool
+    if _search_tool is None:
+        with startup_timer.phase("serpapi_wrapper", kind="lazy"):
+            from app.utils.search_endpoint import build_search_wrapper
+            _search_tool = build_search_wrapper(SERPAPI_API_KEY, SERPAPI_BASE_URL)
+    return _search_tool
+
+# Research snippets reused across themes; the researcher only searches on a miss
+fact_store = None
+if FACT_STORE_ENABLED:
+    fact_store = FactStore(
+        db_path=FACT_STORE_PATH,
+        ttl_seconds=FACT_STORE_TTL_SECONDS,
+        max_facts=FACT_STORE_MAX_FACTS,
+        min_facts=FACT_STORE_MIN_FACTS,
+        min_coverage=FACT_STORE_MIN_COVERAGE,
+    )
+    cache_collector.register("facts", lambda: (fact_store.stats["hits"], fact_store.stats["misses"]))
+
+# Process-wide response cache under every chat model (ChatOllama picks up the global cache)
+llm_cache = None
+if LLM_CACHE_ENABLED:
+    llm_cache = TieredLLMCache(
+        db_path=LLM_CACHE_PATH,
+        memory_entries=LLM_CACHE_MEMORY_ENTRIES,
+        max_entries=LLM_CACHE_MAX_ENTRIES,
+        ttl_seconds=LLM_CACHE_TTL_SECONDS,
+    )
+    set_llm_cache(llm_cache)
+    cache_collector.register("llm", lambda: llm_cache_counts(llm_cache.snapshot()))
+
+
+# --- Model-Affinity Scheduling ---
+# Groups Ollama calls by model across concurrent requests so the host does not
+# unload/reload llama3.1 and mistral-nemo on every node.
+model_scheduler = ModelAffinityScheduler(
+    max_concurrent=MODEL_SCHEDULER_MAX_CONCURRENT,
+    max_consecutive=MODEL_SCHEDULER_MAX_CONSECUTIVE,
+)
+
+class ScheduledChatMixin:
+    """Async calls wait for a scheduler slot keyed by the model name; cache hits never reach the scheduler."""
+
+    async def _agenerate(self, *args: Any, **kwargs: Any):
+        async with model_scheduler.slot(self.model):
+            return await super()._agenerate(*args, **kwargs)
+
+    async def _astream(self, *args: Any, **kwargs: Any) -> AsyncIterator[Any]:
+        async with model_scheduler.slot(self.model):
+            async for chunk in super()._astream(*args, **kwargs):
+                yield chunk
+
+class ScheduledChatOllama(ScheduledChatMixin, ChatOllama):
+    """ChatOllama admitted by the model-affinity scheduler."""
+
+# --- Shared Chat Model Registry ---
+# One ChatOllama per (model, base_url, temperature, options): each instance owns an
+# ollama client whose httpx connection pool is reused by every agent and every call.
+_chat_models: Dict[Tuple[Any, ...], ChatOllama] = {}
+_chat_models_lock = threading.Lock()
+# (model, temperature) -> stand-in chat model; scripts/bench_graph.py installs its scripted model
+_stand_in_factory: Optional[Callable[[str, float], Any]] = None
+
+def use_stand_ins(chat_model_factory: Callable[[str, float], Any], search_tool: Any) -> None:
+    """Chat models created from now on come from chat_model_factory, and research uses search_tool (no Ollama or SerpAPI)."""
+    global _stand_in_factory, _search_tool
+    _stand_in_factory = chat_model_factory
+    _search_tool = search_tool
+
+def get_chat_model(
+    model: str,
+    temperature: float,
+    base_url: Optional[str] = None,
+    keep_alive: Optional[str] = None,
+    **options: Any,
+) -> ChatOllama:
+    """Returns the shared ChatOllama for these settings, creating it on first use."""
+    base_url = base_url or OLLAMA_BASE_URL
+    keep_alive = keep_alive or OLLAMA_KEEP_ALIVE
+    key = (model, base_url, temperature, keep_alive, tuple(sorted(options.items())))
+    with _chat_models_lock:
+        chat_model = _chat_models.get(key)
+        if chat_model is None:
+            print(f"--- Creating shared chat model: {model} (temperature={temperature}) ---")
+            if _stand_in_factory is not None:
+                chat_model = _stand_in_factory(model, temperature)
+                _chat_models[key] = chat_model
+                return chat_model
+            model_cls = ScheduledChatOllama if MODEL_SCHEDULER_ENABLED else ChatOllama
+            chat_model = model_cls(
+                model=model,
+                base_url=base_url,
+                temperature=temperature,
+                keep_alive=keep_alive,  # Keeps weights resident between agent calls
+                **options,
+            )
+            _chat_models[key] = chat_model
+        return chat_model
+
+def registered_chat_models() -> List[Dict[str, Any]]:
+    """Describes the shared chat models, for the debug endpoint."""
+    with _chat_models_lock:
+        return [
+            {"model": key[0], "base_url": key[1], "temperature": key[2], "keep_alive": key[3], "options": dict(key[4])}
+            for key in _chat_models
+        ]
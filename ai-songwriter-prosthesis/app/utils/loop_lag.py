@@ -0,0 +1,66 @@
+# app/utils/loop_lag.py
+
+import asyncio
+import statistics
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+
+class EventLoopLagMonitor:
+    """
+    Measures event-loop lag: a task sleeps for `interval` seconds and records
+    how late it wakes up. Sustained lag means something is blocking the loop
+    (sync I/O, CPU-heavy parsing) and every in-flight request is waiting on it.
+    Keeps the last `window` samples plus the all-time maximum.
+    """
+
+    def __init__(self, interval: float = 0.1, window: int = 3000):
+        self.interval = interval
+        self.samples: Deque[float] = deque(maxlen=window)
+        self.max_lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def reset(self) -> None:
+        self.samples.clear()
+        self.max_lag = 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Lag percentiles in milliseconds over the sample window."""
+        samples = sorted(self.samples)
+        if not samples:
+            return {"samples": 0, "interval_ms": self.interval * 1000}
+
+        def pct(p: float) -> float:
+            return round(samples[min(len(samples) - 1, int(p * len(samples)))] * 1000, 2)
+
+        return {
+            "samples": len(samples),
+            "interval_ms": self.interval * 1000,
+            "mean_ms": round(statistics.mean(samples) * 1000, 2),
+            "p50_ms": pct(0.50),
+            "p99_ms": pct(0.99),
+            "window_max_ms": round(samples[-1] * 1000, 2),
+            "max_ms": round(self.max_lag * 1000, 2),
+        }
+
+    async def _run(self) -> None:
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - started - self.interval)
+            self.samples.append(lag)
+            self.max_lag = max(self.max_lag, lag)
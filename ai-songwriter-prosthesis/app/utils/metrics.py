@@ -0,0 +1,185 @@
+# app/utils/metrics.py
+
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+# Model calls and nodes range from cache hits to multi-minute local generations
+LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 80, 160, 320)
+
+GRAPH_RUNS = Counter("songwriter_graph_runs_total", "Completed graph runs.", ["graph", "status"])
+GRAPHS_IN_FLIGHT = Gauge("songwriter_graphs_in_flight", "Graph runs currently executing.", ["graph"])
+GRAPH_SECONDS = Histogram("songwriter_graph_seconds", "Wall time of a whole graph run.", ["graph"], buckets=LATENCY_BUCKETS)
+NODE_SECONDS = Histogram("songwriter_node_seconds", "Wall time per graph node execution.", ["graph", "node"], buckets=LATENCY_BUCKETS)
+NODE_ERRORS = Counter("songwriter_node_errors_total", "Graph node executions that raised.", ["graph", "node"])
+REVISIONS = Histogram("songwriter_revisions", "Revisions per graph run.", ["graph"], buckets=(0, 1, 2, 3, 4, 5, 6, 8, 10))
+ROUTER_DECISIONS = Counter("songwriter_router_decisions_total", "Loop controller decisions.", ["graph", "decision", "reason"])
+LLM_SECONDS = Histogram("songwriter_llm_call_seconds", "Chat model call latency (cache hits included).", ["model"], buckets=LATENCY_BUCKETS)
+LLM_CALLS = Counter("songwriter_llm_calls_total", "Chat model calls.", ["model", "status"])
+LLM_TOKENS = Counter("songwriter_llm_tokens_total", "Tokens reported by chat models.", ["model", "kind"])
+
+
+def _reason_label(reason: str) -> str:
+    """'Max revisions (5) hit: Releasing best draft.' -> 'max_revisions_hit' (bounded label values)."""
+    head = re.sub(r"\s*\([^)]*\)", "", (reason or "").split(":")[0]).strip().lower()
+    return re.sub(r"[^a-z0-9]+", "_", head).strip("_") or "unknown"
+
+
+def _model_name(serialized: Optional[Dict[str, Any]], metadata: Optional[Dict[str, Any]]) -> str:
+    metadata = metadata or {}
+    if metadata.get("ls_model_name"):
+        return str(metadata["ls_model_name"])
+    kwargs = (serialized or {}).get("kwargs") or {}
+    return str(kwargs.get("model") or kwargs.get("model_name") or "unknown")
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """
+    Feeds the Prometheus metrics from LangChain callbacks: pass it in the
+    config of every graph invocation and it times the run, each node (the
+    graph run's direct children), every chat model call and its tokens, and
+    counts loop-controller decisions from node outputs. Nodes need no
+    instrumentation of their own.
+    """
+
+    run_inline = True  # Cheap, thread-safe updates; no executor hop per callback
+
+    def __init__(self, graph: str):
+        self.graph = graph
+        self._graph_runs: Dict[UUID, float] = {}
+        self._node_runs: Dict[UUID, Tuple[str, float]] = {}
+        self._llm_runs: Dict[UUID, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    # --- Graph and nodes ---
+
+    def on_chain_start(self, serialized: Optional[Dict[str, Any]], inputs: Any, *, run_id: UUID, parent_run_id: Optional[UUID] = None, metadata: Optional[Dict[str, Any]] = None, **kwargs: Any) -> None:
+        now = time.perf_counter()
+        with self._lock:
+            if parent_run_id is None:
+                self._graph_runs[run_id] = now
+                GRAPHS_IN_FLIGHT.labels(self.graph).inc()
+                return
+            node = (metadata or {}).get("langgraph_node")
+            if node and not node.startswith("__") and kwargs.get("name") == node and parent_run_id in self._graph_runs:
+                self._node_runs[run_id] = (node, now)
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        now = time.perf_counter()
+        with self._lock:
+            graph_started = self._graph_runs.pop(run_id, None)
+            node_run = self._node_runs.pop(run_id, None)
+        if graph_started is not None:
+            self._finish_graph(graph_started, now, "ok")
+            if isinstance(outputs, dict) and outputs.get("revision_number") is not None:
+                REVISIONS.labels(self.graph).observe(outputs["revision_number"])
+        elif node_run is not None:
+            node, started = node_run
+            NODE_SECONDS.labels(self.graph, node).observe(now - started)
+            if isinstance(outputs, dict) and outputs.get("loop_decision"):
+                ROUTER_DECISIONS.labels(self.graph, outputs["loop_decision"], _reason_label(outputs.get("loop_reason", ""))).inc()
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        now = time.perf_counter()
+        with self._lock:
+            graph_started = self._graph_runs.pop(run_id, None)
+            node_run = self._node_runs.pop(run_id, None)
+        if graph_started is not None:
+            self._finish_graph(graph_started, now, "error")
+        elif node_run is not None:
+            node, started = node_run
+            NODE_SECONDS.labels(self.graph, node).observe(now - started)
+            NODE_ERRORS.labels(self.graph, node).inc()
+
+    def _finish_graph(self, started: float, now: float, status: str) -> None:
+        GRAPHS_IN_FLIGHT.labels(self.graph).dec()
+        GRAPH_SECONDS.labels(self.graph).observe(now - started)
+        GRAPH_RUNS.labels(self.graph, status).inc()
+
+    # --- Chat models ---
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[Any]], *, run_id: UUID, metadata: Optional[Dict[str, Any]] = None, **kwargs: Any) -> None:
+        with self._lock:
+            self._llm_runs[run_id] = (_model_name(serialized, metadata), time.perf_counter())
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID, metadata: Optional[Dict[str, Any]] = None, **kwargs: Any) -> None:
+        self.on_chat_model_start(serialized, [], run_id=run_id, metadata=metadata)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            llm_run = self._llm_runs.pop(run_id, None)
+        if llm_run is None:
+            return
+        model, started = llm_run
+        LLM_SECONDS.labels(model).observe(time.perf_counter() - started)
+        LLM_CALLS.labels(model, "ok").inc()
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                if usage.get("input_tokens"):
+                    LLM_TOKENS.labels(model, "input").inc(usage["input_tokens"])
+                if usage.get("output_tokens"):
+                    LLM_TOKENS.labels(model, "output").inc(usage["output_tokens"])
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            llm_run = self._llm_runs.pop(run_id, None)
+        if llm_run is not None:
+            model, started = llm_run
+            LLM_SECONDS.labels(model).observe(time.perf_counter() - started)
+            LLM_CALLS.labels(model, "error").inc()
+
+
+# --- Cache Hit Ratios ---
+
+class CacheCollector:
+    """
+    Reads hit/miss counters from the registered caches at scrape time, so the
+    caches keep their own counters (also shown on /debug) and nothing is
+    double counted.
+    """
+
+    def __init__(self):
+        self._sources: Dict[str, Callable[[], Tuple[float, float]]] = {}
+
+    def register(self, name: str, counts: Callable[[], Tuple[float, float]]) -> None:
+        """counts() returns (hits, misses) so far."""
+        self._sources[name] = counts
+
+    def collect(self) -> Iterable[Any]:
+        hits = CounterMetricFamily("songwriter_cache_hits", "Cache hits.", labels=["cache"])
+        misses = CounterMetricFamily("songwriter_cache_misses", "Cache misses.", labels=["cache"])
+        ratio = GaugeMetricFamily("songwriter_cache_hit_ratio", "Hits / lookups since start.", labels=["cache"])
+        for name, counts in list(self._sources.items()):
+            try:
+                hit, miss = counts()
+            except Exception as e:
+                print(f"!!! Metrics: could not read cache '{name}': {e} !!!")
+                continue
+            hits.add_metric([name], hit)
+            misses.add_metric([name], miss)
+            ratio.add_metric([name], hit / (hit + miss) if hit + miss else 0.0)
+        yield hits
+        yield misses
+        yield ratio
+
+
+cache_collector = CacheCollector()
+REGISTRY.register(cache_collector)
+
+
+def llm_cache_counts(snapshot: Dict[str, Any]) -> Tuple[float, float]:
+    """(hits, misses) from a TieredLLMCache snapshot."""
+    return snapshot.get("memory_hits", 0) + snapshot.get("disk_hits", 0), snapshot.get("misses", 0)
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Prometheus text exposition of the process registry and its content type."""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -0,0 +1,145 @@
+# app/utils/model_scheduler.py
+
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+
+
+class ModelAffinityScheduler:
+    """
+    Admits model calls so that only one model is active on the backend at a time.
+    Calls for the active model run concurrently (up to `max_concurrent` at once,
+    no cap when it is 0), so a request's own fan-outs stay parallel; only calls
+    for other models wait, in a per-model queue. When the active model goes idle the
+    scheduler switches to the model with the most waiters and drains its queue.
+    After `max_consecutive` grants with other models waiting, the active model
+    stops admitting so a busy model cannot starve the rest.
+
+    An idle scheduler admits any call immediately. A lone request still waits
+    when its parallel branches use different models (e.g. brainstorm on one,
+    critics on another): those calls take turns instead of making Ollama swap.
+    """
+
+    def __init__(self, max_concurrent: int = 4, max_consecutive: int = 8):
+        self.max_concurrent = max(0, max_concurrent)
+        self.max_consecutive = max(1, max_consecutive)
+        self.active: Optional[str] = None
+        self.running = 0
+        self.swaps = 0
+        self._granted_in_turn = 0
+        self._waiters: Dict[str, Deque[asyncio.Future]] = {}
+        self._model_stats: Dict[str, Dict[str, float]] = {}
+
+    @asynccontextmanager
+    async def slot(self, model: str) -> AsyncIterator[None]:
+        """Holds a backend slot for `model` for the duration of the block."""
+        await self.acquire(model)
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def acquire(self, model: str) -> None:
+        started = time.perf_counter()
+        if self._can_admit(model):
+            self._admit(model)
+        else:
+            future = asyncio.get_running_loop().create_future()
+            self._waiters.setdefault(model, deque()).append(future)
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    # Granted just as we were cancelled: hand the slot on.
+                    self.release()
+                elif future in self._waiters[model]:
+                    self._waiters[model].remove(future)
+                raise
+        self._record_wait(model, time.perf_counter() - started)
+
+    def release(self) -> None:
+        self.running -= 1
+        self._dispatch()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Active model, queue depths and swap count, for the debug endpoint."""
+        return {
+            "active_model": self.active,
+            "running": self.running,
+            "swaps": self.swaps,
+            "max_concurrent": self.max_concurrent,
+            "max_consecutive": self.max_consecutive,
+            "models": {
+                model: {
+                    **stats,
+                    "wait_seconds": round(stats["wait_seconds"], 4),
+                    "queued": len(self._waiters.get(model, ())),
+                    "avg_wait_seconds": round(stats["wait_seconds"] / stats["calls"], 4) if stats["calls"] else 0.0,
+                }
+                for model, stats in self._model_stats.items()
+            },
+        }
+
+    # --- Helpers ---
+
+    def _others_waiting(self, model: str) -> bool:
+        return any(queue for name, queue in self._waiters.items() if name != model)
+
+    def _turn_open(self, model: str) -> bool:
+        """True while `model` may keep admitting calls without switching."""
+        return (
+            model == self.active
+            and (self.max_concurrent == 0 or self.running < self.max_concurrent)
+            and not (self._granted_in_turn >= self.max_consecutive and self._others_waiting(model))
+        )
+
+    def _can_admit(self, model: str) -> bool:
+        if self.running == 0 and not any(self._waiters.values()):
+            return True
+        # FIFO within a model: newcomers never overtake that model's queue.
+        return self._turn_open(model) and not self._waiters.get(model)
+
+    def _admit(self, model: str) -> None:
+        if model != self.active:
+            if self.active is not None:
+                self.swaps += 1
+                print(f"--- Model scheduler: switching {self.active} -> {model} ---")
+            self.active = model
+            self._granted_in_turn = 0
+        self.running += 1
+        self._granted_in_turn += 1
+
+    def _grant_next(self, model: str) -> bool:
+        queue = self._waiters.get(model)
+        while queue:
+            future = queue.popleft()
+            if not future.done():
+                self._admit(model)
+                future.set_result(None)
+                return True
+        return False
+
+    def _dispatch(self) -> None:
+        while True:
+            if self.active is not None and self._turn_open(self.active) and self._grant_next(self.active):
+                continue
+            if self.running > 0:
+                return
+            candidates = [name for name, queue in self._waiters.items() if queue and name != self.active]
+            if not candidates:
+                if self.active is None or not self._waiters.get(self.active):
+                    return
+                # Only the active model is waiting: start a fresh turn rather than stall.
+                self._granted_in_turn = 0
+                continue
+            next_model = max(candidates, key=lambda name: len(self._waiters[name]))
+            if not self._grant_next(next_model):
+                return
+
+    def _record_wait(self, model: str, waited: float) -> None:
+        stats = self._model_stats.setdefault(model, {"calls": 0, "wait_seconds": 0.0, "max_wait_seconds": 0.0})
+        stats["calls"] += 1
+        stats["wait_seconds"] += waited
+        stats["max_wait_seconds"] = max(stats["max_wait_seconds"], round(waited, 4))
@@ -0,0 +1,129 @@
+# app/utils/prompt_budget.py
+
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.utils.tokens import estimate_tokens, truncate_to_tokens
+
+# Per-request accounting shape: {node: {section: tokens, ..., "total": tokens}}
+TokenUsage = Dict[str, Dict[str, int]]
+
+
+class PromptPart:
+    """
+    One variable section of a prompt (system, facts, draft, feedback, ...).
+    priority 0 is never trimmed; higher numbers are trimmed first, each down
+    to no less than min_tokens.
+    """
+
+    def __init__(self, name: str, text: str, priority: int = 0, min_tokens: int = 0):
+        self.name = name
+        self.text = text or ""
+        self.priority = priority
+        self.min_tokens = min_tokens
+
+
+class FittedPrompt:
+    """Section texts after trimming, with the token count of each section and of the whole prompt."""
+
+    def __init__(self, texts: Dict[str, str], tokens: Dict[str, int], trimmed: List[str]):
+        self.texts = texts
+        self.tokens = tokens
+        self.trimmed = trimmed
+
+    def __getitem__(self, name: str) -> str:
+        return self.texts[name]
+
+
+class PromptBudget:
+    """
+    Token budgets per agent. fit() trims the lowest-priority sections of a
+    prompt until it fits the agent's budget and records what was sent, so
+    /debug/tokens shows where prompt tokens (and so latency) go.
+    """
+
+    def __init__(self, budgets: Dict[str, int], default_budget: int = 4000):
+        self.budgets = dict(budgets)
+        self.default_budget = default_budget
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, Any]] = {}
+
+    def budget_for(self, agent: str) -> int:
+        return self.budgets.get(agent, self.default_budget)
+
+    def fit(self, agent: str, parts: Iterable[PromptPart], template: str = "") -> FittedPrompt:
+        """
+        Trims parts to the agent's budget. `template` is the fixed prompt text
+        around the parts (its tokens count against the budget as "template").
+        """
+        parts = list(parts)
+        tokens = {part.name: estimate_tokens(part.text) for part in parts}
+        texts = {part.name: part.text for part in parts}
+        fixed = estimate_tokens(template)
+        overflow = fixed + sum(tokens.values()) - self.budget_for(agent)
+        trimmed: List[str] = []
+
+        for part in sorted((p for p in parts if p.priority > 0), key=lambda p: -p.priority):
+            if overflow <= 0:
+                break
+            room = tokens[part.name] - part.min_tokens
+            if room <= 0:
+                continue
+            cut = min(room, overflow)
+            texts[part.name] = truncate_to_tokens(part.text, tokens[part.name] - cut)
+            new_count = estimate_tokens(texts[part.name])
+            overflow -= tokens[part.name] - new_count
+            tokens[part.name] = new_count
+            trimmed.append(part.name)
+
+        if overflow > 0:
+            print(f"!!! Prompt for {agent} is {overflow} tokens over budget after trimming !!!")
+        if trimmed:
+            print(f"--- Prompt budget: trimmed {', '.join(trimmed)} for {agent} ---")
+
+        tokens["template"] = fixed
+        tokens["total"] = sum(tokens.values())
+        self._record(agent, tokens, trimmed)
+        return FittedPrompt(texts, tokens, trimmed)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Per-agent call counts, token totals by section and trim counts."""
+        with self._lock:
+            return {
+                agent: {
+                    **stats,
+                    "sections": dict(stats["sections"]),
+                    "budget": self.budget_for(agent),
+                    "avg_total": round(stats["sections"].get("total", 0) / stats["calls"], 1) if stats["calls"] else 0.0,
+                }
+                for agent, stats in self._stats.items()
+            }
+
+    def _record(self, agent: str, tokens: Dict[str, int], trimmed: List[str]) -> None:
+        with self._lock:
+            stats = self._stats.setdefault(agent, {"calls": 0, "trimmed_calls": 0, "sections": {}})
+            stats["calls"] += 1
+            stats["trimmed_calls"] += 1 if trimmed else 0
+            for name, count in tokens.items():
+                stats["sections"][name] = stats["sections"].get(name, 0) + count
+
+
+def add_tokens(total: Dict[str, int], tokens: Dict[str, int]) -> Dict[str, int]:
+    """Adds one prompt's section counts into a running per-node total (in place)."""
+    for name, count in tokens.items():
+        total[name] = total.get(name, 0) + count
+    return total
+
+
+def merge_token_usage(current: Optional[TokenUsage], update: Optional[TokenUsage]) -> TokenUsage:
+    """Graph reducer: sums per-node token counts across nodes and revisions."""
+    merged = {node: dict(sections) for node, sections in (current or {}).items()}
+    for node, sections in (update or {}).items():
+        add_tokens(merged.setdefault(node, {}), sections)
+    return merged
+
+
+def usage_summary(usage: Optional[TokenUsage]) -> Dict[str, Any]:
+    """Response form: per-node totals plus the request's grand total."""
+    usage = usage or {}
+    return {"by_node": usage, "total": sum(sections.get("total", 0) for sections in usage.values())}
@@ -0,0 +1,139 @@
+# app/utils/research.py
+
+import asyncio
+import re
+from typing import Any, Dict, List, Optional, Sequence
+
+from app.utils.fact_store import topic_terms
+
+# Targeted queries per aspect of the inspiration; RESEARCH_QUERIES picks which run
+QUERY_TEMPLATES = {
+    "what": "Key facts and context for song about: {inspiration}",
+    "who": "{inspiration} people involved who",
+    "when": "{inspiration} history timeline when",
+    "stats": "{inspiration} statistics records numbers",
+    "quotes": "{inspiration} famous quotes",
+}
+
+# Prior trust in each SerpAPI result type (organic results lose a little per position)
+_KIND_PRIOR = {"answer_box": 1.0, "knowledge_graph": 0.8, "organic": 0.6}
+
+
+def expand_queries(inspiration: str, aspects: Sequence[str]) -> List[str]:
+    """One search query per aspect (unknown aspects are ignored); "what" is the original generic query."""
+    return [QUERY_TEMPLATES[aspect].format(inspiration=inspiration) for aspect in aspects if aspect in QUERY_TEMPLATES]
+
+
+def extract_snippets(results: Dict[str, Any], query: str = "") -> List[Dict[str, Any]]:
+    """Snippets from a SerpAPI response: answer box, knowledge graph (description and attributes), organic results."""
+    snippets: List[Dict[str, Any]] = []
+
+    def add(text: Any, kind: str, title: Any = "", source: Any = "", position: int = 1) -> None:
+        if isinstance(text, str) and text.strip():
+            snippets.append({
+                "snippet": text.strip(),
+                "title": title if isinstance(title, str) else "",
+                "source": source if isinstance(source, str) and source else kind,
+                "kind": kind,
+                "position": position,
+                "queries": [query],
+            })
+
+    answer_box = results.get("answer_box")
+    if isinstance(answer_box, list):
+        answer_box = answer_box[0] if answer_box else None
+    if isinstance(answer_box, dict):
+        text = answer_box.get("answer") or answer_box.get("result") or answer_box.get("snippet")
+        add(text, "answer_box", answer_box.get("title"), answer_box.get("link"))
+
+    knowledge_graph = results.get("knowledge_graph")
+    if isinstance(knowledge_graph, dict):
+        title = knowledge_graph.get("title", "")
+        source = knowledge_graph.get("source")
+        link = source.get("link") if isinstance(source, dict) else knowledge_graph.get("website")
+        add(knowledge_graph.get("description"), "knowledge_graph", title, link)
+        # Short scalar attributes ("born", "championships", ...) make good one-line facts
+        for key, value in knowledge_graph.items():
+            if key in ("title", "type", "description", "website") or key.endswith(("_link", "_links", "_stick")):
+                continue
+            if isinstance(value, str) and not value.startswith("http") and len(value) < 120:
+                add(f"{title} {key.replace('_', ' ')}: {value}", "knowledge_graph", title, link)
+
+    for result in results.get("organic_results", []) or []:
+        if isinstance(result, dict):
+            add(result.get("snippet"), "organic", result.get("title"), result.get("link"), result.get("position") or len(snippets) + 1)
+    return snippets
+
+
+def _shingle_set(text: str) -> set:
+    return set(re.findall(r"[a-z0-9]+", text.lower()))
+
+
+def dedupe_snippets(snippets: List[Dict[str, Any]], threshold: float = 0.8) -> List[Dict[str, Any]]:
+    """
+    Merges near-identical snippets (word-set Jaccard >= threshold), e.g. the
+    same wiki sentence returned for several queries. The first copy is kept
+    and collects the queries that returned the others.
+    """
+    kept: List[Dict[str, Any]] = []
+    words: List[set] = []
+    for snippet in snippets:
+        current = _shingle_set(snippet["snippet"])
+        for index, other in enumerate(words):
+            union = current | other
+            if union and len(current & other) / len(union) >= threshold:
+                merged = kept[index].setdefault("queries", [])
+                merged.extend(q for q in snippet.get("queries", []) if q not in merged)
+                break
+        else:
+            kept.append(snippet)
+            words.append(current)
+    return kept
+
+
+def score_snippet(inspiration_terms: List[str], snippet: Dict[str, Any]) -> float:
+    """Relevance to the inspiration, result-type prior and position, cross-query support, and a nudge for numbers."""
+    terms = set(topic_terms(f"{snippet['snippet']} {snippet.get('title', '')}"))
+    relevance = len(terms.intersection(inspiration_terms)) / len(inspiration_terms) if inspiration_terms else 0.0
+    prior = _KIND_PRIOR.get(snippet.get("kind", "organic"), 0.5)
+    if snippet.get("kind", "organic") == "organic":
+        prior -= 0.05 * min(max(int(snippet.get("position") or 1) - 1, 0), 8)
+    support = 0.25 * (len(snippet.get("queries", [])) - 1)
+    stats = 0.1 if re.search(r"\d", snippet["snippet"]) else 0.0
+    return round(relevance + prior + support + stats, 4)
+
+
+def rank_snippets(inspiration: str, snippets: List[Dict[str, Any]], limit: int) -> List[Dict[str, Any]]:
+    """Deduplicated snippets, best score first, cut to `limit`."""
+    inspiration_terms = topic_terms(inspiration)
+    unique = dedupe_snippets(snippets)
+    for snippet in unique:
+        snippet["score"] = score_snippet(inspiration_terms, snippet)
+    return sorted(unique, key=lambda s: s["score"], reverse=True)[:limit]
+
+
+async def search_many(search_tool: Any, queries: List[str], timeout_seconds: float) -> List[Dict[str, Any]]:
+    """
+    Runs the queries concurrently (wall time ~ the slowest one, capped by the
+    per-query timeout) and returns all their snippets. Failed or timed-out
+    queries are logged and skipped; raises only when every query failed.
+    """
+
+    async def one(query: str) -> Optional[List[Dict[str, Any]]]:
+        try:
+            results = await asyncio.wait_for(search_tool.aresults(query), timeout=timeout_seconds)
+        except asyncio.TimeoutError:
+            print(f"!!! Research query timed out after {timeout_seconds}s: {query} !!!")
+            return None
+        except Exception as e:
+            print(f"!!! Research query failed: {query}: {e} !!!")
+            return None
+        if "error" in results:
+            print(f"!!! SerpAPI error for '{query}': {results['error']} !!!")
+            return None
+        return extract_snippets(results, query)
+
+    batches = await asyncio.gather(*(one(query) for query in queries))
+    if queries and all(batch is None for batch in batches):
+        raise RuntimeError(f"All {len(queries)} research queries failed.")
+    return [snippet for batch in batches if batch for snippet in batch]
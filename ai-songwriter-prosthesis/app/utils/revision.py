@@ -0,0 +1,118 @@
+# app/utils/revision.py
+
+import re
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+# A block is one run of consecutive lines sharing a section tag: (section, lines)
+Block = Tuple[str, List[Dict[str, Any]]]
+
+# Section names critics tend to use in free text, longest first so "pre-chorus" wins over "chorus"
+SECTION_WORDS = ["pre-chorus", "prechorus", "chorus", "verse", "bridge", "intro", "outro", "hook", "refrain"]
+SECTION_MENTION_RE = re.compile(
+    r"\b(" + "|".join(re.escape(w) for w in SECTION_WORDS) + r")s?(?:\s*(\d+))?\b", re.IGNORECASE
+)
+LINE_MENTION_RE = re.compile(r"\blines?\s+(\d+)(?:\s*(?:-|–|to|and)\s*(\d+))?", re.IGNORECASE)
+
+
+def normalize_section(tag: str) -> str:
+    """'[Verse 1]' -> 'verse 1'."""
+    return " ".join(tag.strip().strip("[]").lower().replace("prechorus", "pre-chorus").split())
+
+
+def split_blocks(lines: List[Dict[str, Any]]) -> List[Block]:
+    """Splits a flat line list into consecutive same-section blocks, in song order."""
+    blocks: List[Block] = []
+    for item in lines:
+        section = item.get("section", "[verse 1]")
+        if blocks and blocks[-1][0] == section:
+            blocks[-1][1].append(item)
+        else:
+            blocks.append((section, [item]))
+    return blocks
+
+
+def render_numbered(lines: List[Dict[str, Any]]) -> str:
+    """Plain-text song with section headers and 1-based line numbers, so critics can point at lines."""
+    out: List[str] = []
+    number = 0
+    for section, block_lines in split_blocks(lines):
+        if out:
+            out.append("")
+        out.append(section)
+        for item in block_lines:
+            number += 1
+            out.append(f"{number}: {item.get('line', '')}")
+    return "\n".join(out)
+
+
+def find_target_blocks(blocks: List[Block], suggestions: Iterable[str], named_sections: Iterable[str] = ()) -> Set[int]:
+    """
+    Indices of the blocks the critique is about: sections the critics named
+    explicitly, sections mentioned in suggestion text ('the chorus', 'verse 2'),
+    and blocks containing referenced line numbers ('line 7', 'lines 3-4').
+    An empty result means the critique is not section-specific.
+    """
+    normalized = [normalize_section(section) for section, _ in blocks]
+    targets: Set[int] = set()
+
+    def mark(name: str, number: Optional[str]) -> None:
+        wanted = f"{name} {number}" if number else name
+        for i, section in enumerate(normalized):
+            # 'verse' matches every verse; 'verse 2' only the second
+            if section == wanted or (not number and section.split(" ")[0] == name):
+                targets.add(i)
+
+    for section in named_sections:
+        parts = normalize_section(section).split(" ")
+        mark(parts[0], parts[1] if len(parts) > 1 else None)
+
+    # Global line number -> block index
+    line_to_block: Dict[int, int] = {}
+    number = 0
+    for i, (_, block_lines) in enumerate(blocks):
+        for _ in block_lines:
+            number += 1
+            line_to_block[number] = i
+
+    for suggestion in suggestions:
+        for match in SECTION_MENTION_RE.finditer(suggestion):
+            mark(match.group(1).lower().replace("prechorus", "pre-chorus"), match.group(2))
+        for match in LINE_MENTION_RE.finditer(suggestion):
+            start = int(match.group(1))
+            end = int(match.group(2) or start)
+            for line_number in range(start, min(end, start + 50) + 1):
+                if line_number in line_to_block:
+                    targets.add(line_to_block[line_number])
+    return targets
+
+
+def splice_blocks(
+    blocks: List[Block],
+    targets: Set[int],
+    new_lines: List[Dict[str, Any]],
+) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """
+    Replaces the target blocks with regenerated lines (matched by section tag)
+    and carries every other block over unchanged. A target is kept as-is when
+    the model returned nothing for it or dropped one of its human lines.
+    Returns (lines, sections actually replaced).
+    """
+    regenerated: Dict[str, List[Dict[str, Any]]] = {}
+    for item in new_lines:
+        regenerated.setdefault(normalize_section(item.get("section", "")), []).append(item)
+
+    spliced: List[Dict[str, Any]] = []
+    replaced: List[str] = []
+    for i, (section, block_lines) in enumerate(blocks):
+        replacement = regenerated.get(normalize_section(section)) if i in targets else None
+        if replacement:
+            human_lines = {item["line"] for item in block_lines if item.get("source") == "human"}
+            kept_human = {item["line"] for item in replacement if item.get("source") == "human"}
+            if human_lines <= kept_human:
+                # Keep the draft's exact tag so the splice stays consistent with untouched blocks
+                spliced.extend({**item, "section": section} for item in replacement)
+                replaced.append(section)
+                continue
+            print(f"!!! Section revision of {section} dropped human lines; keeping the previous version !!!")
+        spliced.extend(block_lines)
+    return spliced, replaced
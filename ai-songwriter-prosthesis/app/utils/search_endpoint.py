@@ -0,0 +1,38 @@
+# app/utils/search_endpoint.py
+# Imported lazily (langchain_community is slow to import); see get_search_tool / get_search_wrapper.
+
+from typing import Any, Dict, Optional
+
+import aiohttp
+import requests
+from langchain_community.utilities import SerpAPIWrapper
+
+
+class EndpointSerpAPIWrapper(SerpAPIWrapper):
+    """SerpAPIWrapper that sends its queries to `base_url` instead of serpapi.com (e.g. the load-test stub)."""
+
+    base_url: str = "https://serpapi.com"
+
+    def _request_params(self, query: str) -> Dict[str, Any]:
+        return {**self.get_params(query), "source": "python", "output": "json"}
+
+    def results(self, query: str) -> dict:
+        response = requests.get(f"{self.base_url}/search", params=self._request_params(query), timeout=60)
+        return response.json()
+
+    async def aresults(self, query: str) -> dict:
+        url = f"{self.base_url}/search"
+        if self.aiosession:
+            async with self.aiosession.get(url, params=self._request_params(query)) as response:
+                return await response.json()
+        async with aiohttp.ClientSession() as session:
+            async with session.get(url, params=self._request_params(query)) as response:
+                return await response.json()
+
+
+def build_search_wrapper(api_key: Optional[str] = None, base_url: Optional[str] = None) -> SerpAPIWrapper:
+    """The stock wrapper, or one pointed at another SerpAPI-compatible host when base_url is set."""
+    options: Dict[str, Any] = {"serpapi_api_key": api_key} if api_key else {}
+    if base_url:
+        return EndpointSerpAPIWrapper(base_url=base_url.rstrip("/"), **options)
+    return SerpAPIWrapper(**options)
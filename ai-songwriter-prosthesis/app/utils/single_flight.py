@@ -0,0 +1,150 @@
+# app/utils/single_flight.py
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+# Outcomes reported back to callers (surfaced as the Idempotency-Status response header)
+EXECUTED = "executed"  # This caller ran the graph
+JOINED = "joined"      # Collapsed onto an identical in-flight run
+REPLAYED = "replayed"  # Served from the completed-response store
+
+
+def request_fingerprint(namespace: str, payload: Dict[str, Any]) -> str:
+    """Stable hash of a request body with whitespace-normalized strings and empty list items dropped."""
+    def normalize(value: Any) -> Any:
+        if isinstance(value, str):
+            return " ".join(value.split())
+        if isinstance(value, list):
+            return [normalize(v) for v in value if not (isinstance(v, str) and not v.strip())]
+        if isinstance(value, dict):
+            return {k: normalize(v) for k, v in sorted(value.items())}
+        return value
+
+    body = json.dumps(normalize(payload), sort_keys=True, separators=(",", ":"))
+    return f"{namespace}:{hashlib.sha256(body.encode('utf-8')).hexdigest()}"
+
+
+class IdempotencyKeyReused(Exception):
+    """An Idempotency-Key was sent again with a different request body (callers answer 422)."""
+
+
+class IdempotencyStore:
+    """
+    Small SQLite store of completed responses keyed by request hash or
+    Idempotency-Key, each with the fingerprint of the request body that
+    produced it.
+    """
+
+    def __init__(self, db_path: str, ttl_seconds: float = 24 * 3600, max_entries: int = 1000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS idempotency ("
+            " key TEXT PRIMARY KEY,"
+            " response TEXT NOT NULL,"
+            " fingerprint TEXT,"
+            " created_at REAL NOT NULL)"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(idempotency)")}
+        if "fingerprint" not in columns:
+            # Stores written before fingerprints were kept; their entries cannot be verified and are re-run
+            self._conn.execute("ALTER TABLE idempotency ADD COLUMN fingerprint TEXT")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Tuple[Dict[str, Any], Optional[str]]]:
+        """(response, request fingerprint) of a live entry, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, fingerprint, created_at FROM idempotency WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or time.time() - row[2] > self.ttl_seconds:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def put(self, key: str, response: Dict[str, Any], fingerprint: Optional[str] = None) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO idempotency (key, response, fingerprint, created_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(response), fingerprint, now),
+            )
+            self._conn.execute("DELETE FROM idempotency WHERE created_at < ?", (now - self.ttl_seconds,))
+            self._conn.execute(
+                "DELETE FROM idempotency WHERE key IN ("
+                " SELECT key FROM idempotency ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key onto one execution and replays
+    stored results for retries. The shared run is shielded, so a caller that
+    disconnects does not cancel the work other callers are waiting on.
+
+    The store lookup happens inside the shared task, which is registered
+    before anything is awaited: a run finishing between a caller's lookup and
+    its in-flight check cannot be executed a second time. Callers with
+    replay=False (fresh results wanted) never join or expose a shared run.
+    A key reused with a different `fingerprint` raises IdempotencyKeyReused.
+    """
+
+    def __init__(self, store: Optional[IdempotencyStore] = None):
+        self.store = store
+        self._in_flight: Dict[str, Tuple[asyncio.Task, Optional[str]]] = {}
+
+    async def run(
+        self,
+        key: str,
+        fn: Callable[[], Awaitable[Dict[str, Any]]],
+        replay: bool = True,
+        fingerprint: Optional[str] = None,
+    ) -> Tuple[Dict[str, Any], str]:
+        """Returns (response, outcome); set replay=False to skip the store and shared runs."""
+        if not replay:
+            return await asyncio.shield(asyncio.create_task(fn())), EXECUTED
+
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            task, running_fingerprint = in_flight
+            self._check_fingerprint(running_fingerprint, fingerprint)
+            response, outcome = await asyncio.shield(task)
+            return response, REPLAYED if outcome == REPLAYED else JOINED
+
+        task = asyncio.create_task(self._execute(key, fn, fingerprint))
+        # Mark the outcome as retrieved even if every waiter has gone away.
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        self._in_flight[key] = (task, fingerprint)
+        return await asyncio.shield(task)
+
+    @staticmethod
+    def _check_fingerprint(expected: Optional[str], fingerprint: Optional[str]) -> None:
+        if expected is not None and fingerprint is not None and expected != fingerprint:
+            raise IdempotencyKeyReused("Idempotency-Key was already used with a different request body.")
+
+    async def _execute(
+        self, key: str, fn: Callable[[], Awaitable[Dict[str, Any]]], fingerprint: Optional[str]
+    ) -> Tuple[Dict[str, Any], str]:
+        try:
+            if self.store is not None:
+                stored = await asyncio.to_thread(self.store.get, key)
+                if stored is not None and stored[1] is not None:
+                    self._check_fingerprint(stored[1], fingerprint)
+                    return stored[0], REPLAYED
+            response = await fn()
+            if self.store is not None:
+                await asyncio.to_thread(self.store.put, key, response, fingerprint)
+            return response, EXECUTED
+        finally:
+            self._in_flight.pop(key, None)
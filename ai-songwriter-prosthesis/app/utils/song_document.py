@@ -0,0 +1,92 @@
+# app/utils/song_document.py
+
+from functools import cached_property
+from typing import Any, Dict, Iterable, List, Literal, Mapping, Tuple, Union
+
+from pydantic import BaseModel, ConfigDict, ValidationError
+
+from app.utils.revision import Block, render_numbered
+
+
+class SongLine(BaseModel):
+    """One lyric line with its origin; immutable so drafts can be shared between nodes."""
+    model_config = ConfigDict(frozen=True)
+
+    line: str
+    source: Literal["human", "machine"] = "machine"
+    section: str = "[verse 1]"
+
+
+class SongSection(BaseModel):
+    """A run of consecutive lines sharing a section tag."""
+    model_config = ConfigDict(frozen=True)
+
+    name: str
+    lines: Tuple[SongLine, ...] = ()
+
+
+class SongDocument(BaseModel):
+    """
+    The draft as it lives in SongWritingState: ordered sections of lines.
+    Built once per revision and never mutated, so the plain-text renders the
+    agents put in their prompts are computed once and cached on the instance.
+    JSON only happens at the edges: model output is parsed into a document and
+    the API serializes it into the response.
+    """
+    model_config = ConfigDict(frozen=True)
+
+    sections: Tuple[SongSection, ...] = ()
+
+    @classmethod
+    def from_lines(cls, lines: Iterable[Union[Mapping[str, Any], BaseModel]]) -> "SongDocument":
+        """Groups lines (dicts or line models) into consecutive sections; lines that fail validation are dropped."""
+        sections: List[Tuple[str, List[SongLine]]] = []
+        for item in lines:
+            data = item.model_dump() if isinstance(item, BaseModel) else item
+            try:
+                line = SongLine.model_validate(data)
+            except ValidationError as e:
+                print(f"!!! Dropping malformed lyric line: {e} !!!")
+                continue
+            if sections and sections[-1][0] == line.section:
+                sections[-1][1].append(line)
+            else:
+                sections.append((line.section, [line]))
+        return cls(sections=tuple(SongSection(name=name, lines=tuple(block)) for name, block in sections))
+
+    @classmethod
+    def from_human_text(cls, text: str) -> "SongDocument":
+        """Raw lines typed by the user become human lines in the first verse."""
+        if not text or text.strip().lower() in ("none (initial draft)", "none"):
+            return cls()
+        return cls.from_lines(
+            {"line": line.strip(), "source": "human"} for line in text.split("\n") if line.strip()
+        )
+
+    @cached_property
+    def lines(self) -> Tuple[SongLine, ...]:
+        return tuple(line for section in self.sections for line in section.lines)
+
+    @cached_property
+    def plain_text(self) -> str:
+        """Lyrics only, one line per row."""
+        return "\n".join(line.line for line in self.lines)
+
+    @cached_property
+    def numbered_text(self) -> str:
+        """Section headers and 1-based line numbers, for prompts that cite lines."""
+        return render_numbered(self.to_dicts())
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """Flat line dicts ({line, source, section}) for JSON prompts and the revision helpers."""
+        return [line.model_dump() for line in self.lines]
+
+    def blocks(self) -> List[Block]:
+        """The sections in the (section, line dicts) form app.utils.revision works on."""
+        return [(section.name, [line.model_dump() for line in section.lines]) for section in self.sections]
+
+    def __bool__(self) -> bool:
+        return bool(self.sections)
+
+    def __len__(self) -> int:
+        return len(self.lines)
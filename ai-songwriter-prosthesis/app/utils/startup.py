@@ -0,0 +1,53 @@
+# app/utils/startup.py
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List
+
+# Captured when app.main first imports this module, i.e. at the start of app import
+PROCESS_IMPORT_STARTED = time.perf_counter()
+
+
+class StartupTimer:
+    """Records how long each import/init phase took, for /debug/startup."""
+
+    def __init__(self):
+        self._phases: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self.ready_at: float = 0.0
+
+    @contextmanager
+    def phase(self, name: str, kind: str = "init") -> Iterator[None]:
+        """Times a block; kind is 'import', 'init' (blocking startup) or 'lazy' (first use)."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self._phases.append({
+                    "component": name,
+                    "kind": kind,
+                    "seconds": round(elapsed, 4),
+                    "started_after_seconds": round(started - PROCESS_IMPORT_STARTED, 4),
+                })
+            print(f"--- Startup: {name} ({kind}) took {elapsed * 1000:.1f} ms ---")
+
+    def mark_ready(self) -> None:
+        self.ready_at = time.perf_counter()
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            phases = list(self._phases)
+        totals: Dict[str, float] = {}
+        for phase in phases:
+            totals[phase["kind"]] = round(totals.get(phase["kind"], 0.0) + phase["seconds"], 4)
+        return {
+            "ready_after_seconds": round(self.ready_at - PROCESS_IMPORT_STARTED, 4) if self.ready_at else None,
+            "totals_by_kind": totals,
+            "phases": phases,
+        }
+
+
+startup_timer = StartupTimer()
@@ -0,0 +1,168 @@
+# app/utils/timeline.py
+
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+
+def _error_text(error: BaseException) -> str:
+    return f"{type(error).__name__}: {error}"[:300]
+
+
+class TimelineRecorder(BaseCallbackHandler):
+    """
+    Records one graph run as a timeline: a span per node execution (start/end
+    in ms from the run start, revision, error) with the chat model calls made
+    inside it (model, tokens in/out, cache hit, error). One recorder per
+    request, passed in the invocation config next to the metrics handler;
+    ?trace=1 returns timeline() with the response.
+    """
+
+    run_inline = True
+
+    def __init__(self):
+        self.started_at = datetime.now(timezone.utc)
+        self._t0 = time.perf_counter()
+        self._root: Optional[UUID] = None
+        self._ended: Optional[float] = None
+        self._spans: List[Dict[str, Any]] = []
+        self._open_spans: Dict[UUID, Dict[str, Any]] = {}
+        self._spans_by_task: Dict[Tuple[str, Any], Dict[str, Any]] = {}
+        self._open_calls: Dict[UUID, Tuple[Dict[str, Any], Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def _ms(self) -> float:
+        return round((time.perf_counter() - self._t0) * 1000, 1)
+
+    # --- Nodes ---
+
+    def on_chain_start(self, serialized: Optional[Dict[str, Any]], inputs: Any, *, run_id: UUID, parent_run_id: Optional[UUID] = None, metadata: Optional[Dict[str, Any]] = None, **kwargs: Any) -> None:
+        with self._lock:
+            if parent_run_id is None and self._root is None:
+                self._root = run_id
+                self._t0 = time.perf_counter()
+                return
+            metadata = metadata or {}
+            node = metadata.get("langgraph_node")
+            # "__start__" only shows up as a node when it routes (conditional entry point)
+            if not node or node.startswith("__") or kwargs.get("name") != node or parent_run_id != self._root:
+                return
+            span = {
+                "node": node,
+                "revision": inputs.get("revision_number") if isinstance(inputs, dict) else None,
+                "start_ms": self._ms(),
+                "end_ms": None,
+                "duration_ms": None,
+                "calls": [],
+                "tokens_in": 0,
+                "tokens_out": 0,
+                "cache_hits": 0,
+                "error": None,
+            }
+            self._spans.append(span)
+            self._open_spans[run_id] = span
+            self._spans_by_task[(node, metadata.get("langgraph_step"))] = span
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            if run_id == self._root:
+                self._ended = self._ms()
+                return
+            span = self._open_spans.pop(run_id, None)
+            if span is None:
+                return
+            self._close(span)
+            if isinstance(outputs, dict):
+                # The collaborator's update carries the revision it wrote
+                if outputs.get("revision_number") is not None:
+                    span["revision"] = outputs["revision_number"]
+                # Nodes that catch their own exceptions report them in state
+                if isinstance(outputs.get("error"), str):
+                    span["error"] = outputs["error"][:300]
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            if run_id == self._root:
+                self._ended = self._ms()
+                return
+            span = self._open_spans.pop(run_id, None)
+            if span is not None:
+                self._close(span)
+                span["error"] = _error_text(error)
+
+    def _close(self, span: Dict[str, Any]) -> None:
+        span["end_ms"] = self._ms()
+        span["duration_ms"] = round(span["end_ms"] - span["start_ms"], 1)
+
+    # --- Chat model calls ---
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[Any]], *, run_id: UUID, metadata: Optional[Dict[str, Any]] = None, **kwargs: Any) -> None:
+        metadata = metadata or {}
+        kwargs_model = ((serialized or {}).get("kwargs") or {})
+        with self._lock:
+            span = self._spans_by_task.get((metadata.get("langgraph_node"), metadata.get("langgraph_step")))
+            if span is None:
+                return
+            call = {
+                "model": metadata.get("ls_model_name") or kwargs_model.get("model") or kwargs_model.get("model_name") or "unknown",
+                "start_ms": self._ms(),
+                "end_ms": None,
+                "tokens_in": 0,
+                "tokens_out": 0,
+                "cache_hit": False,
+                "error": None,
+            }
+            span["calls"].append(call)
+            self._open_calls[run_id] = (span, call)
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID, metadata: Optional[Dict[str, Any]] = None, **kwargs: Any) -> None:
+        self.on_chat_model_start(serialized, [], run_id=run_id, metadata=metadata)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            open_call = self._open_calls.pop(run_id, None)
+            if open_call is None:
+                return
+            span, call = open_call
+            call["end_ms"] = self._ms()
+            for generations in response.generations:
+                for generation in generations:
+                    usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                    call["tokens_in"] += usage.get("input_tokens", 0)
+                    call["tokens_out"] += usage.get("output_tokens", 0)
+                    # TieredLLMCache tags the generations it serves
+                    if (generation.generation_info or {}).get("llm_cache"):
+                        call["cache_hit"] = True
+            span["tokens_in"] += call["tokens_in"]
+            span["tokens_out"] += call["tokens_out"]
+            span["cache_hits"] += 1 if call["cache_hit"] else 0
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            open_call = self._open_calls.pop(run_id, None)
+            if open_call is not None:
+                _, call = open_call
+                call["end_ms"] = self._ms()
+                call["error"] = _error_text(error)
+
+    # --- Results ---
+
+    def steps(self) -> List[str]:
+        """Node names in the order they started (repeated per revision): what actually ran."""
+        with self._lock:
+            return [span["node"] for span in sorted(self._spans, key=lambda s: s["start_ms"])]
+
+    def timeline(self) -> Dict[str, Any]:
+        with self._lock:
+            spans = sorted(self._spans, key=lambda s: s["start_ms"])
+            total = self._ended if self._ended is not None else self._ms()
+            return {
+                "started_at": self.started_at.isoformat(),
+                "total_ms": total,
+                "entries": [{**span, "calls": [dict(call) for call in span["calls"]]} for span in spans],
+            }
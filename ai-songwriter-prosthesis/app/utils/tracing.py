@@ -0,0 +1,25 @@
+# app/utils/tracing.py
+
+from app.config import PHOENIX_TRACING_ENABLED
+from app.utils.startup import startup_timer
+
+_tracing_initialized = False
+
+def init_tracing() -> bool:
+    """Registers Phoenix as the OTel exporter and instruments LangChain (once, from the lifespan)."""
+    global _tracing_initialized
+    if _tracing_initialized or not PHOENIX_TRACING_ENABLED:
+        return _tracing_initialized
+    try:
+        with startup_timer.phase("phoenix_tracing"):
+            # Heavy imports deferred until the app actually starts serving
+            from phoenix.otel import register
+            from openinference.instrumentation.langchain import LangChainInstrumentor
+
+            tracer_provider = register()  # Configures Phoenix as OTel exporter
+            LangChainInstrumentor().instrument(tracer_provider=tracer_provider)
+    except Exception as e:
+        print(f"!!! Phoenix tracing disabled: {e} !!!")
+        return False
+    _tracing_initialized = True
+    return True
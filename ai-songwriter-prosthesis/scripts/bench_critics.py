@@ -0,0 +1,152 @@
+# scripts/bench_critics.py
+"""
+Latency / token / agreement comparison of the critic modes.
+
+Runs each CRITIC_MODE over the same fixture drafts against the configured
+Ollama host (cache bypassed) and reports wall time, model calls and tokens per
+critique, plus how closely each mode's scores and release verdict track the
+ensemble baseline.
+
+    python -m scripts.bench_critics --rounds 3
+    python -m scripts.bench_critics --modes ensemble single
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Any, Dict, List
+
+from langchain_core.callbacks import AsyncCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from app.agents.critics import CRITIC_MODES, CriticsAgent
+from app.graph.routing import SCORE_KEYS, thresholds_met
+from app.graph.state import combined_qa
+from app.utils.llm_cache import bypass_llm_cache
+from app.utils.song_document import SongDocument
+
+THRESHOLDS = {"creativity": 0.5, "freshness": 0.5, "humor": 0.4}
+
+# --- Fixtures ---
+FIXTURES: List[Dict[str, Any]] = [
+    {
+        "inspiration": "A cat who thinks it is the CEO of a tech startup",
+        "lines": [
+            ("[verse 1]", "Whiskers in a hoodie, pitching to the board", "human"),
+            ("[verse 1]", "Knocked the quarterly forecast off the desk, then ignored", "machine"),
+            ("[chorus]", "I'm the CEO, I nap at nine to five", "machine"),
+            ("[chorus]", "Disrupting the couch, the synergy's alive", "machine"),
+            ("[verse 2]", "Series A in tuna, Series B in yarn", "machine"),
+            ("[verse 2]", "Unicorn valuation from a barn", "machine"),
+        ],
+    },
+    {
+        "inspiration": "The 1969 Moon landing told by the flag",
+        "lines": [
+            ("[verse 1]", "Planted in the dust, no breeze to make me wave", "machine"),
+            ("[verse 1]", "Apollo 11 dropped me off, one giant leap, so brave", "machine"),
+            ("[chorus]", "Red white and lunar, stuck here on my own", "human"),
+            ("[chorus]", "Buzz took a picture, then he flew back home", "machine"),
+            ("[bridge]", "Knocked flat by the ascent stage blast", "machine"),
+        ],
+    },
+]
+
+
+def fixture_state(fixture: Dict[str, Any]) -> Dict[str, Any]:
+    draft = [{"line": line, "source": source, "section": section} for section, line, source in fixture["lines"]]
+    return {
+        "inspiration": fixture["inspiration"],
+        "draft_lyrics": SongDocument.from_lines(draft),
+        "thresholds": THRESHOLDS,
+        "feedback": [],
+    }
+
+
+class UsageCounter(AsyncCallbackHandler):
+    """Counts model calls and sums the token usage reported on each generation."""
+
+    def __init__(self):
+        self.calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+
+    async def on_llm_end(self, response: LLMResult, **kwargs: Any) -> None:
+        self.calls += 1
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                self.input_tokens += usage.get("input_tokens", 0)
+                self.output_tokens += usage.get("output_tokens", 0)
+
+
+async def run_mode(mode: str, states: List[Dict[str, Any]], rounds: int) -> Dict[str, Any]:
+    agent = CriticsAgent(mode=mode)
+    node = agent.as_node()
+    latencies: List[float] = []
+    outputs: List[Dict[str, Any]] = []
+    counter = UsageCounter()
+
+    with bypass_llm_cache(True):
+        for _ in range(rounds):
+            for state in states:
+                started = time.perf_counter()
+                outputs.append(await node.ainvoke(state, config={"callbacks": [counter]}))
+                latencies.append(time.perf_counter() - started)
+
+    runs = len(latencies)
+    return {
+        "mode": mode,
+        "runs": runs,
+        "p50_seconds": round(statistics.median(latencies), 3),
+        "max_seconds": round(max(latencies), 3),
+        "calls_per_run": round(counter.calls / runs, 2),
+        "tokens_per_run": round((counter.input_tokens + counter.output_tokens) / runs, 1),
+        "outputs": outputs,
+    }
+
+
+def released(output: Dict[str, Any]) -> bool:
+    """Whether a critics output alone would release the draft."""
+    return thresholds_met({**output, "thresholds": THRESHOLDS, "qa_status": combined_qa(output.get("qa_checks"))})
+
+
+def agreement(baseline: List[Dict[str, Any]], candidate: List[Dict[str, Any]]) -> Dict[str, float]:
+    """Mean absolute score difference and release-verdict agreement against the baseline runs."""
+    diffs: List[float] = []
+    same_verdict = 0
+    for base, other in zip(baseline, candidate):
+        diffs.extend(
+            abs(base["critic_scores"].get(key, 0.0) - other["critic_scores"].get(key, 0.0)) for key in SCORE_KEYS
+        )
+        same_verdict += released(base) == released(other)
+    pairs = min(len(baseline), len(candidate)) or 1
+    return {
+        "mean_abs_score_diff": round(statistics.mean(diffs), 3) if diffs else 0.0,
+        "verdict_agreement": round(same_verdict / pairs, 3),
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare critic modes on fixture drafts.")
+    parser.add_argument("--modes", nargs="+", default=list(CRITIC_MODES), choices=CRITIC_MODES)
+    parser.add_argument("--rounds", type=int, default=3, help="Passes over the fixtures per mode.")
+    args = parser.parse_args()
+
+    states = [fixture_state(fixture) for fixture in FIXTURES]
+    results = [await run_mode(mode, states, args.rounds) for mode in args.modes]
+    baseline = next((r for r in results if r["mode"] == "ensemble"), results[0])
+
+    print(f"{'mode':<10}{'p50 s':>8}{'max s':>8}{'calls':>8}{'tokens':>9}{'score diff':>12}{'verdict agr':>13}")
+    for result in results:
+        agree = agreement(baseline["outputs"], result["outputs"])
+        print(
+            f"{result['mode']:<10}{result['p50_seconds']:>8}{result['max_seconds']:>8}"
+            f"{result['calls_per_run']:>8}{result['tokens_per_run']:>9}"
+            f"{agree['mean_abs_score_diff']:>12}{agree['verdict_agreement']:>13}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,119 @@
+# scripts/bench_graph.py
+"""
+Framework-overhead micro-benchmark for the songwriting graph.
+
+Runs the whole workflow, then each node on its own, against the in-process
+scripted model and search stub (scripts/fake_llm.py, cache off), so no Ollama
+host or API keys are needed and runs are deterministic. Model time is the
+simulated latency; everything else is reported as overhead, end to end and
+per node, and exits 1 when any overhead regresses against the committed
+baseline (benchmarks/bench_graph_baseline.json), or when there is no
+baseline, so it can gate a CI step. Refresh the baseline with --save-baseline
+after an intended change and commit it.
+
+    python -m scripts.bench_graph --runs 5
+    python -m scripts.bench_graph --latency-ms 200 --jitter-ms 50
+    python -m scripts.bench_graph --save-baseline
+    python -m scripts.bench_graph --max-regression 0.25 --min-delta-ms 2
+"""
+
+import os
+
+# Read at import time by app.config; the keys are never used, the stand-ins are installed in main()
+os.environ.setdefault("GOOGLE_API_KEY", "unused")
+os.environ.setdefault("SERPAPI_API_KEY", "unused")
+os.environ["LLM_CACHE_ENABLED"] = "false"
+os.environ["FACT_STORE_ENABLED"] = "false"
+os.environ.setdefault("PHOENIX_TRACING_ENABLED", "false")
+
+import argparse
+import asyncio
+import sys
+from typing import Any, Dict, List
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Committed (data/ is gitignored), so CI always compares against it
+BASELINE_PATH = os.path.join(BASE_DIR, "benchmarks", "bench_graph_baseline.json")
+LYRICS = ["My cat wears a tie to the morning meeting", "She fired the dog for chewing the memo"]
+
+
+def install_stand_ins(latency_seconds: float, jitter_seconds: float, search_latency_seconds: float) -> None:
+    """Routes every chat model and search to the scripted stand-ins, scheduled like the real models."""
+    from app.config import MODEL_SCHEDULER_ENABLED
+    from app.utils.llm import ScheduledChatMixin, use_stand_ins
+    from scripts.fake_llm import FakeSearchTool, ScriptedChatModel
+
+    # The scheduler is part of the overhead being measured
+    model_cls = ScriptedChatModel
+    if MODEL_SCHEDULER_ENABLED:
+        model_cls = type("ScheduledScriptedChatModel", (ScheduledChatMixin, ScriptedChatModel), {"__module__": __name__})
+
+    def chat_model(model: str, temperature: float) -> ScriptedChatModel:
+        return model_cls(model=model, latency_seconds=latency_seconds, jitter_seconds=jitter_seconds)
+
+    use_stand_ins(chat_model, FakeSearchTool(latency_seconds=search_latency_seconds))
+
+
+def initial_state(max_revisions: int) -> Dict[str, Any]:
+    from app.api.routes import SongRequestOld, build_initial_state
+    return build_initial_state(SongRequestOld(theme="A cat who runs a startup", draft_lyrics=LYRICS, max_revisions=max_revisions))
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description="Measure graph and per-node framework overhead with a scripted model.")
+    parser.add_argument("--runs", type=int, default=5, help="End-to-end runs (and runs per node).")
+    parser.add_argument("--max-revisions", type=int, default=2)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Simulated latency per model call.")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Seeded +/- jitter on each model call.")
+    parser.add_argument("--search-latency-ms", type=float, default=0.0)
+    parser.add_argument("--baseline", default=None, help="Baseline JSON (default: benchmarks/bench_graph_baseline.json).")
+    parser.add_argument("--save-baseline", action="store_true", help="Write this run as the new baseline.")
+    parser.add_argument("--max-regression", type=float, default=0.25, help="Allowed overhead growth (fraction).")
+    parser.add_argument("--min-delta-ms", type=float, default=2.0, help="Ignore overhead growth below this.")
+    args = parser.parse_args()
+
+    install_stand_ins(args.latency_ms / 1000, args.jitter_ms / 1000, args.search_latency_ms / 1000)
+    from app.graph.workflow import build_workflow
+    from scripts.graph_bench import (
+        find_regressions, load_baseline, print_summary, profile_graph, profile_node, save_baseline, summarize,
+    )
+
+    app = build_workflow()
+    # Warm-up: first-call imports and client construction are not overhead per request
+    final_state = await app.ainvoke(initial_state(args.max_revisions), config={"recursion_limit": 50})
+
+    runs = [
+        await profile_graph(app, initial_state(args.max_revisions), config={"recursion_limit": 50})
+        for _ in range(args.runs)
+    ]
+    summary = summarize(runs)
+
+    # Each node alone, on the state a full run ends with
+    node_runs: List[Dict[str, Any]] = []
+    for _ in range(args.runs):
+        nodes = {}
+        for name, spec in app.builder.nodes.items():
+            nodes[name] = await profile_node(spec.runnable, dict(final_state))
+        node_runs.append({"wall": 0.0, "model": 0.0, "overhead": 0.0, "nodes": nodes})
+    isolated = {f"isolated:{metric[5:]}": values for metric, values in summarize(node_runs).items() if metric != "graph"}
+    summary.update(isolated)
+
+    baseline_path = args.baseline or BASELINE_PATH
+    baseline = load_baseline(baseline_path)
+    print_summary(f"Songwriting graph, {args.runs} runs, {args.latency_ms} ms/model call", summary, baseline)
+
+    if args.save_baseline:
+        save_baseline(baseline_path, summary)
+        print(f"--- Baseline saved to {baseline_path} ---")
+        return 0
+    if baseline is None:
+        print(f"!!! No baseline at {baseline_path}; run with --save-baseline to create one !!!")
+        return 1
+    regressions = find_regressions(summary, baseline, args.max_regression, args.min_delta_ms)
+    for regression in regressions:
+        print(f"!!! Regression: {regression} !!!")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,133 @@
+# scripts/load_driver.py
+
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+
+from app.utils.loop_lag import EventLoopLagMonitor
+
+PayloadFn = Callable[[int], Dict[str, Any]]
+
+
+# --- Processes Under Test ---
+
+def start_stub_server(app: Any, port: int) -> Any:
+    """Runs the stub backends on their own thread and event loop, so they do not skew the client's timings."""
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    deadline = time.time() + 10
+    while not server.started and time.time() < deadline:
+        time.sleep(0.05)
+    if not server.started:
+        raise RuntimeError(f"Stub server did not start on port {port}")
+    return server
+
+
+def spawn_app(cwd: str, port: int, workers: int, env: Dict[str, str], log_path: str) -> subprocess.Popen:
+    """Starts the service under uvicorn with `env` layered over the current environment."""
+    command = [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers)]
+    log = open(log_path, "w")
+    return subprocess.Popen(command, cwd=cwd, env={**os.environ, "PYTHONUNBUFFERED": "1", **env}, stdout=log, stderr=subprocess.STDOUT)
+
+
+async def wait_until_ready(base_url: str, timeout: float = 60.0) -> None:
+    deadline = time.time() + timeout
+    async with httpx.AsyncClient(timeout=2.0) as client:
+        while time.time() < deadline:
+            try:
+                if (await client.get(f"{base_url}/debug/startup")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.25)
+    raise RuntimeError(f"Service at {base_url} was not ready after {timeout:.0f}s")
+
+
+# --- Load Generation ---
+
+async def drive_load(
+    url: str,
+    make_payload: PayloadFn,
+    rps: float,
+    duration: float,
+    timeout: float = 300.0,
+) -> Dict[str, Any]:
+    """
+    Open-loop load: request i is sent at i / rps seconds whether or not
+    earlier ones have finished, so a saturated service shows up as growing
+    latency and errors rather than as a quietly lower send rate.
+    """
+    records: List[Dict[str, Any]] = []
+    client_lag = EventLoopLagMonitor(interval=0.05)
+    client_lag.start()
+
+    async def one(client: httpx.AsyncClient, index: int) -> None:
+        started = time.perf_counter()
+        record: Dict[str, Any] = {"index": index}
+        try:
+            response = await client.post(url, json=make_payload(index))
+            record["status"] = response.status_code
+        except httpx.HTTPError as e:
+            record["status"] = None
+            record["error"] = type(e).__name__
+        record["latency"] = time.perf_counter() - started
+        records.append(record)
+
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=100)
+    async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+        started = time.perf_counter()
+        tasks = []
+        total = max(1, int(rps * duration))
+        for index in range(total):
+            delay = started + index / rps - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(one(client, index)))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+
+    await client_lag.stop()
+    return summarize_load(records, elapsed, rps, client_lag.snapshot())
+
+
+def summarize_load(records: List[Dict[str, Any]], elapsed: float, target_rps: float, client_lag: Dict[str, Any]) -> Dict[str, Any]:
+    ok = sorted(r["latency"] for r in records if r.get("status") == 200)
+    statuses: Dict[str, int] = {}
+    for record in records:
+        key = str(record.get("status") or record.get("error"))
+        statuses[key] = statuses.get(key, 0) + 1
+
+    def pct(p: float) -> Optional[float]:
+        return round(ok[min(len(ok) - 1, int(p * len(ok)))] * 1000, 1) if ok else None
+
+    return {
+        "requests": len(records),
+        "target_rps": target_rps,
+        "elapsed_seconds": round(elapsed, 2),
+        "throughput_rps": round(len(ok) / elapsed, 3) if elapsed else 0.0,
+        "error_rate": round(1 - len(ok) / len(records), 4) if records else 0.0,
+        "statuses": statuses,
+        "latency_ms": {"p50": pct(0.50), "p95": pct(0.95), "p99": pct(0.99), "max": round(ok[-1] * 1000, 1) if ok else None},
+        "client_loop_lag": client_lag,
+    }
+
+
+def print_report(title: str, report: Dict[str, Any]) -> None:
+    latency = report["latency_ms"]
+    print(f"--- {title} ---")
+    print(f"requests        {report['requests']} at {report['target_rps']} rps over {report['elapsed_seconds']} s")
+    print(f"throughput      {report['throughput_rps']} ok/s")
+    print(f"error rate      {report['error_rate']:.2%}  {report['statuses']}")
+    print(f"latency ms      p50 {latency['p50']}  p95 {latency['p95']}  p99 {latency['p99']}  max {latency['max']}")
+    for name in ("server_loop_lag", "client_loop_lag"):
+        lag = report.get(name) or {}
+        if lag.get("samples"):
+            print(f"{name.replace('_', ' '):<16}p50 {lag['p50_ms']}  p99 {lag['p99_ms']}  max {lag['max_ms']} ms ({lag['samples']} samples)")
@@ -0,0 +1,105 @@
+# scripts/load_test.py
+"""
+Network-free HTTP load test for POST /generate.
+
+Starts local stand-ins for Ollama (/api/chat) and SerpAPI (/search) with
+configurable latency and jitter, launches the service under uvicorn pointed
+at them (scratch DATA_DIR, so caches and stores start empty), then drives
+/generate open-loop at a target rate. Reports p50/p95/p99 latency,
+throughput, error rate and event-loop lag (server side from
+/debug/event-loop, plus the client's own). Use it to size --workers,
+JOB_WORKERS and MODEL_SCHEDULER_MAX_CONCURRENT (OLLAMA_NUM_PARALLEL) before
+a deploy.
+
+    python -m scripts.load_test --rps 2 --duration 30
+    python -m scripts.load_test --workers 2 --llm-latency-ms 800 --env MODEL_SCHEDULER_MAX_CONCURRENT=4
+    python -m scripts.load_test --app-url http://localhost:8000   # service already running
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+from typing import Any, Dict
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LYRICS = ["My cat wears a tie to the morning meeting"]
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description="Load test /generate against stub Ollama and SerpAPI backends.")
+    parser.add_argument("--rps", type=float, default=1.0, help="Target request rate.")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of load.")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Per-request timeout.")
+    parser.add_argument("--max-revisions", type=int, default=2)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the spawned service.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--stub-port", type=int, default=8766)
+    parser.add_argument("--llm-latency-ms", type=float, default=500.0)
+    parser.add_argument("--llm-jitter-ms", type=float, default=100.0)
+    parser.add_argument("--search-latency-ms", type=float, default=300.0)
+    parser.add_argument("--app-url", default=None, help="Test a running service instead of spawning one.")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="Extra env for the spawned service.")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON.")
+    args = parser.parse_args()
+
+    import httpx
+    from scripts.load_driver import drive_load, print_report, spawn_app, start_stub_server, wait_until_ready
+    from scripts.stub_backends import StubSettings, build_stub_app
+
+    stub_url = f"http://127.0.0.1:{args.stub_port}"
+    stub = start_stub_server(build_stub_app(StubSettings(
+        llm_latency=args.llm_latency_ms / 1000,
+        llm_jitter=args.llm_jitter_ms / 1000,
+        search_latency=args.search_latency_ms / 1000,
+    )), args.stub_port)
+
+    process = None
+    base_url = args.app_url
+    scratch = tempfile.mkdtemp(prefix="load_test_")
+    if base_url is None:
+        env = {
+            "OLLAMA_BASE_URL": stub_url,
+            "SERPAPI_BASE_URL": stub_url,
+            "GOOGLE_API_KEY": os.getenv("GOOGLE_API_KEY", "stub"),
+            "SERPAPI_API_KEY": os.getenv("SERPAPI_API_KEY", "stub"),
+            "DATA_DIR": scratch,
+            "PHOENIX_TRACING_ENABLED": "false",
+            **dict(item.split("=", 1) for item in args.env),
+        }
+        base_url = f"http://127.0.0.1:{args.port}"
+        log_path = os.path.join(scratch, "service.log")
+        print(f"--- Starting service on {base_url} ({args.workers} workers), log: {log_path} ---")
+        process = spawn_app(BASE_DIR, args.port, args.workers, env, log_path)
+
+    def payload(index: int) -> Dict[str, Any]:
+        # Distinct themes: identical requests would be coalesced by /generate's single-flight
+        return {"theme": f"A cat who runs a startup #{index}", "draft_lyrics": LYRICS, "no_cache": True, "max_revisions": args.max_revisions}
+
+    try:
+        await wait_until_ready(base_url)
+        async with httpx.AsyncClient(timeout=10.0) as client:
+            await client.get(f"{base_url}/debug/event-loop", params={"reset": "true"})
+        report = await drive_load(f"{base_url}/generate", payload, args.rps, args.duration, args.timeout)
+        async with httpx.AsyncClient(timeout=10.0) as client:
+            # With several workers this is whichever worker answers
+            report["server_loop_lag"] = (await client.get(f"{base_url}/debug/event-loop")).json()
+            report["stub_requests"] = (await client.get(f"{stub_url}/stub/stats")).json()["requests"]
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+        stub.should_exit = True
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(f"/generate load test ({args.llm_latency_ms} ms +/- {args.llm_jitter_ms} ms per model call)", report)
+        print(f"stub requests   {report['stub_requests']}")
+    return 0 if report["error_rate"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))